@@ -0,0 +1,327 @@
+"""Анализ позиций chess167 (и chessbase): перебор negamax с альфа-бета отсечением.
+
+Поиск ведётся итеративным углублением: глубина растёт на 1, пока не
+исчерпан бюджет времени или узлов; результатом служит последняя полностью
+просчитанная итерация. Ходы упорядочиваются так: ход из таблицы
+транспозиций, взятия по MVV-LVA (ценная жертва дешёвым нападающим), ходы-
+"убийцы" этой глубины, затем остальные по истории отсечений. На концах
+перебора выполняется поиск взятий (quiescence), чтобы оценка не зависела
+от незаконченного размена.
+
+Правила модулей не знают шаха и мата, поэтому партия считается выигранной
+взятием короля: такой ход оценивается как мат.
+
+Это только API анализа, игра в chess167 остаётся игрой двух людей.
+
+Пример:
+    result = analyse(chess167.Board(), 'W', time_limit=2.0)
+    print(result.score, ' '.join(result.line))
+"""
+
+import time
+from collections import namedtuple
+
+from moves import CAPTURE, PIECE_CODES, MoveList, captured, to_text
+from zobrist import TranspositionTable
+
+# Ценность фигур в сотых долях пешки (новые фигуры оценены по подвижности)
+PIECE_VALUES = {'P': 100, 'N': 300, 'B': 320, 'R': 500, 'Q': 900, 'K': 0, 'U': 280, 'D': 650, 'S': 200}
+MATE = 100000
+MAX_PLY = 64
+INFINITY = MATE + 1
+
+# Вид оценки в таблице транспозиций
+EXACT, LOWER, UPPER = 0, 1, 2
+# Значение записи таблицы упаковано в одно число (см. zobrist.ENTRY_BYTES):
+# биты 0-23 - лучший ход, 24-25 - вид оценки, с 26-го - оценка со смещением SCORE_OFFSET
+SCORE_OFFSET = 1 << 20
+CHECK_EVERY = 1024
+
+AnalysisResult = namedtuple('AnalysisResult', 'score line depth nodes seconds')
+
+
+def pack_entry(score, bound, move):
+    """Упаковывает оценку, её вид и лучший ход в одно число для таблицы транспозиций."""
+    return (score + SCORE_OFFSET) << 26 | bound << 24 | move
+
+
+def unpack_entry(value):
+    """Обратное к `pack_entry`: (score, bound, move)."""
+    return (value >> 26) - SCORE_OFFSET, value >> 24 & 3, value & 0xFFFFFF
+
+
+def to_table(score, ply):
+    """Оценка мата в таблице хранится от текущей позиции, а не от корня."""
+    if score >= MATE - MAX_PLY:
+        return score + ply
+    if score <= MAX_PLY - MATE:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    """Обратное к `to_table`: оценка мата от корня для узла на полуходе `ply`."""
+    if score >= MATE - MAX_PLY:
+        return score - ply
+    if score <= MAX_PLY - MATE:
+        return score + ply
+    return score
+
+
+class SearchAborted(Exception):
+    """Исчерпан бюджет времени или узлов."""
+
+
+class Searcher:
+    """Перебор с альфа-бета отсечением для одной доски.
+
+    Атрибуты:
+        board (Board): Анализируемая доска (после поиска возвращается в исходную позицию).
+        table: Таблица транспозиций с методами probe/store (см. zobrist.TranspositionTable).
+        values (dict): Ценность фигур по названиям.
+        nodes (int): Число посещённых узлов.
+        stop: Необязательное событие (с методом is_set), по которому поиск прерывается извне.
+    """
+
+    def __init__(self, board, table=None, values=None):
+        """Готовит поиск.
+
+        Args:
+            board (Board): Доска chess167 или chessbase.
+            table: Таблица транспозиций (по умолчанию - новая на 16 МБ).
+            values (dict): Ценность фигур (по умолчанию PIECE_VALUES).
+        """
+        self.board = board
+        self.table = table if table is not None else TranspositionTable()
+        self.values = dict(PIECE_VALUES, **(values or {}))
+        self._code_values = [0] * 16
+        for name, code in PIECE_CODES.items():
+            self._code_values[code] = self.values.get(name, 0)
+        self._king = PIECE_CODES['K']
+        # Для упорядочивания взятие короля ценнее любого другого
+        self._code_values[self._king] = MATE
+        self.nodes = 0
+        self._buffers = [MoveList() for _ in range(MAX_PLY + 1)]
+        self._killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self._history = {}
+        self._deadline = None
+        self._node_limit = None
+        self._next_check = CHECK_EVERY
+        self.stop = None
+
+    def evaluate(self, color):
+        """Материальная оценка позиции с точки зрения стороны `color`."""
+        score = 0
+        values = self.values
+        for row in self.board.grid:
+            for piece in row:
+                if piece:
+                    score += values[piece.name] if piece.color == color else -values[piece.name]
+        return score
+
+    def _check_budget(self):
+        """Прерывает поиск по исчерпании бюджета; иначе назначает следующую проверку."""
+        if self._node_limit is not None and self.nodes >= self._node_limit:
+            raise SearchAborted
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            raise SearchAborted
+        if self.stop is not None and self.stop.is_set():
+            raise SearchAborted
+        # Время проверяется раз в CHECK_EVERY узлов, лимит узлов соблюдается точно
+        self._next_check = self.nodes + CHECK_EVERY
+        if self._node_limit is not None:
+            self._next_check = min(self._next_check, self._node_limit)
+
+    def _order(self, moves, ply, tt_move):
+        """Возвращает ходы буфера в порядке перебора."""
+        grid = self.board.grid
+        values = self._code_values
+        killers = self._killers[ply]
+        history = self._history
+        scored = []
+        items = moves.moves
+        for index in range(moves.count):
+            move = items[index]
+            if move == tt_move:
+                key = 1 << 30
+            elif move >> 12 & CAPTURE:
+                start = move & 63
+                attacker = grid[start >> 3][start & 7]
+                key = (1 << 24) + values[move >> 20 & 15] * 16 - self.values[attacker.name] // 16
+            elif move == killers[0] or move == killers[1]:
+                key = 1 << 23
+            else:
+                key = history.get(move & 0xFFF, 0)
+            scored.append((key, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    def quiescence(self, color, alpha, beta, ply):
+        """Поиск только взятий до спокойной позиции."""
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_budget()
+        stand_pat = self.evaluate(color)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        if ply >= MAX_PLY:
+            return stand_pat
+        board = self.board
+        moves = board.fill_moves(color, self._buffers[ply])
+        captures = [move for move in self._order(moves, ply, 0) if move >> 12 & CAPTURE]
+        opponent = 'B' if color == 'W' else 'W'
+        for move in captures:
+            if move >> 20 & 15 == self._king:
+                return MATE - ply
+            if not board.make_packed(move):
+                continue
+            score = -self.quiescence(opponent, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def search(self, color, depth, alpha, beta, ply):
+        """Negamax с альфа-бета отсечением.
+
+        Returns:
+            int: Оценка позиции для стороны `color`.
+        """
+        if depth <= 0:
+            return self.quiescence(color, alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes >= self._next_check:
+            self._check_budget()
+        board = self.board
+        key = board.zobrist_key
+        tt_move = 0
+        found = self.table.probe(key)
+        if found is not None:
+            score, bound, tt_move = unpack_entry(found[0])
+            score = from_table(score, ply)
+            if found[1] >= depth and ply:
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        moves = board.fill_moves(color, self._buffers[ply])
+        opponent = 'B' if color == 'W' else 'W'
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, 0
+        for move in self._order(moves, ply, tt_move):
+            if move >> 20 & 15 == self._king:
+                # Взятие короля завершает партию
+                best_score, best_move = MATE - ply, move
+                break
+            if not board.make_packed(move):
+                continue
+            score = -self.search(opponent, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not move >> 12 & CAPTURE:
+                    killers = self._killers[ply]
+                    if killers[0] != move:
+                        killers[1], killers[0] = killers[0], move
+                    self._history[move & 0xFFF] = self._history.get(move & 0xFFF, 0) + depth * depth
+                break
+        if best_move == 0:
+            # Ходов нет: оценка по материалу
+            return self.evaluate(color)
+
+        bound = EXACT
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        self.table.store(key, pack_entry(to_table(best_score, ply), bound, best_move), depth)
+        return best_score
+
+    def principal_variation(self, depth):
+        """Лучшая линия по ходам из таблицы транспозиций (не длиннее `depth`)."""
+        board = self.board
+        line = []
+        made = 0
+        seen = set()
+        while len(line) < depth:
+            key = board.zobrist_key
+            found = self.table.probe(key)
+            if found is None or key in seen:
+                break
+            seen.add(key)
+            move = unpack_entry(found[0])[2]
+            if not move:
+                break
+            if captured(move) == 'K':
+                line.append(move)
+                break
+            if not board.make_packed(move):
+                break
+            made += 1
+            line.append(move)
+        for _ in range(made):
+            board.unmake_move()
+        return line
+
+    def iterate(self, color, max_depth=MAX_PLY, time_limit=None, node_limit=None, start_depth=1):
+        """Итеративное углубление.
+
+        Args:
+            color (str): Сторона, за которую ищется ход.
+            max_depth (int): Наибольшая глубина.
+            time_limit (float): Бюджет времени в секундах (None - без ограничения).
+            node_limit (int): Бюджет узлов (None - без ограничения).
+            start_depth (int): Глубина первой итерации.
+
+        Returns:
+            AnalysisResult: Итог последней завершённой итерации.
+        """
+        started = time.perf_counter()
+        self._deadline = started + time_limit if time_limit is not None else None
+        self._node_limit = node_limit
+        self.nodes = 0
+        self._next_check = CHECK_EVERY if node_limit is None else min(CHECK_EVERY, node_limit)
+        if hasattr(self.table, 'new_search'):
+            self.table.new_search()
+        result = AnalysisResult(self.evaluate(color), [], 0, 0, 0.0)
+        undo_depth = len(self.board.undo_stack)
+        for depth in range(start_depth, max(max_depth, start_depth) + 1):
+            try:
+                score = self.search(color, depth, -INFINITY, INFINITY, 0)
+            except SearchAborted:
+                # Прерванный перебор оставил ходы на доске: возвращаем исходную позицию
+                while len(self.board.undo_stack) > undo_depth:
+                    self.board.unmake_move()
+                break
+            line = [to_text(move) for move in self.principal_variation(depth)]
+            result = AnalysisResult(score, line, depth, self.nodes, time.perf_counter() - started)
+            if abs(score) >= MATE - MAX_PLY:
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - started)
+
+
+def analyse(board, color, max_depth=MAX_PLY, time_limit=None, node_limit=None, table=None, values=None):
+    """Находит лучшую линию и оценку позиции.
+
+    Если не заданы ни глубина, ни бюджет, поиск ограничивается 1 секундой.
+
+    Args:
+        board (Board): Доска chess167 или chessbase (не изменяется).
+        color (str): Сторона, чей ход.
+        max_depth (int): Наибольшая глубина итеративного углубления.
+        time_limit (float): Бюджет времени в секундах.
+        node_limit (int): Бюджет узлов.
+        table: Таблица транспозиций (по умолчанию - новая).
+        values (dict): Ценность фигур, дополняющая PIECE_VALUES.
+
+    Returns:
+        AnalysisResult: (score, line, depth, nodes, seconds), где score - оценка
+            в сотых долях пешки для стороны `color`, line - ходы в формате 'e2e4'.
+    """
+    if max_depth == MAX_PLY and time_limit is None and node_limit is None:
+        time_limit = 1.0
+    return Searcher(board, table, values).iterate(color, max_depth, time_limit, node_limit)
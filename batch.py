@@ -0,0 +1,204 @@
+"""Пакетный анализ позиций chessbase/chess167 на NumPy.
+
+Позиции задаются массивом N x 64 (int8): 0 - пустая клетка, +код - белая
+фигура, -код - чёрная (коды из `moves.PIECE_CODES`, клетка row * 8 + col).
+Для всех N позиций сразу считаются маски атакованных клеток, число ходов и
+аналог `Board.get_threatened_pieces` - без обхода досок в Python.
+
+Правила хода берутся из того же реестра `movement`, что и у досок, поэтому
+новые фигуры поддерживаются без изменений этого модуля.
+
+Пример:
+    positions = encode_boards(boards)
+    threats, check = threatened_pieces(positions, 'W', variant='chess167')
+"""
+
+import numpy as np
+
+from movement import CAPTURE, INITIAL_ROWS, MOVE, Leaper, descriptor_mode, oriented, registry
+from moves import PIECE_CODES
+
+# Индекс клетки за пределами доски: лучи дополняются им до общей длины
+OFF_BOARD = 64
+CHUNK_SIZE = 4096
+
+_compiled = {}
+
+
+def encode_board(grid):
+    """Кодирует сетку `Board.grid` в вектор из 64 чисел (см. описание модуля)."""
+    encoded = np.zeros(64, dtype=np.int8)
+    for row in range(8):
+        for col in range(8):
+            piece = grid[row][col]
+            if piece:
+                code = PIECE_CODES[piece.name]
+                encoded[row * 8 + col] = code if piece.color == 'W' else -code
+    return encoded
+
+
+def encode_boards(boards):
+    """Кодирует доски в массив N x 64.
+
+    Args:
+        boards (iterable): Доски `Board` (или сетки `grid`).
+
+    Returns:
+        numpy.ndarray: Массив позиций (int8).
+    """
+    return np.array([encode_board(getattr(board, 'grid', board)) for board in boards], dtype=np.int8).reshape(-1, 64)
+
+
+def _compile(variant, name, color):
+    """Превращает дескрипторы движения в массивы лучей.
+
+    Returns:
+        list: Пары (режим, лучи), где лучи - массив D x 64 x R индексов клеток
+            (D - направлений, R - наибольшая длина луча), дополненный OFF_BOARD.
+    """
+    movement = registry(variant)[name]
+    key = (variant, name, color)
+    entry = _compiled.get(key)
+    if entry is not None and entry[0] is movement:
+        return entry[1]
+    parts = []
+    for descriptor in movement:
+        if isinstance(descriptor, Leaper):
+            directions, ranges = descriptor.offsets, None
+        else:
+            directions = descriptor.directions
+            ranges = [descriptor.initial_range if descriptor.initial_range is not None and
+                      sq // 8 == INITIAL_ROWS[color] else descriptor.max_range for sq in range(64)]
+        longest = 1 if ranges is None else max(ranges)
+        rays = np.full((len(directions), 64, longest), OFF_BOARD, dtype=np.int64)
+        for index, direction in enumerate(directions):
+            drow, dcol = oriented(direction, color)
+            for sq in range(64):
+                row, col = divmod(sq, 8)
+                for distance in range(1, (1 if ranges is None else ranges[sq]) + 1):
+                    new_row, new_col = row + drow * distance, col + dcol * distance
+                    if not (0 <= new_row < 8 and 0 <= new_col < 8):
+                        break
+                    rays[index, sq, distance - 1] = new_row * 8 + new_col
+        parts.append((descriptor_mode(descriptor), rays))
+    _compiled[key] = (movement, parts)
+    return parts
+
+
+def _reach(occupied, sources, rays):
+    """Клетки лучей, до которых фигуры-источники доходят без перепрыгивания.
+
+    Args:
+        occupied (numpy.ndarray): N x 65 занятость (столбец OFF_BOARD всегда занят).
+        sources (numpy.ndarray): N x 64 клетки с фигурами.
+        rays (numpy.ndarray): D x 64 x R лучи.
+
+    Returns:
+        numpy.ndarray: N x D x 64 x R признак достижимости клетки луча.
+    """
+    along = occupied[:, rays]
+    blocked = np.logical_or.accumulate(along, axis=3)
+    reachable = np.ones_like(along)
+    reachable[..., 1:] = ~blocked[..., :-1]
+    reachable &= rays != OFF_BOARD
+    return reachable & sources[:, None, :, None]
+
+
+def _chunks(positions, chunk_size):
+    for start in range(0, len(positions), chunk_size):
+        yield start, positions[start:start + chunk_size]
+
+
+def _pieces(variant, color):
+    """Пары (название, код со знаком цвета) фигур варианта."""
+    sign = 1 if color == 'W' else -1
+    return [(name, sign * PIECE_CODES[name]) for name in registry(variant)]
+
+
+def attack_maps(positions, color, variant='chess167', chunk_size=CHUNK_SIZE):
+    """Маски клеток, которые бьют фигуры цвета `color`, для каждой позиции.
+
+    Args:
+        positions (numpy.ndarray): Массив N x 64 позиций.
+        color (str): Цвет атакующих фигур ('W' или 'B').
+        variant (str): Вариант игры ('chessbase' или 'chess167').
+        chunk_size (int): Число позиций, обрабатываемых за раз (ограничивает память).
+
+    Returns:
+        numpy.ndarray: N x 64 (bool) - атакованные клетки.
+    """
+    positions = np.asarray(positions, dtype=np.int8).reshape(-1, 64)
+    result = np.zeros((len(positions), 64), dtype=bool)
+    for start, chunk in _chunks(positions, chunk_size):
+        count = len(chunk)
+        occupied = np.concatenate([chunk != 0, np.ones((count, 1), dtype=bool)], axis=1)
+        # Номер строки позиции в плоском массиве счётчиков: n * 65 + клетка
+        base = (np.arange(count) * (OFF_BOARD + 1))[:, None, None, None]
+        hits = np.zeros(count * (OFF_BOARD + 1), dtype=np.int64)
+        for name, code in _pieces(variant, color):
+            sources = chunk == code
+            if not sources.any():
+                continue
+            for mode, rays in _compile(variant, name, color):
+                if mode == MOVE:
+                    continue
+                reach = _reach(occupied, sources, rays)
+                hits += np.bincount((base + rays[None])[reach], minlength=hits.size)
+        result[start:start + count] = hits.reshape(count, OFF_BOARD + 1)[:, :64] > 0
+    return result
+
+
+def move_counts(positions, color, variant='chess167', chunk_size=CHUNK_SIZE):
+    """Число ходов стороны `color` в каждой позиции (как `len(Board.generate_moves(color))`).
+
+    Args:
+        positions (numpy.ndarray): Массив N x 64 позиций.
+        color (str): Цвет ходящей стороны.
+        variant (str): Вариант игры.
+        chunk_size (int): Число позиций, обрабатываемых за раз.
+
+    Returns:
+        numpy.ndarray: Вектор из N чисел.
+    """
+    positions = np.asarray(positions, dtype=np.int8).reshape(-1, 64)
+    result = np.zeros(len(positions), dtype=np.int64)
+    for start, chunk in _chunks(positions, chunk_size):
+        count = len(chunk)
+        occupied = np.concatenate([chunk != 0, np.ones((count, 1), dtype=bool)], axis=1)
+        # Содержимое клеток, столбец OFF_BOARD - пустой (лучи за доской отсекаются в `_reach`)
+        contents = np.concatenate([chunk, np.zeros((count, 1), dtype=np.int8)], axis=1)
+        enemy = contents < 0 if color == 'W' else contents > 0
+        for name, code in _pieces(variant, color):
+            sources = chunk == code
+            if not sources.any():
+                continue
+            for mode, rays in _compile(variant, name, color):
+                reach = _reach(occupied, sources, rays)
+                targets = np.zeros_like(reach)
+                if mode != CAPTURE:
+                    targets |= reach & ~occupied[:, rays]
+                if mode != MOVE:
+                    targets |= reach & enemy[:, rays]
+                result[start:start + count] += targets.sum(axis=(1, 2, 3))
+    return result
+
+
+def threatened_pieces(positions, color, variant='chess167', chunk_size=CHUNK_SIZE):
+    """Пакетный аналог `Board.get_threatened_pieces`.
+
+    Args:
+        positions (numpy.ndarray): Массив N x 64 позиций.
+        color (str): Цвет анализируемых фигур.
+        variant (str): Вариант игры.
+        chunk_size (int): Число позиций, обрабатываемых за раз.
+
+    Returns:
+        tuple: (threats, check), где threats - N x 64 (bool) клетки фигур
+            цвета `color` под боем, check - вектор из N флагов шаха.
+    """
+    positions = np.asarray(positions, dtype=np.int8).reshape(-1, 64)
+    attacked = attack_maps(positions, 'B' if color == 'W' else 'W', variant, chunk_size)
+    own = positions > 0 if color == 'W' else positions < 0
+    threats = attacked & own
+    king = positions == (PIECE_CODES['K'] if color == 'W' else -PIECE_CODES['K'])
+    return threats, (threats & king).any(axis=1)
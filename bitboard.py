@@ -0,0 +1,597 @@
+"""Битбордовое представление позиции для chessbase и chess167.
+
+Клетка (row, col) доски соответствует биту номер `row * 8 + col` 64-битного
+числа: бит 0 - поле a8, бит 63 - поле h1 (та же ориентация, что и у `Board.grid`).
+Атаки и ходы фигур строятся из дескрипторов движения реестра `movement`
+(у каждого варианта игры свой реестр).
+"""
+
+import json
+import os
+
+from movement import (BISHOP_DIRECTIONS, CAPTURE, MOVE, QUEEN_DIRECTIONS, ROOK_DIRECTIONS, STANDARD, Leaper, Rider,
+                      descriptor_mode, descriptor_rays, oriented, registry)
+from moves import CAPTURE as CAPTURE_FLAG
+from moves import PIECE_CODES, POSITIONS
+
+
+def square(pos):
+    """Переводит позицию (row, col) в номер клетки 0..63."""
+    return pos[0] * 8 + pos[1]
+
+
+def position(sq):
+    """Переводит номер клетки 0..63 в позицию (row, col)."""
+    return POSITIONS[sq]
+
+
+def on_board(pos):
+    """Проверяет, что позиция (row, col) лежит на доске."""
+    return 0 <= pos[0] < 8 and 0 <= pos[1] < 8
+
+
+def iter_bits(mask):
+    """Перебирает номера установленных битов маски по возрастанию.
+
+    Args:
+        mask (int): Битовая маска.
+
+    Yields:
+        int: Номер клетки.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def mask_positions(mask):
+    """Возвращает позиции (row, col) установленных битов маски.
+
+    Результаты кэшируются: на горячем пути одни и те же маски ходов
+    встречаются многократно, и кэш избавляет от обхода битов.
+
+    Args:
+        mask (int): Битовая маска.
+
+    Returns:
+        tuple: Позиции клеток по возрастанию номеров.
+    """
+    positions = _MASK_POSITIONS.get(mask)
+    if positions is None:
+        if len(_MASK_POSITIONS) >= MASK_CACHE_SIZE:
+            _MASK_POSITIONS.clear()
+        positions = _MASK_POSITIONS[mask] = tuple(POSITIONS[sq] for sq in iter_bits(mask))
+    return positions
+
+
+def quiet_moves(sq, mask):
+    """Возвращает упакованные тихие ходы с клетки `sq` на клетки маски (с кэшированием, как `mask_positions`)."""
+    key = mask << 6 | sq
+    packed = _QUIET_MOVES.get(key)
+    if packed is None:
+        if len(_QUIET_MOVES) >= MASK_CACHE_SIZE:
+            _QUIET_MOVES.clear()
+        packed = _QUIET_MOVES[key] = tuple(sq | target << 6 for target in iter_bits(mask))
+    return packed
+
+
+MASK_CACHE_SIZE = 1 << 16
+_MASK_POSITIONS = {}
+_QUIET_MOVES = {}
+
+
+def _ray_options(ray):
+    """Перечисляет варианты занятости луча и соответствующие им атаки.
+
+    Последняя клетка луча не влияет на атаки, поэтому перебираются только
+    подмножества остальных клеток.
+
+    Returns:
+        list: Пары (занятость, атаки).
+    """
+    options = []
+    relevant = ray[:-1]
+    for subset in range(1 << len(relevant)):
+        occupancy = attacks = 0
+        blocked = False
+        for index, target in enumerate(ray):
+            if not blocked:
+                attacks |= 1 << target
+            if index < len(relevant) and subset >> index & 1:
+                occupancy |= 1 << target
+                blocked = True
+        options.append((occupancy, attacks))
+    return options
+
+
+def build_slider_table(rider, color):
+    """Строит таблицу атак дальнобойного дескриптора для всех вариантов занятости.
+
+    Для каждой клетки берётся маска значимых клеток (клетки лучей без последней:
+    её занятость не меняет атаки), и для каждого её подмножества заранее
+    считаются атаки. Затем атаки читаются одним обращением
+    `table[sq][occupancy & masks[sq]]` - словарь по замаскированной занятости
+    играет роль magic/PEXT-индекса.
+
+    Args:
+        rider (Rider): Дескриптор движения.
+        color (str): Цвет фигуры.
+
+    Returns:
+        tuple: (masks, table) - маски значимых клеток и словари атак по клеткам.
+    """
+    masks, table = [], []
+    for sq in range(64):
+        attacks_by_occupancy = {0: 0}
+        for ray in descriptor_rays(rider, color, sq):
+            attacks_by_occupancy = {occupancy | ray_occupancy: attacks | ray_attacks
+                                    for occupancy, attacks in attacks_by_occupancy.items()
+                                    for ray_occupancy, ray_attacks in _ray_options(ray)}
+        masks.append(max(attacks_by_occupancy))
+        table.append(attacks_by_occupancy)
+    return masks, table
+
+
+def _direction_groups(directions):
+    """Делит направления на ладейные, слоновые и прочие, чтобы таблицы оставались небольшими."""
+    rook = tuple(direction for direction in directions if direction in ROOK_DIRECTIONS)
+    bishop = tuple(direction for direction in directions if direction in BISHOP_DIRECTIONS)
+    other = tuple((direction,) for direction in directions if direction not in QUEEN_DIRECTIONS)
+    return [group for group in (rook, bishop) if group] + list(other)
+
+
+def slider_table(rider, color):
+    """Возвращает (и при необходимости строит) таблицу атак дескриптора `rider`."""
+    symmetric = rider.initial_range is None and \
+        set(oriented(direction, 'B') for direction in rider.directions) == set(rider.directions)
+    key = (rider, 'W' if symmetric else color)
+    tables = _SLIDER_TABLES.get(key)
+    if tables is None:
+        tables = _SLIDER_TABLES[key] = build_slider_table(rider, key[1])
+        if _cache_path and _autosave:
+            # Таблица построена лениво (например, для фигуры, зарегистрированной после импорта)
+            _save_cache_quietly()
+    return tables
+
+
+def compile_movement(movement, color):
+    """Компилирует дескрипторы движения в список частей (режим, маски, таблица или None).
+
+    Args:
+        movement (tuple): Дескрипторы Leaper/Rider.
+        color (str): Цвет фигуры.
+
+    Returns:
+        tuple: (parts, slider) - части движения и флаг дальнобойной фигуры
+            (её атаки зависят от занятости доски).
+    """
+    key = (movement, color)
+    compiled = _COMPILED.get(key)
+    if compiled is not None:
+        return compiled
+    parts = []
+    slider = False
+    for descriptor in movement:
+        mode = descriptor_mode(descriptor)
+        if isinstance(descriptor, Leaper):
+            masks = [sum(1 << ray[0] for ray in descriptor_rays(descriptor, color, sq)) for sq in range(64)]
+            parts.append((mode, masks, None))
+            continue
+        for group in _direction_groups(descriptor.directions):
+            masks, table = slider_table(descriptor._replace(directions=group), color)
+            parts.append((mode, masks, table))
+            slider = slider or (mode != MOVE and any(masks))
+    compiled = _COMPILED[key] = (tuple(parts), slider)
+    return compiled
+
+
+def _compiled(variant, name, color):
+    """Возвращает скомпилированное движение фигуры варианта, перекомпилируя его при смене дескрипторов."""
+    movement = registry(variant)[name]
+    entry = _PARTS.get((variant, name, color))
+    if entry is None or entry[0] is not movement:
+        entry = _PARTS[(variant, name, color)] = (movement,) + compile_movement(movement, color)
+    return entry
+
+
+def _parts(variant, name, color):
+    """Возвращает части движения фигуры `name` варианта `variant`."""
+    return _compiled(variant, name, color)[1]
+
+
+def is_slider(variant, name):
+    """Проверяет, зависят ли атаки фигуры от занятости доски."""
+    return _compiled(variant, name, 'W')[2] or _compiled(variant, name, 'B')[2]
+
+
+def subsets(mask):
+    """Перебирает все подмножества маски (начиная с пустого) методом carry-rippler."""
+    subset = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if not subset:
+            return
+
+
+def load_slider_tables(path):
+    """Загружает таблицы атак из файла кэша.
+
+    Файл содержит только данные (JSON): для каждой таблицы - дескриптор, цвет,
+    маски значимых клеток и атаки в порядке перебора подмножеств маски.
+
+    Args:
+        path (str): Путь к файлу кэша.
+
+    Returns:
+        bool: True, если таблицы загружены.
+    """
+    try:
+        with open(path, encoding='utf-8') as cache:
+            data = json.load(cache)
+        if data.get('version') != SLIDER_CACHE_VERSION:
+            return False
+        tables = {}
+        for entry in data['tables']:
+            directions, max_range, initial_range, capture_only, move_only = entry['rider']
+            rider = Rider([tuple(direction) for direction in directions], max_range, initial_range,
+                          bool(capture_only), bool(move_only))
+            masks = [int(mask) for mask in entry['masks']]
+            table = [dict(zip(subsets(mask), attack_list)) for mask, attack_list in zip(masks, entry['attacks'])]
+            if len(table) != 64 or any(len(attacks_by_occupancy) != len(attack_list)
+                                       for attacks_by_occupancy, attack_list in zip(table, entry['attacks'])):
+                return False
+            tables[(rider, entry['color'])] = (masks, table)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return False
+    _SLIDER_TABLES.update(tables)
+    return True
+
+
+def save_slider_tables(path):
+    """Сохраняет все построенные таблицы атак в файл кэша (атомарно, через временный файл).
+
+    Args:
+        path (str): Путь к файлу кэша.
+    """
+    tables = [{
+        'rider': [[list(direction) for direction in rider.directions], rider.max_range, rider.initial_range,
+                  rider.capture_only, rider.move_only],
+        'color': color,
+        'masks': masks,
+        'attacks': [[attacks_by_occupancy[subset] for subset in subsets(mask)]
+                    for mask, attacks_by_occupancy in zip(masks, table)],
+    } for (rider, color), (masks, table) in _SLIDER_TABLES.items()]
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as cache:
+        json.dump({'version': SLIDER_CACHE_VERSION, 'tables': tables}, cache, separators=(',', ':'))
+    os.replace(temporary, path)
+
+
+def _save_cache_quietly():
+    """Сохраняет таблицы в файл кэша, не прерывая работу при ошибке записи."""
+    try:
+        save_slider_tables(_cache_path)
+    except OSError:
+        pass
+
+
+SLIDER_CACHE_VERSION = 3
+_SLIDER_TABLES = {}
+_COMPILED = {}
+_PARTS = {}
+
+
+def attacks(variant, name, color, sq, occupancy):
+    """Возвращает маску клеток, которые бьёт фигура.
+
+    Args:
+        variant (str): Вариант игры (ключ `movement.REGISTRIES`).
+        name (str): Тип фигуры.
+        color (str): Цвет фигуры ('W' или 'B').
+        sq (int): Клетка фигуры.
+        occupancy (int): Маска всех занятых клеток.
+
+    Returns:
+        int: Маска атакованных клеток (без учёта цвета фигур на них).
+    """
+    result = 0
+    for mode, masks, table in _parts(variant, name, color):
+        if mode != MOVE:
+            result |= masks[sq] if table is None else table[sq][occupancy & masks[sq]]
+    return result
+
+
+def moves_from_occupancy(variant, name, color, sq, own, enemy):
+    """Возвращает маску клеток, куда может пойти фигура.
+
+    Args:
+        variant (str): Вариант игры.
+        name (str): Тип фигуры.
+        color (str): Цвет фигуры.
+        sq (int): Клетка фигуры.
+        own (int): Маска клеток со своими фигурами.
+        enemy (int): Маска клеток с фигурами соперника.
+
+    Returns:
+        int: Маска целевых клеток.
+    """
+    occupancy = own | enemy
+    result = 0
+    for mode, masks, table in _parts(variant, name, color):
+        targets = masks[sq] if table is None else table[sq][occupancy & masks[sq]]
+        if mode == MOVE:
+            result |= targets & ~occupancy
+        elif mode == CAPTURE:
+            result |= targets & enemy
+        else:
+            result |= targets & ~own
+    return result
+
+
+# Таблицы стандартных фигур строятся один раз при импорте; путь в CHESS_SLIDER_CACHE
+# включает файловый кэш, который дописывается при ленивом построении новых таблиц
+_cache_path = os.environ.get('CHESS_SLIDER_CACHE')
+_autosave = False
+_cached_keys = set(_SLIDER_TABLES) if _cache_path and load_slider_tables(_cache_path) else set()
+for _movement in STANDARD.values():
+    for _color in ('W', 'B'):
+        compile_movement(_movement, _color)
+if _cache_path:
+    _autosave = True
+    if set(_SLIDER_TABLES) != _cached_keys:
+        _save_cache_quietly()
+
+
+class BitboardPosition:
+    """Позиция в виде битбордов: по одному 64-битному числу на тип и цвет фигуры.
+
+    Вместе с битбордами ведётся карта атак. Она обновляется лениво: изменения
+    позиции только отмечают затронутые клетки, а перед первым запросом атак
+    пересчитываются фигуры на этих клетках и дальнобойные фигуры, чьи лучи
+    через них проходят. Поэтому make/unmake в переборе не платят за карту атак.
+
+    Атрибуты:
+        variant (str): Вариант игры, по реестру которого строятся ходы и атаки.
+        pieces (dict): Маски фигур: pieces[color][name] -> int.
+        occupied (dict): Маски занятых клеток по цветам: occupied[color] -> int.
+        occupancy (int): Маска всех занятых клеток.
+        sliders (int): Маска клеток с дальнобойными фигурами (их атаки зависят от занятости).
+        squares (list): Для каждой клетки кортеж (color, name) или None.
+    """
+
+    def __init__(self, variant):
+        """Создаёт пустую позицию.
+
+        Args:
+            variant (str): Вариант игры (ключ `movement.REGISTRIES`).
+        """
+        self.variant = variant
+        self._registry = registry(variant)
+        # Скомпилированное движение по цветам: _movement[color][name] -> (дескрипторы, части, флаг)
+        self._movement = {'W': {}, 'B': {}}
+        self.pieces = {'W': {}, 'B': {}}
+        self.occupied = {'W': 0, 'B': 0}
+        self.occupancy = 0
+        self.sliders = 0
+        self.squares = [None] * 64
+        # Карта атак: что бьёт фигура на клетке, кто бьёт клетку, что бьёт каждый цвет
+        self._attacks_from = [0] * 64
+        self._attack_colors = [None] * 64
+        self._attackers_to = [0] * 64
+        self._attacked = {'W': 0, 'B': 0}
+        # Число атакующих фигур каждого цвета для каждой клетки
+        self._attack_counts = {'W': [0] * 64, 'B': [0] * 64}
+        # Клетки, изменённые после последнего обновления карты атак
+        self._dirty = 0
+
+    @classmethod
+    def from_grid(cls, grid, variant):
+        """Строит битборды по сетке `Board.grid` (карта атак строится при первом запросе).
+
+        Args:
+            grid (list): Двумерный список 8x8 с фигурами или None.
+            variant (str): Вариант игры.
+
+        Returns:
+            BitboardPosition: Позиция, соответствующая сетке.
+        """
+        position = cls(variant)
+        for row in range(8):
+            for col in range(8):
+                piece = grid[row][col]
+                if piece:
+                    position._put(piece.color, piece.name, row * 8 + col)
+        return position
+
+    def _entry(self, name, color):
+        """Возвращает скомпилированное движение фигуры (с проверкой смены дескрипторов в реестре)."""
+        entry = self._movement[color].get(name)
+        if entry is None or entry[0] is not self._registry[name]:
+            entry = self._movement[color][name] = _compiled(self.variant, name, color)
+        return entry
+
+    def _put(self, color, name, sq):
+        """Ставит фигуру на клетку."""
+        mask = 1 << sq
+        pieces = self.pieces[color]
+        pieces[name] = pieces.get(name, 0) | mask
+        self.occupied[color] |= mask
+        self.occupancy |= mask
+        self.squares[sq] = (color, name)
+        if self._entry(name, color)[2]:
+            self.sliders |= mask
+        self._dirty |= mask
+
+    def _take(self, color, name, sq):
+        """Снимает фигуру с клетки."""
+        mask = ~(1 << sq)
+        self.pieces[color][name] &= mask
+        self.occupied[color] &= mask
+        self.occupancy &= mask
+        self.sliders &= mask
+        self.squares[sq] = None
+        self._dirty |= 1 << sq
+
+    def add(self, color, name, sq):
+        """Ставит фигуру на пустую клетку `sq`."""
+        self._put(color, name, sq)
+
+    def remove(self, color, name, sq):
+        """Снимает фигуру с клетки `sq`."""
+        self._take(color, name, sq)
+
+    def move(self, color, name, start, end, captured=None):
+        """Переносит фигуру с клетки `start` на `end`.
+
+        Args:
+            color (str): Цвет фигуры.
+            name (str): Тип фигуры.
+            start (int): Исходная клетка.
+            end (int): Целевая клетка.
+            captured (tuple): (color, name) взятой фигуры или None.
+        """
+        start_bit = 1 << start
+        end_bit = 1 << end
+        both = start_bit | end_bit
+        if captured:
+            self.pieces[captured[0]][captured[1]] ^= end_bit
+            self.occupied[captured[0]] ^= end_bit
+            self.sliders &= ~end_bit
+        self.pieces[color][name] ^= both
+        self.occupied[color] ^= both
+        self.occupancy = (self.occupancy | end_bit) & ~start_bit
+        if self.sliders & start_bit:
+            self.sliders ^= both
+        squares = self.squares
+        squares[end] = squares[start]
+        squares[start] = None
+        self._dirty |= both
+
+    def _set_attacks(self, sq, color, new):
+        """Заменяет атаки фигуры на клетке `sq` (цвета `color`) и правит обратные индексы."""
+        old = self._attacks_from[sq]
+        old_color = self._attack_colors[sq]
+        if old == new and old_color == color:
+            return
+        bit = 1 << sq
+        attackers_to = self._attackers_to
+        if old_color == color:
+            removed, added = old & ~new, new & ~old
+        else:
+            removed, added = old, new
+        if removed:
+            counts = self._attack_counts[old_color]
+            attacked = self._attacked[old_color]
+            for target in iter_bits(removed):
+                attackers_to[target] &= ~bit
+                counts[target] -= 1
+                if not counts[target]:
+                    attacked &= ~(1 << target)
+            self._attacked[old_color] = attacked
+        if added:
+            counts = self._attack_counts[color]
+            for target in iter_bits(added):
+                attackers_to[target] |= bit
+                counts[target] += 1
+            self._attacked[color] |= added
+        self._attacks_from[sq] = new
+        self._attack_colors[sq] = color if new else None
+
+    def _sync(self):
+        """Приводит карту атак в соответствие с позицией.
+
+        Пересчитываются фигуры на изменённых клетках и дальнобойные фигуры,
+        которые (по старой карте) били хотя бы одну изменённую клетку: только
+        их лучи могли удлиниться или укоротиться.
+        """
+        dirty = self._dirty
+        if not dirty:
+            return
+        self._dirty = 0
+        affected = 0
+        attackers_to = self._attackers_to
+        for sq in iter_bits(dirty):
+            affected |= attackers_to[sq]
+        affected &= self.sliders & ~dirty
+        squares = self.squares
+        occupancy = self.occupancy
+        for sq in iter_bits(dirty):
+            piece = squares[sq]
+            if piece is None:
+                self._set_attacks(sq, None, 0)
+            else:
+                self._set_attacks(sq, piece[0], attacks(self.variant, piece[1], piece[0], sq, occupancy))
+        for sq in iter_bits(affected):
+            color, name = squares[sq]
+            self._set_attacks(sq, color, attacks(self.variant, name, color, sq, occupancy))
+
+    def moves_from(self, name, color, sq):
+        """Маска клеток, куда может пойти фигура с клетки `sq`.
+
+        Args:
+            name (str): Тип фигуры.
+            color (str): Цвет фигуры.
+            sq (int): Клетка фигуры.
+
+        Returns:
+            int: Маска целевых клеток (пустых или занятых соперником).
+        """
+        own = self.occupied[color]
+        occupancy = self.occupancy
+        result = 0
+        for mode, masks, table in self._entry(name, color)[1]:
+            targets = masks[sq] if table is None else table[sq][occupancy & masks[sq]]
+            if mode == MOVE:
+                result |= targets & ~occupancy
+            elif mode == CAPTURE:
+                result |= targets & occupancy & ~own
+            else:
+                result |= targets & ~own
+        return result
+
+    def fill_moves(self, color, buffer):
+        """Дописывает в буфер упакованные ходы всех фигур цвета `color` (см. модуль `moves`).
+
+        Args:
+            color (str): Цвет ходящей стороны.
+            buffer (MoveList): Буфер, в который добавляются ходы.
+        """
+        squares = self.squares
+        occupancy = self.occupancy
+        moves = buffer.moves
+        count = buffer.count
+        for sq in iter_bits(self.occupied[color]):
+            targets = self.moves_from(squares[sq][1], color, sq)
+            quiet = targets & ~occupancy
+            if quiet:
+                packed = _QUIET_MOVES.get(quiet << 6 | sq) or quiet_moves(sq, quiet)
+                moves[count:count + len(packed)] = packed
+                count += len(packed)
+            captures = targets & occupancy
+            if captures:
+                for target in iter_bits(captures):
+                    move = sq | target << 6 | CAPTURE_FLAG << 12 | PIECE_CODES[squares[target][1]] << 20
+                    try:
+                        moves[count] = move
+                    except IndexError:
+                        moves.append(move)
+                    count += 1
+        buffer.count = count
+
+    def attacks_of(self, sq):
+        """Маска клеток, которые бьёт фигура на клетке `sq` (0 для пустой клетки)."""
+        self._sync()
+        return self._attacks_from[sq]
+
+    def attacked_by(self, color):
+        """Маска всех клеток, которые бьют фигуры цвета `color`."""
+        self._sync()
+        return self._attacked[color]
+
+    def attackers_of(self, sq, color=None):
+        """Маска клеток фигур цвета `color` (или обоих цветов), которые бьют клетку `sq`."""
+        self._sync()
+        attackers = self._attackers_to[sq]
+        return attackers if color is None else attackers & self.occupied[color]
@@ -1,30 +1,97 @@
+import argparse
+import contextlib
 import string
+import sys
+
+import instrument
+from bitboard import POSITIONS, BitboardPosition, iter_bits, mask_positions, on_board
+from exchange import threat_report
+from fen import format_fen, parse_fen
+from moves import MoveList
+from movement import (BISHOP_DIRECTIONS, QUEEN_DIRECTIONS, STANDARD, Leaper, Rider, can_move, fill_moves,
+                      generate_moves, reach_masks, register)
+from position_store import pack, unpack_grid
+from render import screen
+from zobrist import ZobristKeys
+
+VARIANT = 'chess167'
+ZOBRIST = ZobristKeys('PRNBQKUDS')
 
 
 class Piece:
     """Базовый класс для шахматных фигур (включая новые: Единорог, Дракон, Мудрец).
 
+    Правила хода задаются не методами, а дескрипторами `MOVEMENT` (см. модуль
+    `movement`): при объявлении дочернего класса они регистрируются в общем
+    реестре, откуда их берут и сетка, и битборды. Экземпляры неизменяемы и
+    общие: `Pawn('W')` всегда возвращает один и тот же объект.
+
     Атрибуты:
         SYMBOLS (dict): Словарь Unicode-символов фигур (стандартные + новые).
+        NAME (str): Тип фигуры (ключ из SYMBOLS), задаётся в дочерних классах.
+        MOVEMENT (tuple): Дескрипторы движения Leaper/Rider, задаются в дочерних классах.
         color (str): Цвет фигуры ('W' - белые, 'B' - чёрные).
         name (str): Название фигуры (ключ из SYMBOLS).
         symbol (str): Символ фигуры с учётом цвета.
     """
+    __slots__ = ('color', 'name', 'symbol')
+
     SYMBOLS = {'P': '♙', 'R': '♖', 'N': '♘', 'B': '♗', 'Q': '♕', 'K': '♔', 'U': '∆', 'D': '⊱', 'S': '⊞'}
+    NAME = None
+    MOVEMENT = ()
+    _instances = {}
 
-    def __init__(self, color, name):
-        """Инициализирует фигуру с цветом и типом.
+    def __init_subclass__(cls, **kwargs):
+        """Регистрирует движение нового типа фигуры в реестре варианта chess167."""
+        super().__init_subclass__(**kwargs)
+        if cls.NAME:
+            register(VARIANT, cls.NAME, cls.MOVEMENT)
+
+    def __new__(cls, color, name=None):
+        """Возвращает общий экземпляр фигуры с заданным цветом и названием.
+
+        Фигуры неизменяемы, поэтому все клетки всех досок (и превращения)
+        разделяют один объект на каждую пару (тип, цвет): расстановка и
+        проверка ходов не создают новых объектов.
 
         Args:
-            color (str): 'W' (белые) или 'B' (чёрные).
-            name (str): Тип фигуры (например, 'P' для пешки).
+            color (str): Цвет фигуры ('W' или 'B').
+            name (str): Название фигуры (ключ из SYMBOLS); по умолчанию - NAME класса.
+
+        Returns:
+            Piece: Единственный экземпляр для (класс, цвет, название).
         """
-        self.color = color
-        self.name = name
-        self.symbol = self.SYMBOLS[name] if color == 'W' else self.SYMBOLS[name].lower()
+        name = name or cls.NAME
+        key = (cls, color, name)
+        piece = Piece._instances.get(key)
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            object.__setattr__(piece, 'name', name)
+            object.__setattr__(piece, 'symbol', cls.SYMBOLS[name] if color == 'W' else cls.SYMBOLS[name].lower())
+            Piece._instances[key] = piece
+        return piece
+
+    def __setattr__(self, attr, value):
+        """Запрещает изменять общие экземпляры фигур."""
+        raise AttributeError(f"Фигура {self.name} неизменяема")
+
+    def __reduce__(self):
+        """При распаковке (pickle) возвращается тот же общий экземпляр."""
+        return self.__class__, (self.color, self.name)
+
+    def __copy__(self):
+        """Копия неизменяемой фигуры - она сама."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Глубокая копия неизменяемой фигуры - она сама."""
+        return self
 
     def is_valid_move(self, start, end, board):
-        """Проверяет допустимость хода (базовая реализация всегда False).
+        """Проверяет ход фигуры на клетку `end`.
+
+        Просматриваются только лучи, ведущие в `end`, список всех ходов не строится.
 
         Args:
             start (tuple): Начальная позиция (row, col).
@@ -32,351 +99,196 @@ class Piece:
             board (list): Текущее состояние доски.
 
         Returns:
-            bool: False (переопределяется в дочерних классах).
+            bool: True, если ход допустим.
         """
-        return False
+        return can_move(self.MOVEMENT, self.color, start, end, board)
 
     def get_possible_moves(self, start, board):
-        """Возвращает возможные ходы (пустой список по умолчанию).
+        """Возвращает возможные ходы по дескрипторам `MOVEMENT`.
 
         Args:
             start (tuple): Текущая позиция фигуры.
-            Board (list): Доска.
+            board (list): Доска.
 
         Returns:
-            list: Пустой список (переопределяется в дочерних классах).
+            list: Список кортежей (row, col) допустимых ходов.
         """
-        return []
-
-    def get_possible_moves_unicorn(self, start, board):
-        """Возможные ходы для Единорога (пустой список по умолчанию)."""
-        return []
-
-    def get_possible_moves_dragon(self, start, board):
-        """Возможные ходы для Дракона (пустой список по умолчанию)."""
-        return []
-
-    def get_possible_moves_sage(self, start, board):
-        """Возможные ходы для Мудреца (пустой список по умолчанию)."""
-        return []
+        return generate_moves(self.MOVEMENT, self.color, start, board)
 
 
 class Pawn(Piece):
-    """Класс пешки. Наследует Piece."""
-
-    def __init__(self, color):
-        super().__init__(color, 'P')
-
-    def is_valid_move(self, start, end, board):
-        """Проверяет допустимость хода пешки.
-
-        Пешка может:
-        - Идти на 1 клетку вперёд.
-        - Идти на 2 клетки с начальной позиции.
-        - Бить по диагонали.
-
-        Returns:
-            bool: True, если ход допустим.
-        """
-        direction = -1 if self.color == 'W' else 1
-        start_row, start_col = start
-        end_row, end_col = end
-
-        # Одно поле вперед
-        if start_col == end_col and end_row == start_row + direction and board[end_row][end_col] is None:
-            return True
-
-        # Два поля вперед
-        if start_col == end_col and start_row == (
-        6 if self.color == 'W' else 1) and end_row == start_row + 2 * direction and \
-                board[end_row][end_col] is None and board[start_row + direction][end_col] is None:
-            return True
-
-        # Ход по диагонали для взятия
-        if abs(start_col - end_col) == 1 and end_row == start_row + direction:
-            return board[end_row][end_col] is not None and board[end_row][end_col].color != self.color
-
-        return False
+    """Класс пешки. Наследует Piece.
 
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы пешки.
-
-        Returns:
-            list: Список кортежей (row, col) допустимых ходов.
-        """
-        moves = []
-        direction = -1 if self.color == 'W' else 1
-        start_row, start_col = start
-
-        # Одно поле вперед
-        if 0 <= start_row + direction < 8 and board[start_row + direction][start_col] is None:
-            moves.append((start_row + direction, start_col))
-
-        # Два поля вперед (если на начальной позиции)
-        if (self.color == 'W' and start_row == 6) or (self.color == 'B' and start_row == 1):
-            if 0 <= start_row + 2 * direction < 8 and board[start_row + 2 * direction][start_col] is None:
-                moves.append((start_row + 2 * direction, start_col))
-
-        # Взятие по диагонали
-        for col_offset in [-1, 1]:
-            new_col = start_col + col_offset
-            if 0 <= start_row + direction < 8 and 0 <= new_col < 8:
-                if board[start_row + direction][new_col] and board[start_row + direction][new_col].color != self.color:
-                    moves.append((start_row + direction, new_col))
-
-        return moves
+    Пешка может:
+    - Идти на 1 клетку вперёд.
+    - Идти на 2 клетки с начальной позиции.
+    - Бить по диагонали.
+    """
+    __slots__ = ()
+    NAME = 'P'
+    MOVEMENT = STANDARD['P']
 
 
 class Rook(Piece):
-    """Класс ладьи. Наследует Piece."""
-
-    def __init__(self, color):
-        super().__init__(color, 'R')
-
-    def is_valid_move(self, start, end, board):
-        """Проверяет, есть ли end в возможных ходах ладьи."""
-        return end in self.get_possible_moves(start, board)
-
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы ладьи (по горизонтали/вертикали)."""
-        moves = []
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # вертикально и горизонтально
-        for direction in directions:
-            row, col = start
-            while True:
-                row += direction[0]
-                col += direction[1]
-                if 0 <= row < 8 and 0 <= col < 8:
-                    if board[row][col] is None:
-                        moves.append((row, col))
-                    elif board[row][col].color != self.color:
-                        moves.append((row, col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        return moves
+    """Класс ладьи. Наследует Piece. Ходит по горизонтали и вертикали."""
+    __slots__ = ()
+    NAME = 'R'
+    MOVEMENT = STANDARD['R']
 
 
 class Knight(Piece):
-    """Класс коня. Наследует Piece."""
+    """Класс коня. Наследует Piece. Ходит буквой 'Г'."""
+    __slots__ = ()
+    NAME = 'N'
+    MOVEMENT = STANDARD['N']
 
-    def __init__(self, color):
-        super().__init__(color, 'N')
 
-    def is_valid_move(self, start, end, board):
-        """Проверяет ход коня (буквой 'Г')."""
-        return end in self.get_possible_moves(start, board)
+class Bishop(Piece):
+    """Класс слона. Наследует Piece. Ходит по диагонали."""
+    __slots__ = ()
+    NAME = 'B'
+    MOVEMENT = STANDARD['B']
 
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы коня."""
-        moves = []
-        row, col = start
-        directions = [
-            (-2, -1), (-2, 1), (2, -1), (2, 1),
-            (-1, -2), (-1, 2), (1, -2), (1, 2)
-        ]
-        for direction in directions:
-            new_row, new_col = row + direction[0], col + direction[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board[new_row][new_col] is None or board[new_row][new_col].color != self.color:
-                    moves.append((new_row, new_col))
-        return moves
 
+class Queen(Piece):
+    """Класс ферзя. Наследует Piece. Ходит как ладья и слон."""
+    __slots__ = ()
+    NAME = 'Q'
+    MOVEMENT = STANDARD['Q']
 
-class Bishop(Piece):
-    """Класс слона. Наследует Piece."""
 
-    def __init__(self, color):
-        super().__init__(color, 'B')
+class King(Piece):
+    """Класс короля. Наследует Piece. Ходит на 1 клетку в любом направлении."""
+    __slots__ = ()
+    NAME = 'K'
+    MOVEMENT = STANDARD['K']
 
-    def is_valid_move(self, start, end, board):
-        """Проверяет диагональный ход слона."""
-        return end in self.get_possible_moves(start, board)
 
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы слона."""
-        moves = []
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]  # по диагоналям
-        for direction in directions:
-            row, col = start
-            while True:
-                row += direction[0]
-                col += direction[1]
-                if 0 <= row < 8 and 0 <= col < 8:
-                    if board[row][col] is None:
-                        moves.append((row, col))
-                    elif board[row][col].color != self.color:
-                        moves.append((row, col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        return moves
+# Новые фигуры
+class Unicorn(Piece):
+    """Класс Единорога. Наследует Piece. Прыгает ровно на 3 клетки по диагонали."""
+    __slots__ = ()
+    NAME = 'U'
+    MOVEMENT = (Leaper([(3 * drow, 3 * dcol) for drow, dcol in BISHOP_DIRECTIONS]),)
 
 
-class Queen(Piece):
-    """Класс ферзя. Наследует Piece."""
+class Dragon(Piece):
+    """Класс Дракона. Наследует Piece. Ходит как ферзь, но максимум на 3 клетки."""
+    __slots__ = ()
+    NAME = 'D'
+    MOVEMENT = (Rider(QUEEN_DIRECTIONS, max_range=3),)
 
-    def __init__(self, color):
-        super().__init__(color, 'Q')
 
-    def is_valid_move(self, start, end, board):
-        """Проверяет ход ферзя (как ладья + слон)."""
-        return end in self.get_possible_moves(start, board)
+class Sage(Piece):
+    """Класс Мудреца. Наследует Piece. Ходит как король, но только по диагонали."""
+    __slots__ = ()
+    NAME = 'S'
+    MOVEMENT = (Leaper(BISHOP_DIRECTIONS),)
 
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы ферзя."""
-        moves = []
-        directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # горизонтальные и вертикальные
-            (-1, -1), (-1, 1), (1, -1), (1, 1)  # диагонали
-        ]
-        for direction in directions:
-            row, col = start
-            while True:
-                row += direction[0]
-                col += direction[1]
-                if 0 <= row < 8 and 0 <= col < 8:
-                    if board[row][col] is None:
-                        moves.append((row, col))
-                    elif board[row][col].color != self.color:
-                        moves.append((row, col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        return moves
 
+# Классы фигур по букве FEN
+PIECE_CLASSES = {cls.NAME: cls for cls in (Pawn, Rook, Knight, Bishop, Queen, King, Unicorn, Dragon, Sage)}
 
-class King(Piece):
-    """Класс короля. Наследует Piece."""
 
-    def __init__(self, color):
-        super().__init__(color, 'K')
+class Board:
+    """Класс шахматной доски (включая новые фигуры).
 
-    def is_valid_move(self, start, end, board):
-        """Проверяет ход короля (на 1 клетку в любом направлении)."""
-        return end in self.get_possible_moves(start, board)
+    Атрибуты:
+        BACKENDS (tuple): Допустимые представления позиции.
+        grid (list): Сетка 8x8 с фигурами (используется для отображения).
+        bitboards (BitboardPosition): Битборды позиции или None для представления 'grid'.
+        zobrist_key (int): Zobrist-ключ текущей позиции (с учётом очереди хода).
+        history (list): Ключи всех позиций партии, начиная с исходной.
+        undo_stack (list): Записи для отмены ходов, сделанных через `make_move`.
+        move_cache_hits (int): Сколько раз ходы фигуры взяты из кэша ходов по клеткам.
+        move_cache_misses (int): Сколько раз ходы фигуры пришлось построить заново.
+    """
 
-    def get_possible_moves(self, start, board):
-        """Возвращает все возможные ходы короля."""
-        moves = []
-        row, col = start
-        directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # горизонтальные и вертикальные
-            (-1, -1), (-1, 1), (1, -1), (1, 1)  # диагонали
-        ]
-        for direction in directions:
-            new_row, new_col = row + direction[0], col + direction[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board[new_row][new_col] is None or board[new_row][new_col].color != self.color:
-                    moves.append((new_row, new_col))
-        return moves
+    BACKENDS = ('grid', 'bitboard')
 
+    def __init__(self, backend='grid'):
+        """Инициализирует доску и расставляет фигуры.
 
-# Новые фигуры
-class Unicorn(Piece):
-    """Класс Единорога. Наследует Piece. Ходит на 3 клетки по диагонали."""
-
-    def __init__(self, color):
-        super().__init__(color, 'U')
-
-    def is_valid_move_sage(self, start, end, board):
-        """Проверяет ход Единорога (строго на 3 клетки по диагонали)."""
-        start_row, start_col = start
-        end_row, end_col = end
-        return abs(start_row - end_row) == abs(start_col - end_col) and abs(
-            start_row - end_row) == 3
-
-    def get_possible_moves_unicorn(self, start, board):
-        """Возвращает возможные ходы Единорога."""
-        moves = []
-        row, col = start
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]  # по диагоналям
-        for direction in directions:
-            new_row, new_col = row + 3 * direction[0], col + 3 * direction[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board[new_row][new_col] is None:
-                    moves.append((new_row, new_col))
-                elif board[new_row][new_col].color != self.color:
-                    moves.append((new_row, new_col))
-        return moves
+        Args:
+            backend (str): 'grid' - ходы и угрозы считаются обходом сетки,
+                'bitboard' - битовыми операциями над битбордами.
+        """
+        self.grid = [[None] * 8 for _ in range(8)]
+        self.setup_pieces()
+        self._attach(self.grid, backend)
 
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        """Создаёт доску по строке FEN без расстановки и проигрывания ходов.
 
-class Dragon(Piece):
-    """Класс Дракона. Наследует Piece. Ходит как ферзь, но максимум на 3 клетки."""
+        Args:
+            fen (str): Строка FEN (см. модуль fen; U - единорог, D - дракон, S - мудрец).
+            backend (str): Представление доски.
 
-    def __init__(self, color):
-        super().__init__(color, 'D')
-
-    def is_valid_move_sage(self, start, end, board):
-        """Проверяет ход Дракона (как ферзь, но до 3 клеток)."""
-        start_row, start_col = start
-        end_row, end_col = end
-        return abs(start_row - end_row) == abs(
-            start_col - end_col) or start_row == end_row or start_col == end_col
-
-    def get_possible_moves_dragon(self, start, board):
-        """Возвращает возможные ходы Дракона."""
-        moves = []
-        directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # вертикально и горизонтально
-            (-1, -1), (-1, 1), (1, -1), (1, 1)  # по диагоналям
-        ]
-        for direction in directions:
-            for distance in range(1, 4):  # ходим на максимум 3 клетки
-                row, col = start
-                row += direction[0] * distance
-                col += direction[1] * distance
-                if 0 <= row < 8 and 0 <= col < 8:
-                    if board[row][col] is None:
-                        moves.append((row, col))
-                    elif board[row][col].color != self.color:
-                        moves.append((row, col))
-                        break
-                    else:
-                        break
-                else:
-                    break
-        return moves
+        Returns:
+            Board: Доска в заданной позиции.
 
+        Raises:
+            ValueError: Если строка не является допустимой FEN.
+        """
+        grid, side, _ = parse_fen(fen, PIECE_CLASSES)
+        return cls._from_grid(grid, side, backend)
+
+    @classmethod
+    def _from_grid(cls, grid, side, backend):
+        """Создаёт доску с готовой сеткой (ключ позиции учитывает очередь хода `side`)."""
+        board = cls.__new__(cls)
+        board._attach(grid, backend, side)
+        return board
+
+    def _attach(self, grid, backend, side='W'):
+        """Устанавливает сетку и строит по ней битборды, ключ и историю позиции."""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Неизвестное представление доски: {backend}")
+        self.grid = grid
+        self.bitboards = BitboardPosition.from_grid(self.grid, VARIANT) if backend == 'bitboard' else None
+        # Для представления 'grid' - битборды с картой атак для отчёта об угрозах: строятся
+        # при первом отчёте и дальше обновляются ходами, как `bitboards`
+        self._exchange = None
+        self.zobrist_key = ZOBRIST.hash_grid(self.grid, side)
+        self.history = [self.zobrist_key]
+        self.undo_stack = []
+        # Кэш ходов: клетка -> (ходы фигуры, маска клеток, от которых они зависят).
+        # Ход только отмечает затронутые клетки, устаревшие записи удаляются при следующем чтении
+        self._move_cache = {}
+        self._touched = 0
+        self.move_cache_hits = 0
+        self.move_cache_misses = 0
+
+    def to_fen(self, side='W', fullmove=1):
+        """Записывает позицию в FEN.
 
-class Sage(Piece):
-    """Класс Мудреца. Наследует Piece. Ходит как король, но только по диагонали."""
+        Args:
+            side (str): Очередь хода.
+            fullmove (int): Номер хода.
 
-    def __init__(self, color):
-        super().__init__(color, 'S')
-
-    def is_valid_move_sage(self, start, end, board):
-        """Проверяет ход Мудреца (на 1 клетку по диагонали)."""
-        start_row, start_col = start
-        end_row, end_col = end
-        return abs(start_row - end_row) == 1 and abs(start_col - end_col) == 1
-
-    def get_possible_moves_sage(self, start, board):
-        """Возвращает возможные ходы Мудреца."""
-        moves = []
-        row, col = start
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]  # только по диагоналям
-        for direction in directions:
-            new_row, new_col = row + direction[0], col + direction[1]
-            if 0 <= new_row < 8 and 0 <= new_col < 8:
-                if board[new_row][new_col] is None or board[new_row][new_col].color != self.color:
-                    moves.append((new_row, new_col))
-        return moves
+        Returns:
+            str: Строка FEN.
+        """
+        return format_fen(self.grid, side, fullmove)
 
+    @classmethod
+    def from_packed(cls, record, backend='grid'):
+        """Создаёт доску по двоичной записи позиции (см. модуль position_store).
 
-class Board:
-    """Класс шахматной доски (включая новые фигуры)."""
+        Args:
+            record (bytes | memoryview): Запись позиции.
+            backend (str): Представление доски.
 
-    def __init__(self):
-        """Инициализирует доску и расставляет фигуры."""
-        self.grid = [[None] * 8 for _ in range(8)]
-        self.setup_pieces()
+        Returns:
+            Board: Доска в записанной позиции (ключ учитывает очередь хода).
+        """
+        grid, side = unpack_grid(record, PIECE_CLASSES)
+        return cls._from_grid(grid, side, backend)
+
+    def to_packed(self, side='W'):
+        """Записывает позицию в двоичном виде (41 байт, см. модуль position_store)."""
+        return pack(self.grid, side)
 
     def setup_pieces(self):
         """Расставляет фигуры в начальные позиции (стандартные + новые)."""
@@ -397,51 +309,124 @@ class Board:
             self.grid[4][i + 2] = piece('W')
 
     def display(self, move_count, threats=None, check=False):
-        """Отображает доску с подсветкой угроз и шаха.
+        """Отображает доску с подсветкой угроз и шаха (кадр выводится одним вызовом, см. модуль render).
 
         Args:
             move_count (int): Номер текущего хода.
             threats (set): Множество позиций под угрозой.
             check (bool): Флаг шаха.
         """
-        print(f"Ход: {move_count}")
-        if check:
-            print("Шах королю!")
-        print("   a b c d e f g h")
-        print("  ----------------")
-        for row in range(8):
-            print(8 - row, end="| ")
-            for col in range(8):
-                if threats and (row, col) in threats:
-                    print('!', end=' ')
-                elif self.grid[row][col]:
-                    print(self.grid[row][col].symbol, end=' ')
-                else:
-                    print('.', end=' ')
-            print(f"| {8 - row}")
-        print("  ----------------")
-        print("   a b c d e f g h")
+        status = [f"Ход: {move_count}", "Шах королю!" if check else ""]
+        screen().render(self.grid, status, dict.fromkeys(threats or (), 'threat'))
 
     def display_with_hints(self, hints):
-        """Отображает доску с подсказками (возможные ходы отмечены '*').
+        """Отображает доску с подсказками (возможные ходы выделены цветом или '*').
 
         Args:
             hints (list): Список возможных ходов.
         """
-        print("Подсказка: возможные ходы отмечены *")
+        screen().render(self.grid, ["Подсказка: возможные ходы выделены"], dict.fromkeys(hints, 'hint'))
+
+    def get_moves(self, start):
+        """Возвращает все возможные ходы фигуры, стоящей на позиции `start`.
+
+        Ходы кэшируются по клеткам и пересчитываются, только если ход изменил
+        клетку, от которой они зависят (см. `movement.reach_masks`).
+
+        Args:
+            start (tuple): Позиция фигуры (row, col).
+
+        Returns:
+            list: Список кортежей (row, col) допустимых ходов (пустой для пустой клетки);
+                список общий с кэшем, изменять его нельзя.
+        """
+        piece = self.grid[start[0]][start[1]]
+        if not piece:
+            return []
+        sq = start[0] * 8 + start[1]
+        moves = self._cached_moves(sq)
+        if moves is not None:
+            return moves
+        self.move_cache_misses += 1
+        if self.bitboards is not None:
+            moves = list(mask_positions(self.bitboards.moves_from(piece.name, piece.color, sq)))
+        else:
+            moves = piece.get_possible_moves(start, self.grid)
+        self._move_cache[sq] = (moves, reach_masks(piece.MOVEMENT, piece.color)[sq])
+        return moves
+
+    def _cached_moves(self, sq):
+        """Возвращает ходы фигуры на клетке `sq` из кэша или None.
+
+        Перед чтением удаляются записи, зависящие от клеток, затронутых ходами с прошлого чтения.
+        """
+        if self._touched:
+            touched = self._touched
+            self._touched = 0
+            cache = self._move_cache
+            for key in [key for key, (_, reach) in cache.items() if reach & touched]:
+                del cache[key]
+        entry = self._move_cache.get(sq)
+        if entry is None:
+            return None
+        self.move_cache_hits += 1
+        return entry[0]
+
+    def invalidate_moves(self):
+        """Очищает кэш ходов и карту атак (нужно после изменения `grid` в обход `make_move`)."""
+        self._move_cache.clear()
+        self._touched = 0
+        self._exchange = None
+
+    def generate_moves(self, color):
+        """Возвращает все ходы фигур цвета `color`.
+
+        Args:
+            color (str): Цвет ходящей стороны.
+
+        Returns:
+            list: Список пар (start, end).
+        """
+        bitboards = self.bitboards
+        if bitboards is not None:
+            squares = bitboards.squares
+            return [(POSITIONS[sq], end) for sq in iter_bits(bitboards.occupied[color])
+                    for end in mask_positions(bitboards.moves_from(squares[sq][1], color, sq))]
+        starts = [(row, col) for row in range(8) for col in range(8)
+                  if self.grid[row][col] and self.grid[row][col].color == color]
+        return [(start, end) for start in starts for end in self.get_moves(start)]
+
+    def fill_moves(self, color, buffer=None):
+        """Заполняет буфер упакованными ходами фигур цвета `color` (см. модуль `moves`).
+
+        В отличие от `generate_moves`, не создаёт кортежей и списков: буфер
+        переиспользуется между вызовами.
+
+        Args:
+            color (str): Цвет ходящей стороны.
+            buffer (MoveList): Буфер для ходов (по умолчанию создаётся новый).
+
+        Returns:
+            MoveList: Тот же буфер с ходами.
+        """
+        if buffer is None:
+            buffer = MoveList()
+        buffer.clear()
+        if self.bitboards is not None:
+            self.bitboards.fill_moves(color, buffer)
+            return buffer
         for row in range(8):
             for col in range(8):
-                if (row, col) in hints:
-                    print('*', end=' ')
-                elif self.grid[row][col]:
-                    print(self.grid[row][col].symbol, end=' ')
-                else:
-                    print('.', end=' ')
-            print()
+                piece = self.grid[row][col]
+                if piece and piece.color == color:
+                    fill_moves(piece.MOVEMENT, color, (row, col), self.grid, buffer)
+        return buffer
 
     def move_piece(self, start, end):
         """Перемещает фигуру, если ход допустим.
 
+        Ход попадает в стек отмены, как и в `make_move`, поэтому его можно отменить через `unmake_move`.
+
         Args:
             start (tuple): Начальная позиция.
             end (tuple): Конечная позиция.
@@ -449,24 +434,95 @@ class Board:
         Returns:
             bool: Успешность перемещения.
         """
-        piece = self.grid[start[0]][start[1]]
-        if piece:
-            possible_moves = []
-
-            if isinstance(piece, Unicorn):
-                possible_moves = piece.get_possible_moves_unicorn(start, self.grid)
-            elif isinstance(piece, Dragon):
-                possible_moves = piece.get_possible_moves_dragon(start, self.grid)
-            elif isinstance(piece, Sage):
-                possible_moves = piece.get_possible_moves_sage(start, self.grid)
-            else:
-                possible_moves = piece.get_possible_moves(start, self.grid)
+        return self.make_move(start, end)
 
-            if end in possible_moves:
-                self.grid[end[0]][end[1]] = piece
-                self.grid[start[0]][start[1]] = None
-                return True
-        return False
+    def make_move(self, start, end):
+        """Делает ход с возможностью отмены через `unmake_move`.
+
+        Args:
+            start (tuple): Начальная позиция.
+            end (tuple): Конечная позиция.
+
+        Returns:
+            bool: Успешность перемещения (недопустимый ход не попадает в стек отмены).
+        """
+        undo = self._apply_move(start, end)
+        if undo is None:
+            return False
+        self.undo_stack.append(undo)
+        return True
+
+    def make_packed(self, move):
+        """Делает ход, упакованный в число (см. модуль `moves`), с возможностью отмены.
+
+        Args:
+            move (int): Упакованный ход.
+
+        Returns:
+            bool: Успешность перемещения.
+        """
+        undo = self._apply_move(POSITIONS[move & 63], POSITIONS[move >> 6 & 63])
+        if undo is None:
+            return False
+        self.undo_stack.append(undo)
+        return True
+
+    def unmake_move(self):
+        """Отменяет последний ход, сделанный через `make_move`, и восстанавливает позицию точно."""
+        start, end, piece, target, zobrist_key = self.undo_stack.pop()
+        position = self.bitboards if self.bitboards is not None else self._exchange
+        if position is not None:
+            to_sq = end[0] * 8 + end[1]
+            position.move(piece.color, piece.name, to_sq, start[0] * 8 + start[1])
+            if target:
+                position.add(target.color, target.name, to_sq)
+        self.grid[start[0]][start[1]] = piece
+        self.grid[end[0]][end[1]] = target
+        self._touched |= 1 << (start[0] * 8 + start[1]) | 1 << (end[0] * 8 + end[1])
+        self.zobrist_key = zobrist_key
+        self.history.pop()
+
+    def _apply_move(self, start, end):
+        """Проверяет и выполняет ход.
+
+        Returns:
+            tuple: Запись для отмены (start, end, фигура, взятая фигура, прежний ключ) или None.
+        """
+        if not (on_board(start) and on_board(end)):
+            return None
+        piece = self.grid[start[0]][start[1]]
+        if not piece:
+            return None
+        from_sq, to_sq = start[0] * 8 + start[1], end[0] * 8 + end[1]
+        cached = self._cached_moves(from_sq) if self._move_cache else None
+        if cached is not None:
+            # Ходы уже построены (например, для подсказки) - проверка без повторной генерации
+            if end not in cached:
+                return None
+        elif self.bitboards is not None:
+            if not self.bitboards.moves_from(piece.name, piece.color, from_sq) >> to_sq & 1:
+                return None
+        elif not piece.is_valid_move(start, end, self.grid):
+            return None
+
+        target = self.grid[end[0]][end[1]]
+        undo = (start, end, piece, target, self.zobrist_key)
+        position = self.bitboards if self.bitboards is not None else self._exchange
+        if position is not None:
+            position.move(piece.color, piece.name, from_sq, to_sq, (target.color, target.name) if target else None)
+        keys = ZOBRIST.pieces[(piece.color, piece.name)]
+        self.zobrist_key ^= keys[from_sq] ^ keys[to_sq] ^ ZOBRIST.side
+        if target:
+            self.zobrist_key ^= ZOBRIST.pieces[(target.color, target.name)][to_sq]
+        self.grid[end[0]][end[1]] = piece
+        self.grid[start[0]][start[1]] = None
+        self._touched |= 1 << from_sq | 1 << to_sq
+        self.history.append(self.zobrist_key)
+        return undo
+
+    def repetition_count(self):
+        """Возвращает, сколько раз текущая позиция уже встречалась в партии (включая текущую)."""
+        return self.history.count(self.zobrist_key)
 
     def get_threatened_pieces(self, color):
         """Возвращает позиции фигур под угрозой и флаг шаха.
@@ -479,6 +535,11 @@ class Board:
                 - threats: set позиций под угрозой,
                 - check: bool (флаг шаха королю).
         """
+        if self.bitboards is not None:
+            attacked = self.bitboards.attacked_by('B' if color == 'W' else 'W')
+            threats = {POSITIONS[sq] for sq in iter_bits(attacked & self.bitboards.occupied[color])}
+            return threats, bool(attacked & self.bitboards.pieces[color].get('K', 0))
+
         threats = set()
         king_position = None
 
@@ -488,23 +549,71 @@ class Board:
                 if piece and piece.color == color and piece.name == 'K':
                     king_position = (row, col)
                 if piece and piece.color != color:
-                    for move in piece.get_possible_moves((row, col), self.grid):
+                    for move in self.get_moves((row, col)):
                         if self.grid[move[0]][move[1]] and self.grid[move[0]][move[1]].color == color:
                             threats.add(move)
 
         check = king_position in threats if king_position else False
         return threats, check
 
+    def get_threat_report(self, color, values=None):
+        """Разбирает угрозы фигурам цвета `color` разменом на каждой атакованной клетке.
+
+        В отличие от `get_threatened_pieces`, защищённая фигура, взятие которой
+        проигрывает материал, получает gain <= 0 (см. модуль exchange). Для
+        представления 'grid' битборды с картой атак строятся при первом вызове
+        и затем обновляются ходами, а не строятся заново на каждый отчёт.
+
+        Args:
+            color (str): Цвет анализируемых фигур.
+            values (dict): Ценность фигур, дополняющая exchange.SEE_VALUES.
+
+        Returns:
+            list: Записи exchange.Threat, сначала самые большие потери.
+        """
+        position = self.bitboards
+        if position is None:
+            if self._exchange is None:
+                self._exchange = BitboardPosition.from_grid(self.grid, VARIANT)
+            position = self._exchange
+        return threat_report(position, color, values)
+
 
 class Game:
     """Класс управления игровым процессом."""
 
-    def __init__(self):
-        """Инициализирует игру с доской и начальными настройками."""
-        self.board = Board()
+    def __init__(self, backend='grid'):
+        """Инициализирует игру с доской и начальными настройками.
+
+        Args:
+            backend (str): Представление доски ('grid' или 'bitboard').
+        """
+        self.board = Board(backend)
         self.current_turn = 'W'
         self.move_count = 0
 
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        """Создаёт игру в позиции FEN (очередь хода и номер хода берутся из FEN).
+
+        Args:
+            fen (str): Строка FEN.
+            backend (str): Представление доски.
+
+        Returns:
+            Game: Игра в заданной позиции.
+        """
+        grid, side, fullmove = parse_fen(fen, PIECE_CLASSES)
+        game = cls.__new__(cls)
+        game.board = Board._from_grid(grid, side, backend)
+        game.current_turn = side
+        game.move_count = (fullmove - 1) * 2 + (side == 'B')
+        return game
+
+    def to_fen(self):
+        """Записывает текущую позицию игры в FEN."""
+        return self.board.to_fen(self.current_turn, self.move_count // 2 + 1)
+
     def parse_input(self, move):
         """Преобразует строку хода (например, 'e2e4') в координаты.
 
@@ -517,31 +626,131 @@ class Game:
         if len(move) != 4 or move[0] not in string.ascii_lowercase[:8] or move[2] not in string.ascii_lowercase[:8]:
             return None, None
         try:
-            start = (8 - int(move[1]), string.ascii_lowercase.index(move[0])
-                     end = (8 - int(move[3]), string.ascii_lowercase.index(move[2])
+            start = (8 - int(move[1]), string.ascii_lowercase.index(move[0]))
+            end = (8 - int(move[3]), string.ascii_lowercase.index(move[2]))
+            if not (0 <= start[0] < 8 and 0 <= end[0] < 8):
+                return None, None
             return start, end
         except ValueError:
             return None, None
 
+    def apply_move(self, move):
+        """Выполняет ход без вывода на экран (для воспроизведения записанных партий).
+
+        Ход засчитывается, только если на исходной клетке стоит фигура стороны, чей сейчас ход.
+
+        Args:
+            move (str): Ход в формате 'e2e4' или 'e2-e4'.
+
+        Returns:
+            bool: True, если ход выполнен.
+        """
+        start, end = self.parse_input(move.replace("-", ""))
+        if not (start and end):
+            return False
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn or not self.board.move_piece(start, end):
+            return False
+        self.move_count += 1
+        self.current_turn = 'B' if self.current_turn == 'W' else 'W'
+        return True
+
+    def render(self):
+        """Выводит доску, подсвечивая только фигуры, которые теряются в размене."""
+        report = self.board.get_threat_report(self.current_turn)
+        threats = {threat.square for threat in report if threat.gain > 0}
+        check = any(threat.piece == 'K' for threat in report)
+        self.board.display(self.move_count, threats, check)
+
+    def hint(self, square):
+        """Возвращает клетки, куда может пойти фигура стороны, чей сейчас ход.
+
+        Args:
+            square (str): Клетка фигуры (например, 'e2').
+
+        Returns:
+            list: Позиции (row, col) или None, если запись неверна или фигура не принадлежит стороне.
+        """
+        if len(square) != 2 or square[0] not in string.ascii_lowercase[:8] or square[1] not in '12345678':
+            return None
+        start = (8 - int(square[1]), string.ascii_lowercase.index(square[0]))
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn:
+            return None
+        return self.board.get_moves(start)
+
+    def play_batch(self, lines, render_every=0, out=None):
+        """Пакетный режим: выполняет команды из потока строк без ожидания ввода.
+
+        Команды - по одной в строке: ход ('e2e4' или 'e2-e4'), 'hint <клетка>' или 'stats';
+        пустые строки и строки, начинающиеся с '#', пропускаются. На каждую команду
+        выводится одна строка: '<номер полухода> <ход> ok|error' или 'hint e2 e3 e4'.
+
+        Args:
+            lines (iterable): Строки команд (файл или sys.stdin).
+            render_every (int): Выводить доску после каждых N выполненных ходов (0 - не выводить);
+                доска пишется в sys.stderr, чтобы не смешиваться со строками результата.
+            out (file): Поток для строк результата (по умолчанию - стандартный вывод).
+
+        Returns:
+            tuple: (число выполненных ходов, число отклонённых команд).
+        """
+        out = out or sys.stdout
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
+        applied = rejected = 0
+        for line in lines:
+            move = line.strip()
+            if not move or move.startswith('#'):
+                continue
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]), file=out)
+            elif move.startswith("hint "):
+                square = move[5:].strip()
+                targets = self.hint(square)
+                if targets is None:
+                    rejected += 1
+                    print(f"hint {square} error", file=out)
+                else:
+                    print(' '.join(["hint", square] + [f"{string.ascii_lowercase[col]}{8 - row}"
+                                                         for row, col in targets]), file=out)
+            else:
+                ply = self.move_count + 1
+                if self.apply_move(move):
+                    applied += 1
+                    print(f"{ply} {move} ok", file=out)
+                    if render_every and applied % render_every == 0:
+                        with contextlib.redirect_stdout(sys.stderr):
+                            self.render()
+                else:
+                    rejected += 1
+                    print(f"{ply} {move} error", file=out)
+        return applied, rejected
+
     def play(self):
-        """Запускает игровой цикл с обработкой ходов и подсказок."""
+        """Запускает игровой цикл с обработкой ходов и подсказок.
+
+        Команда 'stats' показывает статистику вызовов (см. модуль instrument).
+        """
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
         while True:
-            threats, check = self.board.get_threatened_pieces(self.current_turn)
-            self.board.display(self.move_count, threats, check)
+            self.render()
             print("Введите 'hint <координата>' (например, 'hint e2'), чтобы получить подсказку по возможным ходам.")
             move = input(f"Ход {'белых' if self.current_turn == 'W' else 'чёрных'} (например, e2-e4): ")
             if move.startswith("hint "):
                 pos = move.split()[1]
-                if len(pos) == 2 and pos[0] in string.ascii_lowercase[:8]:
-                    start = (8 - int(pos[1]), string.ascii_lowercase.index(pos[0])
-                             piece = self.board.grid[start[0]][start[1]]
-                             if piece and piece.color == self.current_turn:
-                             self.board.display_with_hints(piece.get_possible_moves(start, self.board.grid))
-                    else:
-                    print("Выбранная фигура не принадлежит вам или отсутствует.")
+                if len(pos) == 2 and pos[0] in string.ascii_lowercase[:8] and pos[1] in '12345678':
+                    start = (8 - int(pos[1]), string.ascii_lowercase.index(pos[0]))
+                    piece = self.board.grid[start[0]][start[1]]
+                    if piece and piece.color == self.current_turn:
+                        self.board.display_with_hints(self.board.get_moves(start))
                     else:
+                        print("Выбранная фигура не принадлежит вам или отсутствует.")
+                else:
                     print("Неверный формат запроса подсказки.")
                 continue
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]))
+                continue
             move = move.replace("-", "")
             start, end = self.parse_input(move)
             if start and end and self.board.move_piece(start, end):
@@ -551,6 +760,37 @@ class Game:
                 print("Неверный ход, попробуйте снова.")
 
 
+def main(argv=None):
+    """Точка входа командной строки: интерактивная партия или пакетный режим.
+
+    Примеры запуска:
+        python chess167.py
+        python chess167.py moves.txt --render-every 10
+        cat moves.txt | python chess167.py -
+
+    Returns:
+        int: 0, если все команды выполнены, иначе 1.
+    """
+    parser = argparse.ArgumentParser(description="Шахматы с новыми фигурами: интерактивная партия или ходы из файла.")
+    parser.add_argument('moves', nargs='?', help="файл с ходами для пакетного режима ('-' - стандартный ввод)")
+    parser.add_argument('--fen', help="начальная позиция в FEN")
+    parser.add_argument('--backend', default='grid', choices=Board.BACKENDS, help="представление доски")
+    parser.add_argument('--render-every', type=int, default=0, metavar='N',
+                        help="в пакетном режиме выводить доску в stderr каждые N ходов (0 - не выводить)")
+    args = parser.parse_args(argv)
+    game = Game.from_fen(args.fen, args.backend) if args.fen else Game(args.backend)
+    if args.moves is None:
+        game.play()
+        return 0
+    if args.moves == '-':
+        _, rejected = game.play_batch(sys.stdin, args.render_every)
+    else:
+        with open(args.moves, encoding='utf-8') as lines:
+            _, rejected = game.play_batch(lines, args.render_every)
+    return 1 if rejected else 0
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.play()
+    sys.exit(main())
+
+
@@ -1,28 +1,78 @@
+import argparse
+import contextlib
 import string
+import sys
+
+import instrument
+from bitboard import POSITIONS, BitboardPosition, iter_bits, mask_positions, on_board
+from fen import format_fen, parse_fen
+from moves import CAPTURE, PIECE_CODES, MoveList
+from position_store import pack, unpack_grid
+from zobrist import ZobristKeys
+
+VARIANT = 'chessbase'
+ZOBRIST = ZobristKeys('PRNBQK')
 
 
 class Piece:
     """Базовый класс для шахматных фигур.
 
+    Экземпляры неизменяемы и общие: `Pawn('W')` всегда возвращает один и тот же объект.
+
     Атрибуты:
         SYMBOLS (dict): Словарь с Unicode-символами фигур для белых (заглавные) и чёрных (строчные).
+        NAME (str): Название фигуры, задаётся в дочерних классах.
         color (str): Цвет фигуры ('W' - белые, 'B' - чёрные).
         name (str): Название фигуры (например, 'P' для пешки).
         symbol (str): Символ фигуры с учётом цвета.
     """
 
+    __slots__ = ('color', 'name', 'symbol')
+
     SYMBOLS = {'P': '♙', 'R': '♖', 'N': '♘', 'B': '♗', 'Q': '♕', 'K': '♔'}
+    NAME = None
+    _instances = {}
+
+    def __new__(cls, color, name=None):
+        """Возвращает общий экземпляр фигуры с заданным цветом и названием.
 
-    def __init__(self, color, name):
-        """Инициализирует фигуру с заданным цветом и названием.
+        Фигуры неизменяемы, поэтому все клетки всех досок (и превращения)
+        разделяют один объект на каждую пару (тип, цвет): расстановка и
+        проверка ходов не создают новых объектов.
 
         Args:
             color (str): Цвет фигуры ('W' или 'B').
-            name (str): Название фигуры (ключ из SYMBOLS).
+            name (str): Название фигуры (ключ из SYMBOLS); по умолчанию - NAME класса.
+
+        Returns:
+            Piece: Единственный экземпляр для (класс, цвет, название).
         """
-        self.color = color
-        self.name = name
-        self.symbol = self.SYMBOLS[name] if color == 'W' else self.SYMBOLS[name].lower()
+        name = name or cls.NAME
+        key = (cls, color, name)
+        piece = Piece._instances.get(key)
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            object.__setattr__(piece, 'name', name)
+            object.__setattr__(piece, 'symbol', cls.SYMBOLS[name] if color == 'W' else cls.SYMBOLS[name].lower())
+            Piece._instances[key] = piece
+        return piece
+
+    def __setattr__(self, attr, value):
+        """Запрещает изменять общие экземпляры фигур."""
+        raise AttributeError(f"Фигура {self.name} неизменяема")
+
+    def __reduce__(self):
+        """При распаковке (pickle) возвращается тот же общий экземпляр."""
+        return self.__class__, (self.color, self.name)
+
+    def __copy__(self):
+        """Копия неизменяемой фигуры - она сама."""
+        return self
+
+    def __deepcopy__(self, memo):
+        """Глубокая копия неизменяемой фигуры - она сама."""
+        return self
 
     def is_valid_move(self, start, end, board):
         """Проверяет, возможен ли ход из позиции `start` в `end` на доске `board`.
@@ -41,13 +91,8 @@ class Piece:
 class Pawn(Piece):
     """Класс пешки. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует пешку.
-
-        Args:
-            color (str): Цвет пешки ('W' или 'B').
-        """
-        super().__init__(color, 'P')
+    __slots__ = ()
+    NAME = 'P'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода пешки.
@@ -89,13 +134,8 @@ class Pawn(Piece):
 class Rook(Piece):
     """Класс ладьи. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует ладью.
-
-        Args:
-            color (str): Цвет ладьи ('W' или 'B').
-        """
-        super().__init__(color, 'R')
+    __slots__ = ()
+    NAME = 'R'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода ладьи.
@@ -134,13 +174,8 @@ class Rook(Piece):
 class Knight(Piece):
     """Класс коня. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует коня.
-
-        Args:
-            color (str): Цвет коня ('W' или 'B').
-        """
-        super().__init__(color, 'N')
+    __slots__ = ()
+    NAME = 'N'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода коня.
@@ -164,13 +199,8 @@ class Knight(Piece):
 class Bishop(Piece):
     """Класс слона. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует слона.
-
-        Args:
-            color (str): Цвет слона ('W' или 'B').
-        """
-        super().__init__(color, 'B')
+    __slots__ = ()
+    NAME = 'B'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода слона.
@@ -208,13 +238,8 @@ class Bishop(Piece):
 class Queen(Piece):
     """Класс ферзя. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует ферзя.
-
-        Args:
-            color (str): Цвет ферзя ('W' или 'B').
-        """
-        super().__init__(color, 'Q')
+    __slots__ = ()
+    NAME = 'Q'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода ферзя.
@@ -230,20 +255,14 @@ class Queen(Piece):
             bool: True, если ход допустим, иначе False.
         """
         # Ферзь может двигаться как ладья и как слон
-        return Rook(self.color).is_valid_move(start, end, board) or \
-            Bishop(self.color).is_valid_move(start, end, board)
+        return Rook.is_valid_move(self, start, end, board) or Bishop.is_valid_move(self, start, end, board)
 
 
 class King(Piece):
     """Класс короля. Наследуется от `Piece`."""
 
-    def __init__(self, color):
-        """Инициализирует короля.
-
-        Args:
-            color (str): Цвет короля ('W' или 'B').
-        """
-        super().__init__(color, 'K')
+    __slots__ = ()
+    NAME = 'K'
 
     def is_valid_move(self, start, end, board):
         """Проверяет допустимость хода короля.
@@ -265,13 +284,98 @@ class King(Piece):
         return abs(start_row - end_row) <= 1 and abs(start_col - end_col) <= 1
 
 
+# Классы фигур по букве FEN
+PIECE_CLASSES = {cls.NAME: cls for cls in (Pawn, Rook, Knight, Bishop, Queen, King)}
+
+
 class Board:
-    """Класс шахматной доски."""
+    """Класс шахматной доски.
 
-    def __init__(self):
-        """Инициализирует доску и расставляет фигуры."""
+    Атрибуты:
+        BACKENDS (tuple): Допустимые представления позиции.
+        grid (list): Сетка 8x8 с фигурами (используется для отображения).
+        bitboards (BitboardPosition): Битборды позиции или None для представления 'grid'.
+        zobrist_key (int): Zobrist-ключ текущей позиции (с учётом очереди хода).
+        history (list): Ключи всех позиций партии, начиная с исходной.
+        undo_stack (list): Записи для отмены ходов, сделанных через `make_move`.
+    """
+
+    BACKENDS = ('grid', 'bitboard')
+
+    def __init__(self, backend='grid'):
+        """Инициализирует доску и расставляет фигуры.
+
+        Args:
+            backend (str): 'grid' - ходы проверяются обходом сетки,
+                'bitboard' - битовыми операциями над битбордами.
+        """
         self.grid = [[None] * 8 for _ in range(8)]
         self.setup_pieces()
+        self._attach(self.grid, backend)
+
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        """Создаёт доску по строке FEN без расстановки и проигрывания ходов.
+
+        Args:
+            fen (str): Строка FEN (см. модуль fen).
+            backend (str): Представление доски.
+
+        Returns:
+            Board: Доска в заданной позиции.
+
+        Raises:
+            ValueError: Если строка не является допустимой FEN.
+        """
+        grid, side, _ = parse_fen(fen, PIECE_CLASSES)
+        return cls._from_grid(grid, side, backend)
+
+    @classmethod
+    def _from_grid(cls, grid, side, backend):
+        """Создаёт доску с готовой сеткой (ключ позиции учитывает очередь хода `side`)."""
+        board = cls.__new__(cls)
+        board._attach(grid, backend, side)
+        return board
+
+    def _attach(self, grid, backend, side='W'):
+        """Устанавливает сетку и строит по ней битборды, ключ и историю позиции."""
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Неизвестное представление доски: {backend}")
+        self.grid = grid
+        self.bitboards = BitboardPosition.from_grid(self.grid, VARIANT) if backend == 'bitboard' else None
+        self.zobrist_key = ZOBRIST.hash_grid(self.grid, side)
+        self.history = [self.zobrist_key]
+        self.undo_stack = []
+
+    def to_fen(self, side='W', fullmove=1):
+        """Записывает позицию в FEN.
+
+        Args:
+            side (str): Очередь хода.
+            fullmove (int): Номер хода.
+
+        Returns:
+            str: Строка FEN.
+        """
+        return format_fen(self.grid, side, fullmove)
+
+    @classmethod
+    def from_packed(cls, record, backend='grid'):
+        """Создаёт доску по двоичной записи позиции (см. модуль position_store).
+
+        Args:
+            record (bytes | memoryview): Запись позиции.
+            backend (str): Представление доски.
+
+        Returns:
+            Board: Доска в записанной позиции (ключ учитывает очередь хода).
+        """
+        grid, side = unpack_grid(record, PIECE_CLASSES)
+        return cls._from_grid(grid, side, backend)
+
+    def to_packed(self, side='W'):
+        """Записывает позицию в двоичном виде (41 байт, см. модуль position_store)."""
+        return pack(self.grid, side)
 
     def setup_pieces(self):
         """Расставляет фигуры в начальные позиции."""
@@ -303,9 +407,80 @@ class Board:
         print("  +-----------------+")
         print("   " + " ".join(string.ascii_lowercase[:8]))
 
+    def get_moves(self, start):
+        """Возвращает все возможные ходы фигуры, стоящей на позиции `start`.
+
+        Args:
+            start (tuple): Позиция фигуры (row, col).
+
+        Returns:
+            list: Список кортежей (row, col) допустимых ходов (пустой для пустой клетки).
+        """
+        piece = self.grid[start[0]][start[1]]
+        if not piece:
+            return []
+        if self.bitboards is not None:
+            return list(mask_positions(self.bitboards.moves_from(piece.name, piece.color, start[0] * 8 + start[1])))
+        moves = []
+        for row in range(8):
+            for col in range(8):
+                target = self.grid[row][col]
+                if (not target or target.color != piece.color) and piece.is_valid_move(start, (row, col), self.grid):
+                    moves.append((row, col))
+        return moves
+
+    def generate_moves(self, color):
+        """Возвращает все ходы фигур цвета `color`.
+
+        Args:
+            color (str): Цвет ходящей стороны.
+
+        Returns:
+            list: Список пар (start, end).
+        """
+        bitboards = self.bitboards
+        if bitboards is not None:
+            squares = bitboards.squares
+            return [(POSITIONS[sq], end) for sq in iter_bits(bitboards.occupied[color])
+                    for end in mask_positions(bitboards.moves_from(squares[sq][1], color, sq))]
+        return [((row, col), end) for row in range(8) for col in range(8)
+                if self.grid[row][col] and self.grid[row][col].color == color
+                for end in self.get_moves((row, col))]
+
+    def fill_moves(self, color, buffer=None):
+        """Заполняет буфер упакованными ходами фигур цвета `color` (см. модуль `moves`).
+
+        В отличие от `generate_moves`, не создаёт кортежей и списков: буфер
+        переиспользуется между вызовами.
+
+        Args:
+            color (str): Цвет ходящей стороны.
+            buffer (MoveList): Буфер для ходов (по умолчанию создаётся новый).
+
+        Returns:
+            MoveList: Тот же буфер с ходами.
+        """
+        if buffer is None:
+            buffer = MoveList()
+        buffer.clear()
+        if self.bitboards is not None:
+            self.bitboards.fill_moves(color, buffer)
+            return buffer
+        for row in range(8):
+            for col in range(8):
+                piece = self.grid[row][col]
+                if piece and piece.color == color:
+                    for end_row, end_col in self.get_moves((row, col)):
+                        target = self.grid[end_row][end_col]
+                        move = row * 8 + col | (end_row * 8 + end_col) << 6
+                        buffer.append(move | CAPTURE << 12 | PIECE_CODES[target.name] << 20 if target else move)
+        return buffer
+
     def move_piece(self, start, end):
         """Перемещает фигуру, если ход допустим.
 
+        Ход попадает в стек отмены, как и в `make_move`, поэтому его можно отменить через `unmake_move`.
+
         Args:
             start (tuple): Начальная позиция (row, col).
             end (tuple): Конечная позиция (row, col).
@@ -313,23 +488,159 @@ class Board:
         Returns:
             bool: True, если перемещение успешно, иначе False.
         """
+        return self.make_move(start, end)
+
+    def make_move(self, start, end):
+        """Делает ход с возможностью отмены через `unmake_move`.
+
+        Args:
+            start (tuple): Начальная позиция (row, col).
+            end (tuple): Конечная позиция (row, col).
+
+        Returns:
+            bool: True, если ход сделан (недопустимый ход не попадает в стек отмены).
+        """
+        undo = self._apply_move(start, end)
+        if undo is None:
+            return False
+        self.undo_stack.append(undo)
+        return True
+
+    def make_packed(self, move):
+        """Делает ход, упакованный в число (см. модуль `moves`), с возможностью отмены.
+
+        Args:
+            move (int): Упакованный ход.
+
+        Returns:
+            bool: Успешность перемещения.
+        """
+        undo = self._apply_move(POSITIONS[move & 63], POSITIONS[move >> 6 & 63])
+        if undo is None:
+            return False
+        self.undo_stack.append(undo)
+        return True
+
+    def unmake_move(self):
+        """Отменяет последний ход, сделанный через `make_move`, и восстанавливает позицию точно."""
+        start, end, piece, target, zobrist_key = self.undo_stack.pop()
+        if self.bitboards is not None:
+            to_sq = end[0] * 8 + end[1]
+            self.bitboards.move(piece.color, piece.name, to_sq, start[0] * 8 + start[1])
+            if target:
+                self.bitboards.add(target.color, target.name, to_sq)
+        self.grid[start[0]][start[1]] = piece
+        self.grid[end[0]][end[1]] = target
+        self.zobrist_key = zobrist_key
+        self.history.pop()
+
+    def _apply_move(self, start, end):
+        """Проверяет и выполняет ход.
+
+        Args:
+            start (tuple): Начальная позиция (row, col).
+            end (tuple): Конечная позиция (row, col).
+
+        Returns:
+            tuple: Запись для отмены (start, end, фигура, взятая фигура, прежний ключ) или None.
+        """
+        if not (on_board(start) and on_board(end)):
+            return None
         piece = self.grid[start[0]][start[1]]
-        if piece and piece.is_valid_move(start, end, self.grid):
-            self.grid[end[0]][end[1]] = piece
-            self.grid[start[0]][start[1]] = None
-            return True
-        return False
+        target = self.grid[end[0]][end[1]]
+        if not piece or (target and target.color == piece.color):
+            return None
+        from_sq, to_sq = start[0] * 8 + start[1], end[0] * 8 + end[1]
+        if self.bitboards is not None:
+            valid = self.bitboards.moves_from(piece.name, piece.color, from_sq) >> to_sq & 1
+        else:
+            valid = piece.is_valid_move(start, end, self.grid)
+        if not valid:
+            return None
+        undo = (start, end, piece, target, self.zobrist_key)
+        if self.bitboards is not None:
+            self.bitboards.move(piece.color, piece.name, from_sq, to_sq, (target.color, target.name) if target else None)
+        keys = ZOBRIST.pieces[(piece.color, piece.name)]
+        self.zobrist_key ^= keys[from_sq] ^ keys[to_sq] ^ ZOBRIST.side
+        if target:
+            self.zobrist_key ^= ZOBRIST.pieces[(target.color, target.name)][to_sq]
+        self.grid[end[0]][end[1]] = piece
+        self.grid[start[0]][start[1]] = None
+        self.history.append(self.zobrist_key)
+        return undo
+
+    def repetition_count(self):
+        """Возвращает, сколько раз текущая позиция уже встречалась в партии (включая текущую).
+
+        Returns:
+            int: Число повторений позиции.
+        """
+        return self.history.count(self.zobrist_key)
+
+    def get_threatened_pieces(self, color):
+        """Возвращает позиции фигур под угрозой и флаг шаха.
+
+        Args:
+            color (str): Цвет анализируемых фигур.
+
+        Returns:
+            tuple: (threats, check) - set позиций под угрозой и флаг шаха королю.
+        """
+        if self.bitboards is not None:
+            attacked = self.bitboards.attacked_by('B' if color == 'W' else 'W')
+            threats = {POSITIONS[sq] for sq in iter_bits(attacked & self.bitboards.occupied[color])}
+            return threats, bool(attacked & self.bitboards.pieces[color].get('K', 0))
+
+        threats = set()
+        king_position = None
+        for row in range(8):
+            for col in range(8):
+                piece = self.grid[row][col]
+                if piece and piece.color == color and piece.name == 'K':
+                    king_position = (row, col)
+                if piece and piece.color != color:
+                    for end_row, end_col in self.get_moves((row, col)):
+                        target = self.grid[end_row][end_col]
+                        if target and target.color == color:
+                            threats.add((end_row, end_col))
+        return threats, king_position in threats
 
 
 class Game:
     """Класс игры, управляющий процессом."""
 
-    def __init__(self):
-        """Инициализирует игру с доской и начальными настройками."""
-        self.board = Board()
+    def __init__(self, backend='grid'):
+        """Инициализирует игру с доской и начальными настройками.
+
+        Args:
+            backend (str): Представление доски ('grid' или 'bitboard').
+        """
+        self.board = Board(backend)
         self.current_turn = 'W'
         self.move_count = 0
 
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        """Создаёт игру в позиции FEN (очередь хода и номер хода берутся из FEN).
+
+        Args:
+            fen (str): Строка FEN.
+            backend (str): Представление доски.
+
+        Returns:
+            Game: Игра в заданной позиции.
+        """
+        grid, side, fullmove = parse_fen(fen, PIECE_CLASSES)
+        game = cls.__new__(cls)
+        game.board = Board._from_grid(grid, side, backend)
+        game.current_turn = side
+        game.move_count = (fullmove - 1) * 2 + (side == 'B')
+        return game
+
+    def to_fen(self):
+        """Записывает текущую позицию игры в FEN."""
+        return self.board.to_fen(self.current_turn, self.move_count // 2 + 1)
+
     def parse_input(self, move):
         """Преобразует строку хода (например, 'e2e4') в координаты.
 
@@ -344,15 +655,109 @@ class Game:
         try:
             start = (8 - int(move[1]), string.ascii_lowercase.index(move[0]))
             end = (8 - int(move[3]), string.ascii_lowercase.index(move[2]))
+            if not (0 <= start[0] < 8 and 0 <= end[0] < 8):
+                return None, None
             return start, end
         except ValueError:
             return None, None
 
+    def apply_move(self, move):
+        """Выполняет ход без вывода на экран (для воспроизведения записанных партий).
+
+        Ход засчитывается, только если на исходной клетке стоит фигура стороны, чей сейчас ход.
+
+        Args:
+            move (str): Ход в формате 'e2e4' или 'e2-e4'.
+
+        Returns:
+            bool: True, если ход выполнен.
+        """
+        start, end = self.parse_input(move.replace("-", ""))
+        if not (start and end):
+            return False
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn or not self.board.move_piece(start, end):
+            return False
+        self.move_count += 1
+        self.current_turn = 'B' if self.current_turn == 'W' else 'W'
+        return True
+
+    def hint(self, square):
+        """Возвращает клетки, куда может пойти фигура стороны, чей сейчас ход.
+
+        Args:
+            square (str): Клетка фигуры (например, 'e2').
+
+        Returns:
+            list: Позиции (row, col) или None, если запись неверна или фигура не принадлежит стороне.
+        """
+        if len(square) != 2 or square[0] not in string.ascii_lowercase[:8] or square[1] not in '12345678':
+            return None
+        start = (8 - int(square[1]), string.ascii_lowercase.index(square[0]))
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn:
+            return None
+        return self.board.get_moves(start)
+
+    def play_batch(self, lines, render_every=0, out=None):
+        """Пакетный режим: выполняет команды из потока строк без ожидания ввода.
+
+        Команды - по одной в строке: ход ('e2e4' или 'e2-e4'), 'hint <клетка>' или 'stats';
+        пустые строки и строки, начинающиеся с '#', пропускаются. На каждую команду
+        выводится одна строка: '<номер полухода> <ход> ok|error' или 'hint e2 e3 e4'.
+
+        Args:
+            lines (iterable): Строки команд (файл или sys.stdin).
+            render_every (int): Выводить доску после каждых N выполненных ходов (0 - не выводить);
+                доска пишется в sys.stderr, чтобы не смешиваться со строками результата.
+            out (file): Поток для строк результата (по умолчанию - стандартный вывод).
+
+        Returns:
+            tuple: (число выполненных ходов, число отклонённых команд).
+        """
+        out = out or sys.stdout
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
+        applied = rejected = 0
+        for line in lines:
+            move = line.strip()
+            if not move or move.startswith('#'):
+                continue
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]), file=out)
+            elif move.startswith("hint "):
+                square = move[5:].strip()
+                targets = self.hint(square)
+                if targets is None:
+                    rejected += 1
+                    print(f"hint {square} error", file=out)
+                else:
+                    print(' '.join(["hint", square] + [f"{string.ascii_lowercase[col]}{8 - row}"
+                                                         for row, col in targets]), file=out)
+            else:
+                ply = self.move_count + 1
+                if self.apply_move(move):
+                    applied += 1
+                    print(f"{ply} {move} ok", file=out)
+                    if render_every and applied % render_every == 0:
+                        with contextlib.redirect_stdout(sys.stderr):
+                            self.board.display(self.move_count)
+                else:
+                    rejected += 1
+                    print(f"{ply} {move} error", file=out)
+        return applied, rejected
+
     def play(self):
-        """Запускает игровой цикл."""
+        """Запускает игровой цикл.
+
+        Команда 'stats' показывает статистику вызовов (см. модуль instrument).
+        """
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
         while True:
             self.board.display(self.move_count)
             move = input(f"Ход {'белых' if self.current_turn == 'W' else 'чёрных'} (например, e2-e4): ")
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]))
+                continue
             move = move.replace("-", "")  # Поддержка формата e2-e4
             start, end = self.parse_input(move)
             if start and end and self.board.move_piece(start, end):
@@ -362,9 +767,37 @@ class Game:
                 print("Неверный ход, попробуйте снова.")
 
 
+def main(argv=None):
+    """Точка входа командной строки: интерактивная партия или пакетный режим.
+
+    Примеры запуска:
+        python chessbase.py
+        python chessbase.py moves.txt --render-every 10
+        cat moves.txt | python chessbase.py -
+
+    Returns:
+        int: 0, если все команды выполнены, иначе 1.
+    """
+    parser = argparse.ArgumentParser(description="Шахматы: интерактивная партия или ходы из файла.")
+    parser.add_argument('moves', nargs='?', help="файл с ходами для пакетного режима ('-' - стандартный ввод)")
+    parser.add_argument('--fen', help="начальная позиция в FEN")
+    parser.add_argument('--backend', default='grid', choices=Board.BACKENDS, help="представление доски")
+    parser.add_argument('--render-every', type=int, default=0, metavar='N',
+                        help="в пакетном режиме выводить доску в stderr каждые N ходов (0 - не выводить)")
+    args = parser.parse_args(argv)
+    game = Game.from_fen(args.fen, args.backend) if args.fen else Game(args.backend)
+    if args.moves is None:
+        game.play()
+        return 0
+    if args.moves == '-':
+        _, rejected = game.play_batch(sys.stdin, args.render_every)
+    else:
+        with open(args.moves, encoding='utf-8') as lines:
+            _, rejected = game.play_batch(lines, args.render_every)
+    return 1 if rejected else 0
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.play()
-    game.play()
+    sys.exit(main())
 
 
@@ -0,0 +1,282 @@
+"""Битборды шашек: 32 тёмных поля, маска шашек каждого цвета и маска дамок.
+
+Тёмное поле (row, col) соответствует биту номер `row * 4 + col // 2`, так что
+бит 0 - поле b8, бит 31 - поле g1 (та же ориентация, что и у `Board.grid`).
+Сосед по диагонали получается сдвигом на 3, 4 или 5 бит в зависимости от
+чётности ряда, поэтому простые ходы и кандидаты на взятие сразу для всех
+шашек стороны считаются несколькими сдвигами и масками (см. `step`). Цепочки
+взятий перебираются в глубину только от фигур, которые действительно могут бить.
+
+Ход описывается тройкой (path, taken, king), как в `shashki.Board.legal_moves`:
+поля пути, поля побитых фигур и то, стала ли (осталась ли) фигура дамкой.
+"""
+
+from moves import CAPTURE, PIECE_CODES, PROMOTION
+
+# Направления в том же порядке, что и в shashki.DIRECTIONS; противоположное к d - 3 - d
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+FORWARD = {'W': (0, 1), 'B': (2, 3)}
+
+FULL = (1 << 32) - 1
+# Позиция (row, col) каждого из 32 полей и номер поля по позиции
+DARK_SQUARES = tuple((row, col) for row in range(8) for col in range(8) if (row + col) % 2)
+INDEX = {pos: index for index, pos in enumerate(DARK_SQUARES)}
+# Номер клетки 0..63 для каждого из 32 полей
+SQUARES = tuple(row * 8 + col for row, col in DARK_SQUARES)
+LAST_ROW = {'W': 0xF, 'B': 0xF << 28}
+
+
+def _steps():
+    # Для каждого направления: пары (маска полей-источников, сдвиг), по одной на чётность ряда
+    steps = []
+    for drow, dcol in DIRECTIONS:
+        parts = {}
+        for index, (row, col) in enumerate(DARK_SQUARES):
+            target = INDEX.get((row + drow, col + dcol))
+            if target is not None:
+                parts[target - index] = parts.get(target - index, 0) | 1 << index
+        steps.append(tuple((mask, shift) for shift, mask in sorted(parts.items())))
+    return tuple(steps)
+
+
+def _rays():
+    # Для каждого направления и поля: номера полей по диагонали до края доски
+    rays = []
+    for drow, dcol in DIRECTIONS:
+        per_square = []
+        for row, col in DARK_SQUARES:
+            ray = []
+            row, col = row + drow, col + dcol
+            while (row, col) in INDEX:
+                ray.append(INDEX[(row, col)])
+                row, col = row + drow, col + dcol
+            per_square.append(tuple(ray))
+        rays.append(tuple(per_square))
+    return tuple(rays)
+
+
+STEPS = _steps()
+RAYS = _rays()
+
+
+def step(mask, direction):
+    """Сдвигает все поля маски на одно поле в направлении `direction` (0..3).
+
+    Поля, которым некуда сдвинуться, пропадают.
+
+    Args:
+        mask (int): 32-битная маска полей.
+        direction (int): Номер направления в DIRECTIONS.
+
+    Returns:
+        int: Маска полей-соседей.
+    """
+    result = 0
+    for source, shift in STEPS[direction]:
+        result |= (mask & source) << shift if shift > 0 else (mask & source) >> -shift
+    return result
+
+
+def iter_bits(mask):
+    """Перебирает номера установленных битов маски по возрастанию."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DraughtsPosition:
+    """Позиция шашек на 32-битных масках.
+
+    Атрибуты:
+        white (int): Поля белых фигур.
+        black (int): Поля чёрных фигур.
+        kings (int): Поля дамок обоих цветов.
+    """
+
+    __slots__ = ('white', 'black', 'kings')
+
+    def __init__(self, white=0, black=0, kings=0):
+        """Создаёт позицию по маскам (по умолчанию - пустую доску)."""
+        self.white = white
+        self.black = black
+        self.kings = kings
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Строит маски по сетке 8x8 с фигурами shashki."""
+        position = cls()
+        for index, (row, col) in enumerate(DARK_SQUARES):
+            piece = grid[row][col]
+            if piece:
+                position.add(piece.color, piece.name == 'D', index)
+        return position
+
+    def state(self):
+        """Состояние позиции для отмены хода: (white, black, kings)."""
+        return self.white, self.black, self.kings
+
+    def restore(self, state):
+        """Возвращает позицию в состояние `state` (см. `state`)."""
+        self.white, self.black, self.kings = state
+
+    def add(self, color, king, index):
+        """Ставит фигуру на поле `index` (0..31)."""
+        bit = 1 << index
+        if color == 'W':
+            self.white |= bit
+        else:
+            self.black |= bit
+        if king:
+            self.kings |= bit
+
+    def apply(self, color, start, end, taken, king):
+        """Делает ход: снимает побитые фигуры и переставляет ходящую (поля 0..31)."""
+        removed = 0
+        for index in taken:
+            removed |= 1 << index
+        moved = 1 << start | 1 << end
+        if color == 'W':
+            self.white = self.white ^ 1 << start | 1 << end
+            self.black &= ~removed
+        else:
+            self.black = self.black ^ 1 << start | 1 << end
+            self.white &= ~removed
+        self.kings &= ~(removed | moved)
+        if king:
+            self.kings |= 1 << end
+
+    def capturers(self, color):
+        """Маска фигур стороны, которые могут бить.
+
+        Для шашек - сдвигами масок по всем направлениям сразу, для дамок - обходом лучей.
+        """
+        own, enemy = (self.white, self.black) if color == 'W' else (self.black, self.white)
+        empty = FULL & ~(own | enemy)
+        men = own & ~self.kings
+        result = 0
+        for direction in range(4):
+            back = 3 - direction
+            result |= men & step(enemy & step(empty, back), back)
+        for sq in iter_bits(own & self.kings):
+            for direction in range(4):
+                ray = RAYS[direction][sq]
+                k = 0
+                while k < len(ray) and empty >> ray[k] & 1:
+                    k += 1
+                if k + 1 < len(ray) and enemy >> ray[k] & 1 and empty >> ray[k + 1] & 1:
+                    result |= 1 << sq
+                    break
+        return result
+
+    def capture_sequences(self, color, start=None):
+        """Полные цепочки взятий стороны (или одной фигуры на поле `start`) в номерах полей 0..31.
+
+        Returns:
+            list: Тройки (path, taken, king).
+        """
+        own, enemy = (self.white, self.black) if color == 'W' else (self.black, self.white)
+        sources = self.capturers(color)
+        if start is not None:
+            sources &= 1 << start
+        out = []
+        for sq in iter_bits(sources):
+            # Ходящая фигура снимается с доски, побитые остаются на месте и отмечаются маской
+            empty = FULL & ~(own | enemy) | 1 << sq
+            self._jumps(sq, bool(self.kings >> sq & 1), enemy, empty, LAST_ROW[color], [sq], [], 0, out)
+        return out
+
+    def _jumps(self, sq, king, enemy, empty, last_row, path, taken, mask, out):
+        found = False
+        for direction in range(4):
+            ray = RAYS[direction][sq]
+            k = 0
+            if king:
+                while k < len(ray) and empty >> ray[k] & 1:
+                    k += 1
+            if k + 1 >= len(ray):
+                continue
+            victim = ray[k]
+            if not enemy >> victim & 1 or mask >> victim & 1 or not empty >> ray[k + 1] & 1:
+                continue
+            found = True
+            taken.append(victim)
+            # Если с какого-то поля за побитой фигурой бой продолжается, встать можно только на такие поля
+            finished = []
+            continued = False
+            for land in ray[k + 1:]:
+                if not empty >> land & 1:
+                    break
+                promoted = king or bool(last_row >> land & 1)
+                path.append(land)
+                if self._jumps(land, promoted, enemy, empty, last_row, path, taken, mask | 1 << victim, out):
+                    continued = True
+                elif not continued:
+                    finished.append((tuple(path), tuple(taken), promoted))
+                path.pop()
+                if not king:
+                    break
+            if not continued:
+                out.extend(finished)
+            taken.pop()
+        return found
+
+    def quiet_sequences(self, color, start=None):
+        """Ходы без взятия стороны (или фигуры на поле `start`) в номерах полей 0..31."""
+        own = self.white if color == 'W' else self.black
+        empty = FULL & ~(self.white | self.black)
+        if start is not None:
+            own &= 1 << start
+        men = own & ~self.kings
+        last_row = LAST_ROW[color]
+        # Простые ходы всех шашек: по одному сдвигу на направление вперёд
+        targets = {}
+        for direction in FORWARD[color]:
+            back = 3 - direction
+            for end in iter_bits(step(men, direction) & empty):
+                targets.setdefault(RAYS[back][end][0], []).append(end)
+        out = []
+        for sq in iter_bits(own):
+            if self.kings >> sq & 1:
+                for direction in range(4):
+                    for end in RAYS[direction][sq]:
+                        if not empty >> end & 1:
+                            break
+                        out.append(((sq, end), (), True))
+            else:
+                for end in targets.get(sq, ()):
+                    out.append(((sq, end), (), bool(last_row >> end & 1)))
+        return out
+
+    def legal_moves(self, color, start=None):
+        """Все ходы стороны с обязательным взятием, в номерах полей 0..31.
+
+        Args:
+            color (str): Сторона.
+            start (int): Если задано - только ходы фигуры с этого поля.
+
+        Returns:
+            list: Тройки (path, taken, king).
+        """
+        captures = self.capture_sequences(color)
+        if captures:
+            return captures if start is None else [sequence for sequence in captures if sequence[0][0] == start]
+        return self.quiet_sequences(color, start)
+
+    def fill_moves(self, color, buffer):
+        """Заполняет буфер упакованными ходами стороны (раскладка как у `shashki.Board.fill_moves`)."""
+        buffer.clear()
+        seen = {}
+        for path, taken, king in self.legal_moves(color):
+            start, end = path[0], path[-1]
+            move = SQUARES[start] | SQUARES[end] << 6
+            if taken:
+                kings = any(self.kings >> index & 1 for index in taken)
+                move |= CAPTURE << 12 | PIECE_CODES['D' if kings else 'C'] << 20
+                alternative = seen.get(move, 0)
+                seen[move] = alternative + 1
+                move |= alternative << 24
+            if king and not self.kings >> start & 1:
+                move |= PROMOTION << 12 | PIECE_CODES['D'] << 16
+            buffer.append(move)
+        return buffer
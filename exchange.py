@@ -0,0 +1,117 @@
+"""Размен на клетке (static exchange evaluation) и отчёт об угрозах для chess167 и chessbase.
+
+`Board.get_threatened_pieces` отмечает любую фигуру, которую можно взять,
+даже если взятие проигрывает материал. Здесь для каждой атакованной фигуры
+разыгрывается размен на её клетке: стороны по очереди бьют самой дешёвой
+фигурой и могут остановиться, когда продолжать невыгодно. После каждого
+взятия учитываются дальнобойные фигуры, стоявшие за ушедшей (рентген).
+
+Атакующие и защитники берутся из карты атак `BitboardPosition`, которую
+доска ведёт по ходу партии (представление 'grid' - начиная с первого
+отчёта), поэтому отчёт дёшев и на каждом ходу, и при разборе архивов.
+
+Пример:
+    for threat in threat_report(board.bitboards, 'W', {'D': 700}):
+        print(threat.square, threat.piece, threat.gain)
+"""
+
+from collections import namedtuple
+
+from analysis import PIECE_VALUES
+from bitboard import POSITIONS, attacks, iter_bits
+
+# Короля нельзя отдать в размене: его ценность больше всего остального материала
+KING_VALUE = 20000
+SEE_VALUES = dict(PIECE_VALUES, K=KING_VALUE)
+
+Threat = namedtuple('Threat', 'square piece attackers defenders gain')
+Threat.__doc__ = """Атакованная фигура.
+
+Атрибуты:
+    square (tuple): Позиция фигуры (row, col).
+    piece (str): Тип фигуры.
+    attackers (list): Позиции фигур соперника, которые её бьют.
+    defenders (list): Позиции своих фигур, которые защищают клетку.
+    gain (int): Итог размена для соперника в сотых долях пешки (больше 0 - фигура теряется,
+        меньше 0 - взятие проигрывает материал).
+"""
+
+
+def _xrays(position, sq, occupancy, known):
+    """Дальнобойные фигуры, которые при занятости `occupancy` бьют клетку `sq` и ещё не учтены."""
+    found = 0
+    squares = position.squares
+    for origin in iter_bits(position.sliders & occupancy & ~known):
+        color, name = squares[origin]
+        if attacks(position.variant, name, color, origin, occupancy) >> sq & 1:
+            found |= 1 << origin
+    return found
+
+
+def static_exchange(position, sq, values=None):
+    """Итог размена на клетке `sq` для стороны, которая бьёт стоящую там фигуру.
+
+    Args:
+        position (BitboardPosition): Позиция.
+        sq (int): Клетка атакованной фигуры 0..63.
+        values (dict): Ценность фигур, дополняющая SEE_VALUES (например, для новых фигур).
+
+    Returns:
+        int: Итог размена для атакующей стороны, начинающей его взятием на `sq`, при лучшей
+            игре обеих сторон; отрицательный, если первое взятие проигрывает материал,
+            и 0, если фигуру не бьют.
+    """
+    values = SEE_VALUES if values is None else dict(SEE_VALUES, **values)
+    target = position.squares[sq]
+    if target is None:
+        return 0
+    squares = position.squares
+    occupied = position.occupied
+    occupancy = position.occupancy
+    attackers = position.attackers_of(sq)
+    side = 'B' if target[0] == 'W' else 'W'
+    gains = [values[target[1]]]
+    # Ценность фигуры, которая стоит на клетке после очередного взятия
+    standing = None
+    while True:
+        candidates = attackers & occupancy & occupied[side]
+        if not candidates:
+            break
+        origin = min(iter_bits(candidates), key=lambda candidate: values[squares[candidate][1]])
+        if standing is not None:
+            gains.append(standing - gains[-1])
+        standing = values[squares[origin][1]]
+        occupancy &= ~(1 << origin)
+        attackers |= _xrays(position, sq, occupancy, attackers)
+        side = 'B' if side == 'W' else 'W'
+    if standing is None:
+        return 0
+    # Каждая сторона может не продолжать размен, если следующее взятие ей невыгодно
+    for depth in range(len(gains) - 1, 0, -1):
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+    return gains[0]
+
+
+def threat_report(position, color, values=None):
+    """Отчёт об атакованных фигурах цвета `color`.
+
+    Args:
+        position (BitboardPosition): Позиция.
+        color (str): Цвет фигур, для которых ищутся угрозы.
+        values (dict): Ценность фигур, дополняющая SEE_VALUES.
+
+    Returns:
+        list: Записи Threat, сначала самые большие потери.
+    """
+    opponent = 'B' if color == 'W' else 'W'
+    report = []
+    for sq in iter_bits(position.attacked_by(opponent) & position.occupied[color]):
+        report.append(Threat(
+            POSITIONS[sq],
+            position.squares[sq][1],
+            [POSITIONS[origin] for origin in iter_bits(position.attackers_of(sq, opponent))],
+            [POSITIONS[origin] for origin in iter_bits(position.attackers_of(sq, color))],
+            static_exchange(position, sq, values),
+        ))
+    report.sort(key=lambda threat: -threat.gain)
+    return report
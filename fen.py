@@ -0,0 +1,138 @@
+"""Запись позиций в FEN и чтение из неё.
+
+Для шахмат (chessbase, chess167) используется обычная FEN: расстановка,
+очередь хода, рокировки, взятие на проходе, полуходы и номер хода. Фигуры
+chess167 записываются расширенным алфавитом: U - единорог, D - дракон,
+S - мудрец. Рокировки и взятия на проходе в этих играх нет, поэтому при
+записи выводится '-', а при чтении поля игнорируются.
+
+Для шашек используется FEN шашек (PDN): 'W:W21,22,K30:B1,2,3', где первая
+буква - очередь хода, а списки - клетки белых и чёрных шашек (K - дамка).
+Тёмные клетки нумеруются 1..32 с 8-й горизонтали слева направо: 1 - b8,
+32 - g1. Вместо номеров можно указывать клетки в виде 'c3'.
+"""
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1'
+
+# Тёмные клетки шашечной доски в порядке номеров 1..32
+DARK_SQUARES = tuple((row, col) for row in range(8) for col in range(8) if (row + col) % 2 == 1)
+DARK_NUMBERS = {pos: number for number, pos in enumerate(DARK_SQUARES, 1)}
+
+
+def parse_fen(fen, pieces):
+    """Разбирает шахматную FEN.
+
+    Args:
+        fen (str): Строка FEN (поля после очереди хода необязательны).
+        pieces (dict): Буква фигуры (заглавная) -> класс фигуры.
+
+    Returns:
+        tuple: (grid, side, fullmove) - сетка 8x8, очередь хода ('W' или 'B')
+            и номер хода.
+
+    Raises:
+        ValueError: Если строка не является допустимой FEN.
+    """
+    fields = fen.split()
+    if not fields:
+        raise ValueError("Пустая FEN")
+    rows = fields[0].split('/')
+    if len(rows) != 8:
+        raise ValueError(f"В FEN должно быть 8 горизонталей: {fen}")
+    grid = []
+    for text in rows:
+        row = []
+        for char in text:
+            if char.isdigit():
+                row.extend([None] * int(char))
+            elif char.upper() in pieces:
+                row.append(pieces[char.upper()]('W' if char.isupper() else 'B'))
+            else:
+                raise ValueError(f"Неизвестная фигура '{char}' в FEN: {fen}")
+        if len(row) != 8:
+            raise ValueError(f"Горизонталь '{text}' в FEN не из 8 клеток: {fen}")
+        grid.append(row)
+
+    side = fields[1] if len(fields) > 1 else 'w'
+    if side not in ('w', 'b'):
+        raise ValueError(f"Неверная очередь хода '{side}' в FEN: {fen}")
+    fullmove = fields[5] if len(fields) > 5 else '1'
+    if not fullmove.isdigit() or int(fullmove) < 1:
+        raise ValueError(f"Неверный номер хода '{fullmove}' в FEN: {fen}")
+    return grid, side.upper(), int(fullmove)
+
+
+def format_fen(grid, side='W', fullmove=1):
+    """Записывает позицию в шахматную FEN.
+
+    Args:
+        grid (list): Сетка 8x8 с фигурами.
+        side (str): Очередь хода.
+        fullmove (int): Номер хода.
+
+    Returns:
+        str: Строка FEN.
+    """
+    rows = []
+    for row in grid:
+        text, empty = '', 0
+        for piece in row:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            text += piece.name if piece.color == 'W' else piece.name.lower()
+        rows.append(text + (str(empty) if empty else ''))
+    return f"{'/'.join(rows)} {side.lower()} - - 0 {fullmove}"
+
+
+def _draughts_square(text):
+    """Переводит номер клетки 1..32 или запись 'c3' в позицию (row, col)."""
+    if text.isdigit() and 1 <= int(text) <= 32:
+        return DARK_SQUARES[int(text) - 1]
+    if len(text) == 2 and text[0] in 'abcdefgh' and text[1] in '12345678':
+        pos = (8 - int(text[1]), ord(text[0]) - ord('a'))
+        if pos in DARK_NUMBERS:
+            return pos
+    raise ValueError(f"Неверная клетка '{text}' в FEN шашек")
+
+
+def parse_draughts_fen(fen, checker, king):
+    """Разбирает FEN шашек.
+
+    Args:
+        fen (str): Строка вида 'W:W21,22,K30:B1,2,3' (точка в конце допускается).
+        checker (callable): color -> объект простой шашки.
+        king (callable): color -> объект дамки.
+
+    Returns:
+        tuple: (grid, side) - сетка 8x8 и очередь хода.
+
+    Raises:
+        ValueError: Если строка не является допустимой FEN шашек.
+    """
+    fields = fen.strip().rstrip('.').split(':')
+    if len(fields) != 3 or fields[0] not in ('W', 'B'):
+        raise ValueError(f"Неверная FEN шашек: {fen}")
+    grid = [[None] * 8 for _ in range(8)]
+    for field in fields[1:]:
+        color = field[:1]
+        if color not in ('W', 'B'):
+            raise ValueError(f"Неверный цвет '{color}' в FEN шашек: {fen}")
+        for text in filter(None, field[1:].split(',')):
+            make = king if text[0] == 'K' else checker
+            row, col = _draughts_square(text.lstrip('K'))
+            grid[row][col] = make(color)
+    return grid, fields[0]
+
+
+def format_draughts_fen(grid, side='W'):
+    """Записывает позицию шашек в FEN (клетки номерами 1..32, K - дамка)."""
+    lists = {'W': [], 'B': []}
+    for number, (row, col) in enumerate(DARK_SQUARES, 1):
+        piece = grid[row][col]
+        if piece:
+            lists[piece.color].append(f"{'K' if piece.name == 'D' else ''}{number}")
+    return f"{side}:W{','.join(lists['W'])}:B{','.join(lists['B'])}"
@@ -0,0 +1,262 @@
+"""Необязательное инструментирование горячих методов chessbase, chess167 и shashki.
+
+Пока инструментирование выключено, классы игры не затронуты и ничего не
+стоят. `enable` подменяет методы классов обёртками, которые считают вызовы
+и время (полное и собственное, без вложенных инструментированных вызовов)
+с разбивкой по классам фигур; `disable` возвращает исходные функции.
+
+Данные выгружаются в JSON (`to_json`) или в формат cProfile (`dump_stats`),
+который читает `pstats.Stats` и внешние просмотрщики. В `Game.play` всех
+трёх игр есть команда `stats` (см. `command`); переменная окружения
+CHESS_PROFILE=1 включает сбор с начала партии.
+
+Пример:
+    instrument.enable()
+    chess167.Game().board.generate_moves('W')
+    print(instrument.report())
+    instrument.dump_stats('moves.prof')
+"""
+
+import importlib
+import json
+import marshal
+import os
+import sys
+import time
+import types
+from functools import wraps
+
+MODULES = ('chessbase', 'chess167', 'shashki')
+# Методы фигур (разбиваются по классу фигуры, на которой вызваны)
+PIECE_METHODS = ('is_valid_move', 'get_possible_moves')
+# Методы доски; у методов с клеткой первым аргументом - по классу фигуры на этой клетке
+BOARD_METHODS = ('get_moves', 'generate_moves', 'fill_moves', 'legal_moves', 'move_piece', 'get_threatened_pieces',
+                 'get_threat_report', 'display', 'display_with_hints')
+SQUARE_METHODS = frozenset(('get_moves', 'move_piece'))
+# Разбор ввода
+GAME_METHODS = ('parse_input', 'parse_path', 'apply_move')
+
+_installed = []
+# Ключ (module, class, method, piece) -> [вызовы, полное время, собственное время, {вызывающий: вызовы}]
+_stats = {}
+# Код исходных функций по ключу (для формата cProfile)
+_code = {}
+# Стек активных вызовов: [ключ, накопленное время вложенных вызовов]
+_stack = []
+# Число активных вызовов по ключу: полное время рекурсивных вызовов считается один раз
+_active = {}
+
+
+def enabled():
+    """Проверяет, включено ли инструментирование."""
+    return bool(_installed)
+
+
+def _wrap(function, key_of):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        key = key_of(args)
+        if key not in _code:
+            _code[key] = function.__code__
+        frame = [key, 0.0]
+        parent = _stack[-1][0] if _stack else None
+        _stack.append(frame)
+        _active[key] = _active.get(key, 0) + 1
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _stack.pop()
+            _active[key] -= 1
+            entry = _stats.get(key)
+            if entry is None:
+                entry = _stats[key] = [0, 0.0, 0.0, {}]
+            entry[0] += 1
+            if not _active[key]:
+                entry[1] += elapsed
+            entry[2] += elapsed - frame[1]
+            if parent is not None:
+                entry[3][parent] = entry[3].get(parent, 0) + 1
+            if _stack:
+                _stack[-1][1] += elapsed
+    wrapper.__wrapped_original__ = function
+    return wrapper
+
+
+def _piece_key(module, method):
+    def key_of(args):
+        return module, 'Piece', method, type(args[0]).__name__
+    return key_of
+
+
+def _board_key(module, cls, method):
+    if method not in SQUARE_METHODS:
+        return lambda args: (module, cls, method, None)
+
+    def key_of(args):
+        start = args[1] if len(args) > 1 else None
+        try:
+            piece = args[0].grid[start[0]][start[1]]
+        except (TypeError, IndexError):
+            piece = None
+        return module, cls, method, type(piece).__name__ if piece else None
+    return key_of
+
+
+def _install(cls, method, key_of):
+    function = cls.__dict__.get(method)
+    if isinstance(function, types.FunctionType) and not hasattr(function, '__wrapped_original__'):
+        setattr(cls, method, _wrap(function, key_of))
+        _installed.append((cls, method, function))
+
+
+def enable(*modules):
+    """Включает инструментирование модулей игры.
+
+    Args:
+        modules: Модули (объекты) или их имена; по умолчанию chessbase, chess167 и shashki.
+    """
+    for module in modules or MODULES:
+        if isinstance(module, str):
+            module = importlib.import_module(module)
+        name = module.__name__
+        base = getattr(module, 'Piece', None)
+        for cls in list(vars(module).values()):
+            if not isinstance(cls, type) or cls.__module__ != name:
+                continue
+            if base is not None and issubclass(cls, base):
+                for method in PIECE_METHODS:
+                    _install(cls, method, _piece_key(name, method))
+            elif cls.__name__ == 'Board':
+                for method in BOARD_METHODS:
+                    _install(cls, method, _board_key(name, 'Board', method))
+            elif cls.__name__ == 'Game':
+                for method in GAME_METHODS:
+                    _install(cls, method, _board_key(name, 'Game', method))
+
+
+def disable():
+    """Возвращает исходные методы (собранные данные сохраняются)."""
+    while _installed:
+        cls, method, function = _installed.pop()
+        setattr(cls, method, function)
+    _stack.clear()
+    _active.clear()
+
+
+def reset():
+    """Очищает собранные данные."""
+    _stats.clear()
+    _code.clear()
+
+
+def enable_from_environment(*modules):
+    """Включает инструментирование, если задана переменная окружения CHESS_PROFILE."""
+    if os.environ.get('CHESS_PROFILE', '') not in ('', '0') and not enabled():
+        enable(*modules)
+
+
+def _name(key):
+    module, cls, method, piece = key
+    return f"{module}.{cls}.{method}" + (f"[{piece}]" if piece else '')
+
+
+def snapshot():
+    """Собранные данные в виде списка словарей (сначала самые долгие по собственному времени).
+
+    Returns:
+        list: Словари name, module, method, piece, calls, total, own (время в секундах).
+    """
+    rows = []
+    for key, (calls, total, own, _) in _stats.items():
+        module, cls, method, piece = key
+        rows.append({'name': _name(key), 'module': module, 'method': f"{cls}.{method}", 'piece': piece,
+                     'calls': calls, 'total': total, 'own': own})
+    rows.sort(key=lambda row: -row['own'])
+    return rows
+
+
+def report(limit=20):
+    """Текстовая таблица самых долгих методов."""
+    rows = snapshot()
+    if not rows:
+        return "Нет данных: инструментирование выключено или ещё ничего не вызывалось."
+    lines = [f"{'вызовы':>9} {'всего, с':>10} {'своё, с':>10} {'мкс/вызов':>10}  метод"]
+    for row in rows[:limit]:
+        per_call = row['own'] / row['calls'] * 1e6
+        lines.append(f"{row['calls']:9} {row['total']:10.4f} {row['own']:10.4f} {per_call:10.1f}  {row['name']}")
+    return '\n'.join(lines)
+
+
+def to_json(path=None):
+    """Выгружает данные в JSON (в файл `path` или строкой, если путь не задан)."""
+    text = json.dumps({'enabled': enabled(), 'functions': snapshot()}, ensure_ascii=False, indent=2)
+    if path is None:
+        return text
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return path
+
+
+def _profile_key(key):
+    code = _code[key]
+    module, cls, method, piece = key
+    return code.co_filename, code.co_firstlineno, f"{cls}.{method}" + (f"[{piece}]" if piece else '')
+
+
+def dump_stats(path):
+    """Записывает данные в формате cProfile (читается `pstats.Stats(path)`)."""
+    stats = {}
+    for key, (calls, total, own, callers) in _stats.items():
+        caller_stats = {_profile_key(parent): (count, count, 0.0, 0.0) for parent, count in callers.items()}
+        stats[_profile_key(key)] = (calls, calls, own, total, caller_stats)
+    with open(path, 'wb') as file:
+        marshal.dump(stats, file)
+    return path
+
+
+def command(argument, *modules):
+    """Выполняет команду `stats` из `Game.play` и возвращает текст ответа.
+
+    Команды: stats, stats on, stats off, stats reset, stats json <файл>, stats pstats <файл>.
+    """
+    words = argument.split()
+    action = words[0] if words else ''
+    if action == 'on':
+        enable(*modules)
+        return "Инструментирование включено."
+    if action == 'off':
+        disable()
+        return "Инструментирование выключено."
+    if action == 'reset':
+        reset()
+        return "Данные очищены."
+    if action in ('json', 'pstats') and len(words) == 2:
+        (to_json if action == 'json' else dump_stats)(words[1])
+        return f"Данные записаны в {words[1]}."
+    if action:
+        return "Команды: stats, stats on, stats off, stats reset, stats json <файл>, stats pstats <файл>."
+    if not enabled() and not _stats:
+        return "Инструментирование выключено: 'stats on' или CHESS_PROFILE=1."
+    return report()
+
+
+def main(argv=None):
+    """Печатает сводку из JSON-выгрузки: python instrument.py stats.json."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Использование: python instrument.py <выгрузка.json>")
+        return 2
+    with open(argv[0], encoding='utf-8') as file:
+        data = json.load(file)
+    _stats.clear()
+    for row in data['functions']:
+        cls, method = row['method'].split('.', 1)
+        _stats[(row['module'], cls, method, row['piece'])] = [row['calls'], row['total'], row['own'], {}]
+    print(report(limit=len(_stats)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Реестр правил движения фигур.
+
+Каждый тип фигуры описывает движение набором дескрипторов:
+    Leaper - прыжок на заданные смещения (промежуточные клетки не важны);
+    Rider  - движение по лучам до первой занятой клетки, не дальше max_range.
+
+Смещения задаются для белых (строка 0 - восьмая горизонталь); для чёрных
+строковая составляющая меняет знак. Дескрипторы компилируются один раз в
+списки лучей для каждой клетки, и один генератор обслуживает все фигуры.
+"""
+
+from collections import namedtuple
+
+from moves import CAPTURE as CAPTURE_FLAG
+from moves import PIECE_CODES
+
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2))
+
+# Режимы дескриптора: обычный ход со взятием, только тихий ход, только взятие
+BOTH, MOVE, CAPTURE = 0, 1, 2
+
+
+class Leaper(namedtuple('Leaper', 'offsets capture_only move_only')):
+    """Прыгающая фигура: ходит на каждое из смещений `offsets`, не проверяя путь.
+
+    Атрибуты:
+        offsets (tuple): Смещения (drow, dcol) для белых.
+        capture_only (bool): Ход разрешён только со взятием.
+        move_only (bool): Ход разрешён только на пустую клетку.
+    """
+
+    def __new__(cls, offsets, capture_only=False, move_only=False):
+        return super().__new__(cls, tuple(offsets), capture_only, move_only)
+
+
+class Rider(namedtuple('Rider', 'directions max_range initial_range capture_only move_only')):
+    """Дальнобойная фигура: идёт по каждому направлению до первой занятой клетки.
+
+    Атрибуты:
+        directions (tuple): Направления (drow, dcol) для белых.
+        max_range (int): Максимальная длина хода.
+        initial_range (int): Длина хода с начальной горизонтали (None - как max_range).
+        capture_only (bool): Ход разрешён только со взятием.
+        move_only (bool): Ход разрешён только на пустые клетки.
+    """
+
+    def __new__(cls, directions, max_range=7, initial_range=None, capture_only=False, move_only=False):
+        return super().__new__(cls, tuple(directions), max_range, initial_range, capture_only, move_only)
+
+
+# Движение стандартных фигур; каждый вариант игры начинает с копии этого набора
+STANDARD = {
+    'P': (Rider([(-1, 0)], max_range=1, initial_range=2, move_only=True),
+          Leaper([(-1, -1), (-1, 1)], capture_only=True)),
+    'R': (Rider(ROOK_DIRECTIONS),),
+    'N': (Leaper(KNIGHT_OFFSETS),),
+    'B': (Rider(BISHOP_DIRECTIONS),),
+    'Q': (Rider(QUEEN_DIRECTIONS),),
+    'K': (Leaper(QUEEN_DIRECTIONS),),
+}
+
+# Начальная горизонталь для `Rider.initial_range` (как у пешек)
+INITIAL_ROWS = {'W': 6, 'B': 1}
+
+# Реестры движения по вариантам игры: REGISTRIES[variant][name] -> дескрипторы
+REGISTRIES = {}
+
+_compiled = {}
+_targets = {}
+_reach = {}
+
+
+def registry(variant):
+    """Возвращает реестр варианта `variant`, создавая его из стандартных фигур.
+
+    Реестры вариантов независимы: фигура, зарегистрированная в одном варианте,
+    не меняет правила другого.
+
+    Args:
+        variant (str): Название варианта (например, 'chessbase' или 'chess167').
+
+    Returns:
+        dict: Название фигуры -> дескрипторы движения.
+    """
+    table = REGISTRIES.get(variant)
+    if table is None:
+        table = REGISTRIES[variant] = dict(STANDARD)
+    return table
+
+
+def register(variant, name, movement):
+    """Регистрирует (или заменяет) движение фигуры `name` в варианте `variant`.
+
+    Args:
+        variant (str): Название варианта.
+        name (str): Название фигуры (например, 'U').
+        movement (tuple): Дескрипторы Leaper/Rider.
+
+    Returns:
+        tuple: Те же дескрипторы.
+    """
+    table = registry(variant)
+    table[name] = tuple(movement)
+    return table[name]
+
+
+def descriptor_mode(descriptor):
+    """Возвращает режим дескриптора: BOTH, MOVE или CAPTURE."""
+    if descriptor.capture_only:
+        return CAPTURE
+    if descriptor.move_only:
+        return MOVE
+    return BOTH
+
+
+def oriented(direction, color):
+    """Разворачивает смещение для чёрных (строковая составляющая меняет знак)."""
+    return (direction[0], direction[1]) if color == 'W' else (-direction[0], direction[1])
+
+
+def descriptor_rays(descriptor, color, sq):
+    """Возвращает лучи дескриптора с клетки `sq` в виде списков номеров клеток.
+
+    Прыжок Leaper - луч из одной клетки, поэтому генератор обрабатывает оба вида одинаково.
+
+    Args:
+        descriptor (Leaper | Rider): Дескриптор движения.
+        color (str): Цвет фигуры.
+        sq (int): Клетка фигуры.
+
+    Returns:
+        list: Непустые лучи (списки клеток в порядке удаления от `sq`).
+    """
+    row, col = divmod(sq, 8)
+    rays = []
+    if isinstance(descriptor, Leaper):
+        for offset in descriptor.offsets:
+            drow, dcol = oriented(offset, color)
+            if 0 <= row + drow < 8 and 0 <= col + dcol < 8:
+                rays.append([(row + drow) * 8 + col + dcol])
+        return rays
+
+    max_range = descriptor.max_range
+    if descriptor.initial_range is not None and row == INITIAL_ROWS[color]:
+        max_range = descriptor.initial_range
+    for direction in descriptor.directions:
+        drow, dcol = oriented(direction, color)
+        ray = []
+        for distance in range(1, max_range + 1):
+            new_row, new_col = row + drow * distance, col + dcol * distance
+            if not (0 <= new_row < 8 and 0 <= new_col < 8):
+                break
+            ray.append(new_row * 8 + new_col)
+        if ray:
+            rays.append(ray)
+    return rays
+
+
+def compiled_rays(movement, color):
+    """Компилирует дескрипторы в списки лучей для каждой клетки.
+
+    Args:
+        movement (tuple): Дескрипторы Leaper/Rider.
+        color (str): Цвет фигуры.
+
+    Returns:
+        list: Для каждой клетки 0..63 - список пар (луч, режим), где луч - список позиций (row, col).
+    """
+    key = (movement, color)
+    table = _compiled.get(key)
+    if table is None:
+        table = []
+        for sq in range(64):
+            table.append([([divmod(target, 8) for target in ray], descriptor_mode(descriptor))
+                          for descriptor in movement for ray in descriptor_rays(descriptor, color, sq)])
+        _compiled[key] = table
+    return table
+
+
+def reach_masks(movement, color):
+    """Маски клеток, от содержимого которых зависят ходы фигуры.
+
+    Это клетка фигуры и все клетки её лучей без учёта блокировки: ходы
+    фигуры могут измениться, только если изменилась одна из этих клеток.
+
+    Returns:
+        list: Для каждой клетки 0..63 - маска (int).
+    """
+    key = (movement, color)
+    masks = _reach.get(key)
+    if masks is None:
+        masks = []
+        for sq, rays in enumerate(compiled_rays(movement, color)):
+            mask = 1 << sq
+            for ray, _ in rays:
+                for row, col in ray:
+                    mask |= 1 << (row * 8 + col)
+            masks.append(mask)
+        _reach[key] = masks
+    return masks
+
+
+def generate_moves(movement, color, start, board):
+    """Единый генератор ходов по скомпилированным лучам.
+
+    Args:
+        movement (tuple): Дескрипторы движения фигуры.
+        color (str): Цвет фигуры.
+        start (tuple): Позиция фигуры (row, col).
+        board (list): Сетка 8x8 с фигурами или None.
+
+    Returns:
+        list: Список позиций (row, col), куда может пойти фигура.
+    """
+    moves = []
+    for ray, mode in compiled_rays(movement, color)[start[0] * 8 + start[1]]:
+        for row, col in ray:
+            target = board[row][col]
+            if target is None:
+                if mode != CAPTURE:
+                    moves.append((row, col))
+            else:
+                if mode != MOVE and target.color != color:
+                    moves.append((row, col))
+                break
+    return moves
+
+
+def compiled_targets(movement, color):
+    """Компилирует дескрипторы в словари целей для каждой клетки.
+
+    Returns:
+        list: Для каждой клетки 0..63 - словарь {цель (row, col): [(путь, режим), ...]},
+            где путь - клетки луча перед целью, которые должны быть пустыми.
+    """
+    key = (movement, color)
+    table = _targets.get(key)
+    if table is None:
+        table = []
+        for rays in compiled_rays(movement, color):
+            targets = {}
+            for ray, mode in rays:
+                for index, target in enumerate(ray):
+                    targets.setdefault(target, []).append((ray[:index], mode))
+            table.append(targets)
+        _targets[key] = table
+    return table
+
+
+def can_move(movement, color, start, end, board):
+    """Проверяет ход на клетку `end` без построения списка всех ходов.
+
+    Просматриваются только лучи, проходящие через `end`, и только клетки перед ней.
+
+    Args:
+        movement (tuple): Дескрипторы движения фигуры.
+        color (str): Цвет фигуры.
+        start (tuple): Позиция фигуры (row, col).
+        end (tuple): Целевая позиция (row, col).
+        board (list): Сетка 8x8 с фигурами или None.
+
+    Returns:
+        bool: True, если ход допустим.
+    """
+    target = board[end[0]][end[1]]
+    if target is not None and target.color == color:
+        return False
+    for path, mode in compiled_targets(movement, color)[start[0] * 8 + start[1]].get(end, ()):
+        if (mode == MOVE and target is not None) or (mode == CAPTURE and target is None):
+            continue
+        for row, col in path:
+            if board[row][col] is not None:
+                break
+        else:
+            return True
+    return False
+
+
+def fill_moves(movement, color, start, board, buffer):
+    """Дописывает в буфер упакованные ходы фигуры (см. модуль `moves`).
+
+    Args:
+        movement (tuple): Дескрипторы движения фигуры.
+        color (str): Цвет фигуры.
+        start (tuple): Позиция фигуры (row, col).
+        board (list): Сетка 8x8 с фигурами или None.
+        buffer (MoveList): Буфер, в который добавляются ходы.
+    """
+    start_sq = start[0] * 8 + start[1]
+    for ray, mode in compiled_rays(movement, color)[start_sq]:
+        for row, col in ray:
+            target = board[row][col]
+            if target is None:
+                if mode != CAPTURE:
+                    buffer.append(start_sq | (row * 8 + col) << 6)
+            else:
+                if mode != MOVE and target.color != color:
+                    buffer.append(start_sq | (row * 8 + col) << 6 | CAPTURE_FLAG << 12 |
+                                  PIECE_CODES[target.name] << 20)
+                break
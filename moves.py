@@ -0,0 +1,135 @@
+"""Компактное представление хода одним числом и переиспользуемые буферы ходов.
+
+Раскладка битов хода:
+    0-5   - исходная клетка (row * 8 + col);
+    6-11  - целевая клетка;
+    12-15 - флаги (CAPTURE, PROMOTION);
+    16-19 - код фигуры, в которую превращается ходящая (0 - нет превращения);
+    20-23 - код взятой фигуры (0 - без взятия);
+    24-   - номер цепочки взятий среди цепочек с теми же клетками (только шашки).
+
+Такой ход не требует кортежей, сравнивается и хешируется как число, его
+можно хранить в массивах и передавать между процессами без сериализации.
+"""
+
+CAPTURE = 1
+PROMOTION = 2
+
+# Коды фигур всех вариантов (0 зарезервирован за "нет фигуры"); 'D' - и дракон, и дамка
+PIECE_CODES = {name: code for code, name in enumerate('PRNBQKUDSC', 1)}
+PIECE_NAMES = {code: name for name, code in PIECE_CODES.items()}
+
+# Позиции (row, col) всех клеток, чтобы не создавать кортежи на горячем пути
+POSITIONS = tuple(divmod(sq, 8) for sq in range(64))
+
+
+def encode(start_sq, end_sq, flags=0, promotion=None, captured=None):
+    """Упаковывает ход в число.
+
+    Args:
+        start_sq (int): Исходная клетка 0..63.
+        end_sq (int): Целевая клетка 0..63.
+        flags (int): Комбинация флагов CAPTURE и PROMOTION.
+        promotion (str): Название фигуры, в которую превращается ходящая, или None.
+        captured (str): Название взятой фигуры или None.
+
+    Returns:
+        int: Упакованный ход.
+    """
+    move = start_sq | end_sq << 6 | flags << 12
+    if promotion:
+        move |= (PROMOTION << 12) | PIECE_CODES[promotion] << 16
+    if captured:
+        move |= (CAPTURE << 12) | PIECE_CODES[captured] << 20
+    return move
+
+
+def start_square(move):
+    """Исходная клетка хода."""
+    return move & 63
+
+
+def end_square(move):
+    """Целевая клетка хода."""
+    return move >> 6 & 63
+
+
+def move_flags(move):
+    """Флаги хода."""
+    return move >> 12 & 15
+
+
+def promotion(move):
+    """Название фигуры превращения или None."""
+    return PIECE_NAMES.get(move >> 16 & 15)
+
+
+def captured(move):
+    """Название взятой фигуры или None."""
+    return PIECE_NAMES.get(move >> 20 & 15)
+
+
+def positions(move):
+    """Возвращает пару позиций (start, end) хода (общие кортежи, без выделения памяти)."""
+    return POSITIONS[move & 63], POSITIONS[move >> 6 & 63]
+
+
+def to_text(move):
+    """Запись хода в формате 'e2e4'."""
+    start, end = positions(move)
+    return f"{chr(ord('a') + start[1])}{8 - start[0]}{chr(ord('a') + end[1])}{8 - end[0]}"
+
+
+class MoveList:
+    """Буфер ходов, который заполняется на месте и переиспользуется между вызовами.
+
+    Список внутри буфера не сжимается при `clear`, поэтому после первых
+    заполнений генерация ходов не выделяет память под список.
+
+    Атрибуты:
+        moves (list): Хранилище упакованных ходов (значимы первые `count`).
+        count (int): Число ходов в буфере.
+    """
+
+    __slots__ = ('moves', 'count')
+
+    def __init__(self, capacity=256):
+        """Создаёт пустой буфер.
+
+        Args:
+            capacity (int): Начальная ёмкость (буфер растёт при необходимости).
+        """
+        self.moves = [0] * capacity
+        self.count = 0
+
+    def clear(self):
+        """Опустошает буфер, сохраняя выделенную память."""
+        self.count = 0
+
+    def append(self, move):
+        """Добавляет упакованный ход."""
+        if self.count == len(self.moves):
+            self.moves.append(move)
+        else:
+            self.moves[self.count] = move
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        return self.moves[index % self.count]
+
+    def __iter__(self):
+        moves = self.moves
+        for index in range(self.count):
+            yield moves[index]
+
+    def __contains__(self, move):
+        moves = self.moves
+        for index in range(self.count):
+            if moves[index] == move:
+                return True
+        return False
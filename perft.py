@@ -0,0 +1,230 @@
+"""Perft: подсчёт листьев дерева ходов для chessbase, chess167 и shashki.
+
+Perft(N) - число позиций, достижимых ровно за N полуходов. Совпадение с
+эталонными числами проверяет генератор ходов, а время подсчёта - его скорость.
+
+Примеры запуска:
+    python perft.py chess167 --depth 3
+    python perft.py chessbase --depth 3 --moves e2e4 e7e5 --backend bitboard
+    python perft.py chess167 --fen "4k3/8/8/3D4/8/8/8/4K3 w - - 0 1" --depth 4
+    python perft.py --check
+    python perft.py --bench --output bench.json
+"""
+
+import argparse
+import importlib
+import json
+import sys
+import time
+
+from moves import MoveList, to_text
+
+MODULES = ('chessbase', 'chess167', 'shashki')
+
+# Эталонные числа по правилам модулей (без рокировки, взятия на проходе,
+# превращения и проверки шаха): REFERENCE[(module, moves)] -> [perft(1), perft(2), ...]
+REFERENCE = {
+    ('chessbase', ''): [20, 400, 8902],
+    ('chessbase', 'e2e4 e7e5 g1f3'): [29, 781, 23375],
+    ('chess167', ''): [28, 784, 23432],
+    ('chess167', 'e4d5 c5f2'): [32, 731],
+    ('shashki', ''): [7, 49, 302, 1469, 7482],
+    ('shashki', 'c3d4 f6e5'): [1, 2, 14, 99],
+}
+
+
+def load_game(module, backend='grid', moves='', fen=None):
+    """Создаёт игру модуля `module` и проигрывает в ней ходы `moves`.
+
+    Args:
+        module (str): Имя модуля ('chessbase', 'chess167' или 'shashki').
+        backend (str): Представление доски.
+        moves (str): Ходы через пробел в формате 'e2e4'.
+        fen (str): Начальная позиция в FEN (None - исходная расстановка).
+
+    Returns:
+        Game: Игра в позиции после ходов.
+
+    Raises:
+        ValueError: Если один из ходов недопустим.
+    """
+    game_module = importlib.import_module(module)
+    if fen:
+        game = game_module.Game.from_fen(fen, backend)
+    else:
+        game = game_module.Game(backend)
+    for move in moves.split():
+        start, end = game.parse_input(move.replace('-', ''))
+        if not (start and end and game.board.move_piece(start, end)):
+            raise ValueError(f"Недопустимый ход {move} в модуле {module}")
+        game.current_turn = 'B' if game.current_turn == 'W' else 'W'
+    return game
+
+
+def perft(board, color, depth, per_ply=None, ply=0, buffers=None):
+    """Считает число листьев дерева ходов глубины `depth`.
+
+    Ходы генерируются упакованными числами в буферы, по одному на уровень
+    дерева, поэтому перебор не создаёт списков ходов.
+
+    Args:
+        board (Board): Доска (после подсчёта возвращается в исходную позицию).
+        color (str): Цвет ходящей стороны.
+        depth (int): Оставшаяся глубина.
+        per_ply (list): Если задан, в per_ply[i] накапливается число узлов на полуходе i + 1.
+        ply (int): Текущий полуход от корня.
+        buffers (list): Буферы ходов по оставшейся глубине (создаются при первом вызове).
+
+    Returns:
+        int: Число листьев.
+    """
+    if depth == 0:
+        return 1
+    if buffers is None:
+        buffers = [MoveList() for _ in range(depth + 1)]
+    moves = board.fill_moves(color, buffers[depth])
+    if per_ply is not None:
+        per_ply[ply] += len(moves)
+    if depth == 1:
+        # Листья не делаются и не отменяются: их число равно числу ходов
+        return len(moves)
+    opponent = 'B' if color == 'W' else 'W'
+    nodes = 0
+    items = moves.moves
+    for index in range(moves.count):
+        move = items[index]
+        if not board.make_packed(move):
+            raise RuntimeError(f"Сгенерирован недопустимый ход {to_text(move)}")
+        nodes += perft(board, opponent, depth - 1, per_ply, ply + 1, buffers)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, color, depth):
+    """Возвращает perft(depth - 1) для каждого хода из корня.
+
+    Returns:
+        dict: Ход в формате 'e2e4' -> число листьев.
+    """
+    opponent = 'B' if color == 'W' else 'W'
+    result = {}
+    for move in board.fill_moves(color):
+        if not board.make_packed(move):
+            raise RuntimeError(f"Сгенерирован недопустимый ход {to_text(move)}")
+        result[to_text(move)] = perft(board, opponent, depth - 1)
+        board.unmake_move()
+    return result
+
+
+def format_move(start, end):
+    """Переводит пару позиций в запись вида 'e2e4'."""
+    return f"{chr(ord('a') + start[1])}{8 - start[0]}{chr(ord('a') + end[1])}{8 - end[0]}"
+
+
+def run(module, depth, backend='grid', moves='', fen=None):
+    """Считает perft с разбивкой по полуходам и замером скорости.
+
+    Args:
+        module (str): Имя модуля.
+        depth (int): Глубина.
+        backend (str): Представление доски.
+        moves (str): Ходы от начальной позиции.
+        fen (str): Начальная позиция в FEN (None - исходная расстановка).
+
+    Returns:
+        dict: Результат (модуль, позиция, узлы по полуходам, время, узлов в секунду).
+    """
+    game = load_game(module, backend, moves, fen)
+    per_ply = [0] * depth
+    started = time.perf_counter()
+    nodes = perft(game.board, game.current_turn, depth, per_ply)
+    seconds = time.perf_counter() - started
+    return {
+        'module': module,
+        'backend': backend,
+        'fen': fen,
+        'moves': moves,
+        'depth': depth,
+        'per_ply': per_ply,
+        'nodes': nodes,
+        'seconds': round(seconds, 6),
+        'nps': round(sum(per_ply) / seconds) if seconds else 0,
+    }
+
+
+def check(backends=('grid', 'bitboard'), max_depth=None):
+    """Сверяет perft со всеми эталонными числами.
+
+    Args:
+        backends (tuple): Проверяемые представления доски.
+        max_depth (int): Ограничение глубины (None - все эталонные глубины).
+
+    Returns:
+        list: Описания расхождений (пустой список, если всё совпало).
+    """
+    failures = []
+    for (module, moves), expected in REFERENCE.items():
+        expected = expected[:max_depth] if max_depth else expected
+        for backend in backends:
+            result = run(module, len(expected), backend, moves)
+            status = 'ok' if result['per_ply'] == expected else 'FAIL'
+            print(f"{status:4} {module:9} {backend:8} [{moves}] {result['per_ply']} {result['nps']} узлов/с")
+            if status != 'ok':
+                failures.append((module, backend, moves, expected, result['per_ply']))
+    return failures
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Perft для chessbase, chess167 и shashki.")
+    parser.add_argument('module', nargs='?', choices=MODULES, help="модуль игры")
+    parser.add_argument('--depth', type=int, default=3, help="глубина perft")
+    parser.add_argument('--moves', nargs='*', default=[], help="ходы от начальной позиции (e2e4 e7e5 ...)")
+    parser.add_argument('--fen', help="начальная позиция в FEN (для shashki - FEN шашек)")
+    parser.add_argument('--backend', default='grid', choices=('grid', 'bitboard'), help="представление доски")
+    parser.add_argument('--divide', action='store_true', help="вывести число листьев для каждого хода из корня")
+    parser.add_argument('--check', action='store_true', help="сверить с эталонными числами")
+    parser.add_argument('--bench', action='store_true', help="замерить скорость на эталонных позициях")
+    parser.add_argument('--output', help="файл для результатов замера в формате JSON")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return 1 if check() else 0
+
+    if args.bench:
+        results = []
+        for (module, moves), expected in REFERENCE.items():
+            for backend in ('grid', 'bitboard'):
+                result = run(module, len(expected), backend, moves)
+                result['ok'] = result['per_ply'] == expected
+                results.append(result)
+                print(f"{module:9} {backend:8} [{moves}] глубина {result['depth']}: "
+                      f"{result['nodes']} за {result['seconds']:.3f} с, {result['nps']} узлов/с")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        return 0 if all(result['ok'] for result in results) else 1
+
+    if not args.module:
+        parser.error("укажите модуль или --check/--bench")
+    moves = ' '.join(args.moves)
+    if args.divide:
+        game = load_game(args.module, args.backend, moves, args.fen)
+        counts = divide(game.board, game.current_turn, args.depth)
+        for move, nodes in sorted(counts.items()):
+            print(f"{move}: {nodes}")
+        print(f"Всего: {sum(counts.values())}")
+        return 0
+
+    result = run(args.module, args.depth, args.backend, moves, args.fen)
+    for ply, nodes in enumerate(result['per_ply'], 1):
+        print(f"Полуход {ply}: {nodes}")
+    print(f"Листьев: {result['nodes']}, время: {result['seconds']:.3f} с, {result['nps']} узлов/с")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(result, output, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
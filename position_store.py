@@ -0,0 +1,238 @@
+"""Компактная двоичная запись позиций и хранилище позиций в файле, отображаемом в память.
+
+Запись позиции имеет фиксированный размер RECORD_SIZE = 41 байт:
+    0-31  - 64 полубайта с кодами фигур (`moves.PIECE_CODES`, 0 - пусто);
+            клетка sq хранится в байте sq // 2, чётная клетка - в младшем полубайте;
+    32-39 - маска клеток с чёрными фигурами (little-endian);
+    40    - флаги: бит 0 - очередь хода чёрных.
+
+Файл хранилища - заголовок HEADER (сигнатура, версия, размер записи, число
+записей, вариант игры) и записи подряд, поэтому запись i читается по
+смещению без разбора остального файла.
+
+Отдельные клетки читаются прямо из записи (`piece_at`, `iter_pieces`), без
+распаковки позиции. `unpack_bitboards` обходит только занятые клетки. Сетка
+доски (`unpack_grid`, `Board.from_packed`) распаковывается целиком: доска
+читает и меняет `grid` напрямую. Но фигуры - общие неизменяемые объекты, а
+пустые клетки - None, поэтому создаются только девять списков сетки.
+
+Пример:
+    with PositionWriter('positions.bin', 'chess167') as writer:
+        writer.write(board.to_packed('W'))
+    with PositionStore('positions.bin') as store:
+        record = store[i]
+        board = chess167.Board.from_packed(record)
+        side = side_to_move(record)
+"""
+
+import mmap
+import struct
+
+from bitboard import BitboardPosition
+from moves import PIECE_CODES, PIECE_NAMES
+
+MAGIC = b'CPOS'
+VERSION = 1
+RECORD_SIZE = 41
+BLACK_TO_MOVE = 1
+# Сигнатура, версия, размер записи, число записей, вариант (32 байта)
+HEADER = struct.Struct('<4sHHQ16s')
+
+
+def pack(grid, side='W'):
+    """Записывает позицию в 41 байт.
+
+    Args:
+        grid (list): Сетка 8x8 с фигурами.
+        side (str): Очередь хода.
+
+    Returns:
+        bytes: Запись позиции.
+    """
+    record = bytearray(RECORD_SIZE)
+    black = 0
+    for row in range(8):
+        for col in range(8):
+            piece = grid[row][col]
+            if piece:
+                sq = row * 8 + col
+                record[sq >> 1] |= PIECE_CODES[piece.name] << (4 * (sq & 1))
+                if piece.color == 'B':
+                    black |= 1 << sq
+    record[32:40] = black.to_bytes(8, 'little')
+    record[40] = BLACK_TO_MOVE if side == 'B' else 0
+    return bytes(record)
+
+
+def side_to_move(record):
+    """Очередь хода записи ('W' или 'B')."""
+    return 'B' if record[40] & BLACK_TO_MOVE else 'W'
+
+
+def piece_at(record, sq):
+    """Возвращает (color, name) фигуры на клетке `sq` записи или None."""
+    code = record[sq >> 1] >> (4 * (sq & 1)) & 15
+    if not code:
+        return None
+    black = record[32 + (sq >> 3)] >> (sq & 7) & 1
+    return ('B' if black else 'W'), PIECE_NAMES[code]
+
+
+def iter_pieces(record):
+    """Перебирает фигуры записи, пропуская пустые пары клеток без распаковки.
+
+    Yields:
+        tuple: (sq, color, name).
+    """
+    black = int.from_bytes(record[32:40], 'little')
+    for index in range(32):
+        byte = record[index]
+        if not byte:
+            continue
+        sq = index << 1
+        if byte & 15:
+            yield sq, ('B' if black >> sq & 1 else 'W'), PIECE_NAMES[byte & 15]
+        if byte >> 4:
+            yield sq + 1, ('B' if black >> (sq + 1) & 1 else 'W'), PIECE_NAMES[byte >> 4]
+
+
+def unpack_grid(record, pieces):
+    """Распаковывает запись в сетку.
+
+    Args:
+        record (bytes | memoryview): Запись позиции.
+        pieces (dict): Название фигуры -> класс фигуры.
+
+    Returns:
+        tuple: (grid, side).
+    """
+    grid = [[None] * 8 for _ in range(8)]
+    for sq, color, name in iter_pieces(record):
+        grid[sq >> 3][sq & 7] = pieces[name](color)
+    return grid, side_to_move(record)
+
+
+def unpack_bitboards(record, variant):
+    """Распаковывает запись сразу в битборды, минуя сетку.
+
+    Args:
+        record (bytes | memoryview): Запись позиции.
+        variant (str): Вариант игры.
+
+    Returns:
+        tuple: (BitboardPosition, side).
+    """
+    position = BitboardPosition(variant)
+    for sq, color, name in iter_pieces(record):
+        position.add(color, name, sq)
+    return position, side_to_move(record)
+
+
+class PositionWriter:
+    """Последовательная запись позиций в файл хранилища.
+
+    Атрибуты:
+        count (int): Число записанных позиций.
+    """
+
+    def __init__(self, path, variant):
+        """Создаёт (перезаписывает) файл хранилища.
+
+        Args:
+            path (str): Путь к файлу.
+            variant (str): Вариант игры, сохраняемый в заголовке.
+        """
+        self.variant = variant
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(self._header())
+
+    def _header(self):
+        return HEADER.pack(MAGIC, VERSION, RECORD_SIZE, self.count, self.variant.encode('ascii'))
+
+    def write(self, record):
+        """Добавляет запись позиции (см. `pack`)."""
+        if len(record) != RECORD_SIZE:
+            raise ValueError(f"Запись позиции должна занимать {RECORD_SIZE} байт")
+        self._file.write(record)
+        self.count += 1
+
+    def close(self):
+        """Дописывает число записей в заголовок и закрывает файл."""
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self._header())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PositionStore:
+    """Хранилище позиций, отображённое в память только для чтения.
+
+    `store[i]` возвращает memoryview записи без копирования байтов; такие
+    представления нужно освободить (или перестать использовать) до `close`.
+
+    Атрибуты:
+        variant (str): Вариант игры из заголовка.
+        count (int): Число позиций.
+    """
+
+    def __init__(self, path):
+        """Открывает файл хранилища.
+
+        Args:
+            path (str): Путь к файлу.
+
+        Raises:
+            ValueError: Если файл не является хранилищем позиций или обрезан.
+        """
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"Файл {path} не является хранилищем позиций")
+            magic, version, record_size, count, variant = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+                raise ValueError(f"Файл {path} не является хранилищем позиций версии {VERSION}")
+            self._file.seek(0, 2)
+            if self._file.tell() < HEADER.size + count * RECORD_SIZE:
+                raise ValueError(f"Файл {path} обрезан: ожидалось {count} позиций")
+            self.variant = variant.rstrip(b'\0').decode('ascii')
+            self.count = count
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+            self._view = memoryview(self._map) if count else memoryview(b'')
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError(index)
+        offset = HEADER.size + (index % self.count) * RECORD_SIZE
+        return self._view[offset:offset + RECORD_SIZE]
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def close(self):
+        """Снимает отображение и закрывает файл."""
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
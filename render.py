@@ -0,0 +1,125 @@
+"""Вывод доски в терминал одним вызовом write на кадр.
+
+Кадр собирается в строку целиком. Если вывод - терминал с поддержкой ANSI,
+первый кадр рисуется полностью, а следующие перерисовывают только
+изменившиеся клетки и строки состояния; угрозы и подсказки выделяются
+цветом фона. Иначе (файл, канал, TERM=dumb) кадр выводится обычным текстом,
+а угрозы и подсказки отмечаются символами '!' и '*'.
+
+Экран один на процесс, поэтому и отрисовщик общий: `screen()` возвращает
+отрисовщик для текущего sys.stdout.
+"""
+
+import os
+import sys
+
+RESET = '\x1b[0m'
+# Цвет фона клетки по виду отметки
+STYLES = {'threat': '\x1b[41m', 'hint': '\x1b[42m'}
+# Символы отметок при выводе без ANSI
+MARKERS = {'threat': '!', 'hint': '*'}
+
+FILES = '   a b c d e f g h'
+RULE = '  ----------------'
+STATUS_LINES = 2
+# Строка экрана (с 1), с которой начинаются горизонтали доски, и строка приглашения под доской
+BOARD_TOP = STATUS_LINES + 3
+PROMPT_LINE = BOARD_TOP + 11
+
+_screen = None
+
+
+def supports_ansi(out):
+    """Проверяет, понимает ли поток вывода управляющие последовательности ANSI."""
+    isatty = getattr(out, 'isatty', None)
+    return bool(isatty and isatty()) and os.environ.get('TERM', '') != 'dumb'
+
+
+def board_lines(cells):
+    """Строки доски с координатами по 64 готовым клеткам."""
+    rows = [f"{8 - row}| {' '.join(cells[row * 8:row * 8 + 8])} | {8 - row}" for row in range(8)]
+    return [FILES, RULE] + rows + [RULE, FILES]
+
+
+class Renderer:
+    """Отрисовщик доски с перерисовкой только изменившихся клеток.
+
+    Атрибуты:
+        out (file): Поток вывода.
+        ansi (bool): Использовать управляющие последовательности и цвета.
+        frames (int): Число выведенных кадров (на каждый - один вызов write).
+    """
+
+    def __init__(self, out=None, ansi=None):
+        """Создаёт отрисовщик.
+
+        Args:
+            out (file): Поток вывода (по умолчанию sys.stdout).
+            ansi (bool): Режим ANSI (по умолчанию определяется по потоку).
+        """
+        self.out = out or sys.stdout
+        self.ansi = supports_ansi(self.out) if ansi is None else ansi
+        self.frames = 0
+        # Содержимое экрана после последнего кадра (только в режиме ANSI)
+        self._cells = None
+        self._status = None
+
+    def reset(self):
+        """Забывает содержимое экрана: следующий кадр будет нарисован полностью."""
+        self._cells = None
+        self._status = None
+
+    def cell(self, piece, mark=None):
+        """Текст одной клетки (символ фигуры или '.', с отметкой)."""
+        text = piece.symbol if piece else '.'
+        if mark is None:
+            return text
+        if self.ansi:
+            return f"{STYLES[mark]}{text}{RESET}"
+        return MARKERS[mark]
+
+    def frame(self, grid, status=(), marks=None):
+        """Собирает кадр в строку.
+
+        Args:
+            grid (list): Сетка 8x8 с фигурами.
+            status (list): Строки состояния над доской (не больше STATUS_LINES).
+            marks (dict): Позиция (row, col) -> вид отметки ('threat' или 'hint').
+
+        Returns:
+            str: Текст для вывода одним вызовом write.
+        """
+        marks = marks or {}
+        cells = [self.cell(grid[row][col], marks.get((row, col))) for row in range(8) for col in range(8)]
+        status = (list(status) + [''] * STATUS_LINES)[:STATUS_LINES]
+        if not self.ansi:
+            return '\n'.join([line for line in status if line] + board_lines(cells)) + '\n'
+
+        parts = []
+        if self._cells is None:
+            parts.append('\x1b[H\x1b[2J' + '\n'.join(status + board_lines(cells)))
+        else:
+            for index, line in enumerate(status):
+                if line != self._status[index]:
+                    parts.append(f"\x1b[{index + 1};1H\x1b[2K{line}")
+            for sq, text in enumerate(cells):
+                if text != self._cells[sq]:
+                    parts.append(f"\x1b[{BOARD_TOP + sq // 8};{4 + 2 * (sq % 8)}H{text}")
+        # Курсор под доску, остаток экрана (приглашение и сообщения прошлого хода) стирается
+        parts.append(f"\x1b[{PROMPT_LINE};1H\x1b[J")
+        self._cells, self._status = cells, status
+        return ''.join(parts)
+
+    def render(self, grid, status=(), marks=None):
+        """Выводит кадр одним вызовом write (аргументы как у `frame`)."""
+        self.out.write(self.frame(grid, status, marks))
+        self.out.flush()
+        self.frames += 1
+
+
+def screen():
+    """Возвращает общий отрисовщик для текущего sys.stdout (создаёт новый при подмене потока)."""
+    global _screen
+    if _screen is None or _screen.out is not sys.stdout:
+        _screen = Renderer(sys.stdout)
+    return _screen
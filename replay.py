@@ -0,0 +1,291 @@
+"""Потоковое воспроизведение записанных партий без отрисовки доски.
+
+Файл читается построчно, поэтому память не зависит от его размера.
+Поддерживаются два формата, их можно смешивать в одном файле:
+    - одна партия в строке: ходы 'e2e4 e7e5 ...' (допускаются 'e2-e4' и для шашек 'c3:e5');
+    - PGN: заголовки '[...]' и ходы в нотации SAN ('1. e4 e5 2. Nf3 ...'),
+      включая буквы новых фигур chess167 (U, D, S).
+
+Каждый ход проходит через `Game.apply_move`, то есть через `Game.parse_input`
+и `Board.move_piece` с проверкой очерёдности хода.
+
+Примеры запуска:
+    python replay.py games.txt --variant chess167
+    python replay.py archive.pgn --variant chessbase --backend bitboard --quiet
+    cat games.txt | python replay.py - --variant shashki
+    python replay.py archive.txt --variant chess167 --workers 8
+"""
+
+import argparse
+import importlib
+import itertools
+import os
+import re
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+VARIANTS = ('chessbase', 'chess167', 'shashki')
+CHUNK_GAMES = 256
+RESULT_TOKENS = frozenset(('1-0', '0-1', '1/2-1/2', '*'))
+
+COORDINATE = re.compile(r'^[a-h][1-9][-:]?[a-h][1-9]$')
+MOVE_NUMBER = re.compile(r'^\d+\.+')
+SAN = re.compile(r'^([KQRBNUDS])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?[QRBNUDS])?[+#]*$')
+
+# Партия из файла: порядковый номер, строка начала, формат ('moves' или 'pgn') и ходы
+GameRecord = namedtuple('GameRecord', 'index line kind moves')
+# Итог воспроизведения: error_ply - номер первого недопустимого полухода (с 1) или None
+ReplayResult = namedtuple('ReplayResult', 'index line valid plies error_ply error_move')
+
+
+def _strip_movetext(text, state):
+    """Удаляет из строки PGN комментарии и варианты, которые могут занимать несколько строк.
+
+    Args:
+        text (str): Строка с ходами.
+        state (list): [открыт ли комментарий {...}, глубина вариантов (...)]; изменяется на месте.
+
+    Returns:
+        str: Строка без комментариев и вариантов.
+    """
+    if not state[0] and not state[1] and not any(char in text for char in '{;('):
+        return text
+    kept = []
+    for char in text:
+        if state[0]:
+            state[0] = char != '}'
+        elif char == '{':
+            state[0] = True
+        elif char == ';':
+            break
+        elif char == '(':
+            state[1] += 1
+        elif char == ')':
+            state[1] = max(state[1] - 1, 0)
+        elif not state[1]:
+            kept.append(char)
+    return ''.join(kept)
+
+
+def read_games(lines):
+    """Разбивает поток строк на партии, не загружая файл целиком.
+
+    Args:
+        lines (iterable): Строки файла.
+
+    Yields:
+        GameRecord: Очередная партия.
+    """
+    index = 0
+    moves, start_line, in_pgn = [], None, False
+    state = [False, 0]
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if in_pgn and not state[0] and (line.startswith('[') or not line) and moves:
+            # Партия PGN без результата закончилась пустой строкой или заголовком следующей
+            index += 1
+            yield GameRecord(index, start_line, 'pgn', moves)
+            moves, start_line, in_pgn = [], None, False
+        if not line:
+            continue
+        if line.startswith('[') and not state[0]:
+            in_pgn = True
+            start_line = start_line or number
+            continue
+        tokens = line.split()
+        if not in_pgn and not state[0] and not MOVE_NUMBER.match(tokens[0]):
+            index += 1
+            yield GameRecord(index, number, 'moves', [token for token in tokens if token not in RESULT_TOKENS])
+            continue
+        in_pgn = True
+        start_line = start_line or number
+        for token in _strip_movetext(line, state).split():
+            if token in RESULT_TOKENS:
+                index += 1
+                yield GameRecord(index, start_line, 'pgn', moves)
+                moves, start_line, in_pgn = [], None, False
+                continue
+            token = MOVE_NUMBER.sub('', token)
+            if token and not token.startswith('$'):
+                moves.append(token)
+    if moves:
+        yield GameRecord(index + 1, start_line, 'pgn', moves)
+
+
+def resolve_san(game, san):
+    """Переводит ход SAN (например, 'Nf3', 'exd5', 'Uxe4+') в запись 'e2e4'.
+
+    Args:
+        game (Game): Игра, для стороны которой разбирается ход.
+        san (str): Ход в нотации SAN.
+
+    Returns:
+        str: Ход в формате 'e2e4' или None, если ход не найден или неоднозначен.
+    """
+    match = SAN.match(san.rstrip('!?'))
+    if not match:
+        return None
+    name, file, rank, target = match.groups()
+    name = name or 'P'
+    end = (8 - int(target[1]), ord(target[0]) - ord('a'))
+    grid = game.board.grid
+    found = None
+    for start, finish in game.board.generate_moves(game.current_turn):
+        if finish != end or grid[start[0]][start[1]].name != name:
+            continue
+        if file and start[1] != ord(file) - ord('a') or rank and start[0] != 8 - int(rank):
+            continue
+        if found:
+            return None
+        found = start
+    if not found:
+        return None
+    return f"{chr(ord('a') + found[1])}{8 - found[0]}{target}"
+
+
+def replay_game(module, record, backend='grid'):
+    """Воспроизводит одну партию на новой доске.
+
+    Args:
+        module (module): Модуль игры (chessbase, chess167 или shashki).
+        record (GameRecord): Партия.
+        backend (str): Представление доски.
+
+    Returns:
+        ReplayResult: Итог воспроизведения.
+    """
+    game = module.Game(backend)
+    for ply, move in enumerate(record.moves, 1):
+        text = move
+        if record.kind == 'pgn' and not COORDINATE.match(move):
+            text = resolve_san(game, move)
+        if not text or not game.apply_move(text):
+            return ReplayResult(record.index, record.line, False, ply - 1, ply, move)
+    return ReplayResult(record.index, record.line, True, len(record.moves), None, None)
+
+
+def replay_stream(lines, variant, backend='grid'):
+    """Воспроизводит все партии потока по очереди.
+
+    Args:
+        lines (iterable): Строки файла.
+        variant (str): Модуль игры ('chessbase', 'chess167' или 'shashki').
+        backend (str): Представление доски.
+
+    Yields:
+        ReplayResult: Итоги партий в порядке следования в файле.
+    """
+    module = importlib.import_module(variant)
+    for record in read_games(lines):
+        yield replay_game(module, record, backend)
+
+
+def _replay_chunk(variant, backend, records):
+    """Воспроизводит пачку партий в процессе пула (модуль игры импортируется один раз на процесс)."""
+    module = importlib.import_module(variant)
+    return [replay_game(module, record, backend) for record in records]
+
+
+def replay_parallel(lines, variant, backend='grid', workers=None, chunk_games=CHUNK_GAMES, max_pending=None):
+    """Воспроизводит партии в пуле процессов, сохраняя порядок итогов.
+
+    Поток разбивается на пачки по `chunk_games` партий. В работе одновременно
+    не больше `max_pending` пачек: пока самая ранняя не готова, чтение файла
+    приостанавливается, поэтому память не растёт при медленных процессах.
+
+    Args:
+        lines (iterable): Строки файла.
+        variant (str): Модуль игры.
+        backend (str): Представление доски.
+        workers (int): Число процессов (по умолчанию - число ядер).
+        chunk_games (int): Число партий в пачке.
+        max_pending (int): Наибольшее число пачек в работе (по умолчанию 2 * workers).
+
+    Yields:
+        ReplayResult: Итоги партий в порядке следования в файле.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    records = read_games(lines)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(itertools.islice(records, chunk_games))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_replay_chunk, variant, backend, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def format_result(result):
+    """Строка отчёта по одной партии."""
+    if result.valid:
+        return f"партия {result.index} (строка {result.line}): ok, полуходов {result.plies}"
+    return (f"партия {result.index} (строка {result.line}): недопустимый полуход "
+            f"{result.error_ply} '{result.error_move}'")
+
+
+def report(results, quiet=False, out=None):
+    """Выводит итоги партий и сводку со скоростью воспроизведения.
+
+    Args:
+        results (iterable): Итоги `ReplayResult` (читаются по одному).
+        quiet (bool): Выводить только недопустимые партии и сводку.
+        out (file): Поток вывода (по умолчанию sys.stdout).
+
+    Returns:
+        dict: Сводка: games, valid, invalid, plies, seconds, games_per_second, plies_per_second.
+    """
+    out = out or sys.stdout
+    games = valid = plies = 0
+    started = time.perf_counter()
+    for result in results:
+        games += 1
+        valid += result.valid
+        plies += result.plies
+        if not (quiet and result.valid):
+            print(format_result(result), file=out)
+    seconds = time.perf_counter() - started
+    summary = {
+        'games': games, 'valid': valid, 'invalid': games - valid, 'plies': plies, 'seconds': seconds,
+        'games_per_second': int(games / seconds) if seconds else 0,
+        'plies_per_second': int(plies / seconds) if seconds else 0,
+    }
+    print(f"Партий: {games}, допустимых: {valid}, с ошибкой: {games - valid}, полуходов: {plies}, "
+          f"время: {seconds:.3f} с, {summary['games_per_second']} партий/с, "
+          f"{summary['plies_per_second']} полуходов/с", file=out)
+    return summary
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Воспроизведение и проверка записанных партий.")
+    parser.add_argument('path', help="файл с партиями ('-' - стандартный ввод)")
+    parser.add_argument('--variant', default='chess167', choices=VARIANTS, help="модуль игры")
+    parser.add_argument('--backend', default='grid', choices=('grid', 'bitboard'), help="представление доски")
+    parser.add_argument('--quiet', action='store_true', help="выводить только партии с ошибками и сводку")
+    parser.add_argument('--workers', type=int, default=1, help="число процессов (0 - по числу ядер)")
+    parser.add_argument('--chunk-games', type=int, default=CHUNK_GAMES, help="партий в пачке для процесса")
+    args = parser.parse_args(argv)
+
+    def run(lines):
+        if args.workers == 1:
+            return report(replay_stream(lines, args.variant, args.backend), args.quiet)
+        return report(replay_parallel(lines, args.variant, args.backend, args.workers or None, args.chunk_games),
+                      args.quiet)
+
+    if args.path == '-':
+        summary = run(sys.stdin)
+    else:
+        with open(args.path, encoding='utf-8', errors='replace') as lines:
+            summary = run(lines)
+    return 0 if summary['invalid'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Игровой сервер на asyncio: много партий в одном процессе.
+
+Клиент подключается по TCP или Unix-сокету и обменивается строками. Каждое
+подключение ведёт свою партию; ответ на команду - одна строка, которая
+начинается с 'OK' или 'ERR'.
+
+Команды:
+    NEW <вариант> [grid|bitboard] [FEN]  - начать партию (chessbase, chess167, shashki);
+    MOVE <ход>                           - сделать ход ('e2e4' или 'e2-e4'), ответ: OK <чей ход>;
+    HINT <клетка>                        - возможные ходы фигуры: OK e3 e4;
+    THREATS                              - фигуры стороны, чей ход, под боем: OK <шах 0|1> <клетки>
+                                           (в шашках - фигуры, которые соперник может побить, шах всегда 0);
+    BOARD                                - позиция: OK <FEN>;
+    QUIT                                 - завершить сеанс: BYE.
+
+Примеры запуска:
+    python server.py --port 7167
+    python server.py --unix /tmp/chess.sock
+"""
+
+import argparse
+import asyncio
+import importlib
+import logging
+import string
+import sys
+
+VARIANTS = ('chessbase', 'chess167', 'shashki')
+
+logger = logging.getLogger(__name__)
+
+
+def square_name(pos):
+    """Переводит позицию (row, col) в запись вида 'e2'."""
+    return f"{chr(ord('a') + pos[1])}{8 - pos[0]}"
+
+
+def parse_square(text):
+    """Переводит запись вида 'e2' в позицию (row, col) или None."""
+    if len(text) != 2 or text[0] not in string.ascii_lowercase[:8] or text[1] not in '12345678':
+        return None
+    return 8 - int(text[1]), ord(text[0]) - ord('a')
+
+
+class Session:
+    """Партия одного подключения и обработка её команд.
+
+    Атрибуты:
+        game (Game): Текущая партия или None, пока не выполнена команда NEW.
+    """
+
+    __slots__ = ('game',)
+
+    def __init__(self):
+        """Создаёт сеанс без партии."""
+        self.game = None
+
+    def handle(self, line):
+        """Выполняет одну команду протокола.
+
+        Args:
+            line (str): Строка команды без перевода строки.
+
+        Returns:
+            str: Строка ответа.
+        """
+        command, _, argument = line.strip().partition(' ')
+        handler = getattr(self, f"do_{command.lower()}", None) if command.isalpha() else None
+        if handler is None:
+            return f"ERR неизвестная команда {command}"
+        if self.game is None and command.upper() not in ('NEW', 'QUIT'):
+            return "ERR партия не начата, используйте NEW"
+        try:
+            return handler(argument.strip())
+        except ValueError as error:
+            return f"ERR {error}"
+        except Exception as error:
+            # Ошибка в коде игры не должна обрывать подключение: сеанс продолжается
+            logger.exception("Ошибка при выполнении команды %r", line.strip())
+            return f"ERR внутренняя ошибка: {type(error).__name__}"
+
+    def do_new(self, argument):
+        """NEW <вариант> [представление] [FEN]."""
+        parts = argument.split(maxsplit=2)
+        variant = parts[0] if parts else 'chess167'
+        if variant not in VARIANTS:
+            return f"ERR неизвестный вариант {variant}"
+        module = importlib.import_module(variant)
+        backend = parts[1] if len(parts) > 1 else 'grid'
+        fen = parts[2] if len(parts) > 2 else None
+        if backend not in module.Board.BACKENDS:
+            return f"ERR неизвестное представление доски {backend}"
+        self.game = module.Game.from_fen(fen, backend) if fen else module.Game(backend)
+        return f"OK {self.game.current_turn}"
+
+    def do_move(self, argument):
+        """MOVE <ход>."""
+        if not self.game.apply_move(argument):
+            return f"ERR недопустимый ход {argument}"
+        return f"OK {self.game.current_turn}"
+
+    def do_hint(self, argument):
+        """HINT <клетка>."""
+        start = parse_square(argument)
+        if start is None:
+            return f"ERR неверная клетка {argument}"
+        piece = self.game.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.game.current_turn:
+            return "ERR на клетке нет фигуры стороны, чей ход"
+        return ' '.join(['OK'] + [square_name(end) for end in self.game.board.get_moves(start)])
+
+    def do_threats(self, argument):
+        """THREATS."""
+        threats, check = self.game.board.get_threatened_pieces(self.game.current_turn)
+        return ' '.join(['OK', str(int(check))] + sorted(square_name(pos) for pos in threats))
+
+    def do_board(self, argument):
+        """BOARD."""
+        return f"OK {self.game.to_fen()}"
+
+    def do_quit(self, argument):
+        """QUIT."""
+        return "BYE"
+
+
+async def serve_connection(reader, writer):
+    """Обслуживает одно подключение до команды QUIT или разрыва."""
+    session = Session()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            reply = session.handle(line.decode('utf-8', errors='replace'))
+            writer.write(reply.encode('utf-8') + b'\n')
+            if reply == 'BYE':
+                break
+            # Ожидание только при переполненном буфере: медленный клиент не копит ответы в памяти
+            if writer.transport.get_write_buffer_size() > 1 << 16:
+                await writer.drain()
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(host='127.0.0.1', port=7167, unix=None):
+    """Запускает сервер (TCP или Unix-сокет) и возвращает объект asyncio.Server."""
+    if unix:
+        return await asyncio.start_unix_server(serve_connection, path=unix)
+    return await asyncio.start_server(serve_connection, host, port)
+
+
+class GameClient:
+    """Клиент протокола сервера (для тестов и скриптов).
+
+    Пример:
+        client = await GameClient.connect('127.0.0.1', 7167)
+        await client.request('NEW chess167')
+        await client.request('MOVE e2e3')
+    """
+
+    def __init__(self, reader, writer):
+        """Оборачивает потоки уже открытого подключения."""
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=7167, unix=None):
+        """Подключается к серверу по TCP или Unix-сокету."""
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, line):
+        """Отправляет команду и возвращает строку ответа."""
+        self._writer.write(line.encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return (await self._reader.readline()).decode('utf-8').rstrip('\n')
+
+    async def close(self):
+        """Завершает сеанс и закрывает подключение."""
+        try:
+            await self.request('QUIT')
+        except ConnectionError:
+            pass
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def run(host, port, unix):
+    """Работает до остановки процесса."""
+    server = await start_server(host, port, unix)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Игровой сервер для chessbase, chess167 и shashki.")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес TCP")
+    parser.add_argument('--port', type=int, default=7167, help="порт TCP")
+    parser.add_argument('--unix', help="путь к Unix-сокету вместо TCP")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
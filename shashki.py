@@ -1,54 +1,190 @@
+import argparse
+import contextlib
 import string
+import sys
+
+import instrument
+from draughts_bitboard import DARK_SQUARES, INDEX, DraughtsPosition
+from fen import format_draughts_fen, parse_draughts_fen
+from moves import CAPTURE, PIECE_CODES, POSITIONS, PROMOTION, MoveList
+from zobrist import ZobristKeys
+
+ZOBRIST = ZobristKeys('CD')
 
 
 class Piece:
-    SYMBOLS = {'C': '⛀', 'D': '⛁'}  # C - обычная шашка, D - дамка
+    # Фигуры неизменяемы: на каждую пару (тип, цвет) приходится один общий объект
+    __slots__ = ('color', 'name', 'symbol')
 
-    def __init__(self, color, name):
-        self.color = color
-        self.name = name
-        self.symbol = self.SYMBOLS[name] if color == 'W' else self.SYMBOLS[name].lower()
+    SYMBOLS = {'C': '⛀', 'D': '⛁'}  # C - обычная шашка, D - дамка
+    NAME = None
+    _instances = {}
+    CLASSES = {}
+
+    def __new__(cls, color, name=None):
+        name = name or cls.NAME
+        cls = Piece.CLASSES.get(name, cls)  # Piece(color, 'D') - та же дамка, что и King(color)
+        key = (cls, color, name)
+        piece = Piece._instances.get(key)
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            object.__setattr__(piece, 'name', name)
+            object.__setattr__(piece, 'symbol', cls.SYMBOLS[name] if color == 'W' else cls.SYMBOLS[name].lower())
+            Piece._instances[key] = piece
+        return piece
+
+    def __setattr__(self, attr, value):
+        raise AttributeError(f"Фигура {self.name} неизменяема")
+
+    def __reduce__(self):
+        return self.__class__, (self.color, self.name)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def is_valid_move(self, start, end, board):
-        return False
+        return end in self.get_possible_moves(start, board)
 
     def get_possible_moves(self, start, board):
-        return []
+        # Ходы одной фигуры: если она может бить, то только взятия
+        sequences = []
+        if not capture_sequences(board, start, sequences):
+            quiet_sequences(board, start, sequences)
+        return list(dict.fromkeys(path[-1] for path, _, _ in sequences))
 
 
 class Checker(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'C')
+    __slots__ = ()
+    NAME = 'C'
 
-    def is_valid_move(self, start, end, board):
-        direction = -1 if self.color == 'W' else 1
-        start_row, start_col = start
-        end_row, end_col = end
 
-        if abs(start_col - end_col) == 1 and end_row == start_row + direction and board[end_row][end_col] is None:
-            return True
+class King(Piece):
+    # Дамка ходит и бьёт на любое расстояние по диагонали
+    __slots__ = ()
+    NAME = 'D'
 
-        if abs(start_col - end_col) == 2 and abs(start_row - end_row) == 2:
-            mid_row = (start_row + end_row) // 2
-            mid_col = (start_col + end_col) // 2
-            if board[mid_row][mid_col] and board[mid_row][mid_col].color != self.color:
-                return True
 
-        return False
+Piece.CLASSES = {'C': Checker, 'D': King}
 
-    def get_possible_moves(self, start, board):
-        moves = []
-        for drow, dcol in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-            end = (start[0] + drow, start[1] + dcol)
-            if 0 <= end[0] < 8 and 0 <= end[1] < 8 and self.is_valid_move(start, end, board):
-                moves.append(end)
-        return moves
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Ход - тройка (path, taken, king): клетки пути от исходной до конечной,
+# клетки побитых фигур по порядку и то, стала ли (осталась ли) фигура дамкой.
+
+
+def capture_sequences(grid, start, out):
+    # Все полные цепочки взятий фигуры с клетки start дописываются в out.
+    # Перебор в глубину прямо на сетке: ходящая фигура снимается с доски,
+    # побитые остаются на месте до конца хода (их нельзя бить повторно и
+    # через них нельзя перепрыгнуть), а отмечаются битовой маской.
+    piece = grid[start[0]][start[1]]
+    if not piece:
+        return False
+    count = len(out)
+    grid[start[0]][start[1]] = None
+    try:
+        _jumps(grid, start[0], start[1], piece.color, piece.name == 'D', [start], [], 0, out)
+    finally:
+        grid[start[0]][start[1]] = piece
+    return len(out) > count
+
+
+def _jumps(grid, row, col, color, king, path, taken, mask, out):
+    last_row = 0 if color == 'W' else 7
+    found = False
+    for drow, dcol in DIRECTIONS:
+        r, c = row + drow, col + dcol
+        if king:
+            while 0 <= r < 8 and 0 <= c < 8 and grid[r][c] is None:
+                r += drow
+                c += dcol
+        if not (0 <= r < 8 and 0 <= c < 8):
+            continue
+        victim = grid[r][c]
+        if victim is None or victim.color == color or mask >> (r * 8 + c) & 1:
+            continue
+        landings = []
+        land_row, land_col = r + drow, c + dcol
+        while 0 <= land_row < 8 and 0 <= land_col < 8 and grid[land_row][land_col] is None:
+            landings.append((land_row, land_col))
+            if not king:
+                break
+            land_row += drow
+            land_col += dcol
+        if not landings:
+            continue
+        found = True
+        taken.append((r, c))
+        # Если с какого-то поля за побитой фигурой бой продолжается, встать можно только на такие поля
+        finished = []
+        continued = False
+        for land in landings:
+            promoted = king or land[0] == last_row  # Шашка, дошедшая до последнего ряда, бьёт дальше как дамка
+            path.append(land)
+            if _jumps(grid, land[0], land[1], color, promoted, path, taken, mask | 1 << (r * 8 + c), out):
+                continued = True
+            elif not continued:
+                finished.append((tuple(path), tuple(taken), promoted))
+            path.pop()
+        if not continued:
+            out.extend(finished)
+        taken.pop()
+    return found
+
+
+def quiet_sequences(grid, start, out):
+    # Ходы без взятия: шашка - на одно поле вперёд, дамка - на любое число свободных полей
+    piece = grid[start[0]][start[1]]
+    if not piece:
+        return
+    king = piece.name == 'D'
+    forward = -1 if piece.color == 'W' else 1
+    last_row = 0 if piece.color == 'W' else 7
+    for drow, dcol in DIRECTIONS:
+        if not king and drow != forward:
+            continue
+        r, c = start[0] + drow, start[1] + dcol
+        while 0 <= r < 8 and 0 <= c < 8 and grid[r][c] is None:
+            out.append(((start, (r, c)), (), king or r == last_row))
+            if not king:
+                break
+            r += drow
+            c += dcol
 
 
 class Board:
-    def __init__(self):
+    # 'grid' - ходы ищутся обходом сетки, 'bitboard' - по 32-битным маскам
+    # (см. draughts_bitboard); сетка ведётся в обоих случаях, для вывода на экран
+    BACKENDS = ('grid', 'bitboard')
+
+    def __init__(self, backend='grid'):
         self.grid = [[None] * 8 for _ in range(8)]
         self.setup_pieces()
+        self._attach(self.grid, backend=backend)
+
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        # FEN шашек вида 'W:W21,22,K30:B1,2,3' (см. модуль fen)
+        grid, side = parse_draughts_fen(fen, Checker, King)
+        board = cls.__new__(cls)
+        board._attach(grid, side, backend)
+        return board
+
+    def _attach(self, grid, side='W', backend='grid'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Неизвестное представление доски: {backend}")
+        self.grid = grid
+        self.bitboards = DraughtsPosition.from_grid(grid) if backend == 'bitboard' else None
+        self.zobrist_key = ZOBRIST.hash_grid(self.grid, side)
+        self.history = [self.zobrist_key]
+        self.undo_stack = []
+
+    def to_fen(self, side='W'):
+        return format_draughts_fen(self.grid, side)
 
     def setup_pieces(self):
         for row in range(3):
@@ -76,53 +212,288 @@ class Board:
         print("  ----------------")
         print("  a b c d e f g h")
 
-    def move_piece(self, start, end):
+    def legal_moves(self, color, start=None):
+        # Все ходы стороны (или одной её фигуры): взятие обязательно, цепочка
+        # взятий - до конца, но из нескольких цепочек можно выбрать любую
+        if self.bitboards is not None:
+            index = None if start is None else INDEX.get(start, -1)
+            if index == -1:
+                return []
+            return [(tuple(DARK_SQUARES[sq] for sq in path), tuple(DARK_SQUARES[sq] for sq in taken), king)
+                    for path, taken, king in self.bitboards.legal_moves(color, index)]
+        grid = self.grid
+        squares = [start] if start else [(row, col) for row in range(8) for col in range(8)]
+        sequences = []
+        for row in range(8):
+            for col in range(8):
+                piece = grid[row][col]
+                if piece and piece.color == color:
+                    capture_sequences(grid, (row, col), sequences)
+        if sequences:
+            return [sequence for sequence in sequences if start is None or sequence[0][0] == start]
+        for square in squares:
+            piece = grid[square[0]][square[1]]
+            if piece and piece.color == color:
+                quiet_sequences(grid, square, sequences)
+        return sequences
+
+    def get_moves(self, start):
         piece = self.grid[start[0]][start[1]]
-        if piece and piece.is_valid_move(start, end, self.grid):
-            mid_row = (start[0] + end[0]) // 2
-            mid_col = (start[1] + end[1]) // 2
-            if abs(start[0] - end[0]) == 2:
-                self.grid[mid_row][mid_col] = None  # Убираем побитую шашку
-            self.grid[end[0]][end[1]] = piece
-            self.grid[start[0]][start[1]] = None
-            if (piece.color == 'W' and end[0] == 0) or (piece.color == 'B' and end[0] == 7):
-                self.grid[end[0]][end[1]] = Piece(piece.color, 'D')  # Превращение в дамку
-            return True
-        return False
+        if not piece:
+            return []
+        return list(dict.fromkeys(path[-1] for path, _, _ in self.legal_moves(piece.color, start)))
+
+    def generate_moves(self, color):
+        # Разные цепочки с одинаковыми началом и концом дают одинаковые пары
+        return [(path[0], path[-1]) for path, _, _ in self.legal_moves(color)]
+
+    def fill_moves(self, color, buffer=None):
+        # Упакованные ходы (см. moves) в переиспользуемый буфер; в битах с 24-го -
+        # номер цепочки среди цепочек с теми же началом и концом
+        if buffer is None:
+            buffer = MoveList()
+        if self.bitboards is not None:
+            return self.bitboards.fill_moves(color, buffer)
+        buffer.clear()
+        grid = self.grid
+        seen = {}
+        for path, taken, king in self.legal_moves(color):
+            start, end = path[0], path[-1]
+            move = start[0] * 8 + start[1] | (end[0] * 8 + end[1]) << 6
+            if taken:
+                kings = any(grid[row][col].name == 'D' for row, col in taken)
+                move |= CAPTURE << 12 | PIECE_CODES['D' if kings else 'C'] << 20
+                alternative = seen.get(move, 0)
+                seen[move] = alternative + 1
+                move |= alternative << 24
+            if king and grid[start[0]][start[1]].name == 'C':
+                move |= PROMOTION << 12 | PIECE_CODES['D'] << 16
+            buffer.append(move)
+        return buffer
+
+    def find_move(self, start, end, via=(), alternative=0):
+        # Цепочка хода из start в end через поля via (по порядку, можно не все) или None
+        if not all(0 <= square[0] < 8 and 0 <= square[1] < 8 for square in (start, end)):
+            return None
+        piece = self.grid[start[0]][start[1]]
+        if not piece:
+            return None
+        for sequence in self.legal_moves(piece.color, start):
+            path = sequence[0]
+            if path[-1] != end:
+                continue
+            landings = iter(path[1:-1])
+            if all(square in landings for square in via):
+                if not alternative:
+                    return sequence
+                alternative -= 1
+        return None
+
+    def move_piece(self, start, end, via=()):
+        # Ход попадает в стек отмены, чтобы move_piece и make_move можно было смешивать
+        return self.make_move(start, end, via)
+
+    def make_move(self, start, end, via=()):
+        sequence = self.find_move(start, end, via)
+        if sequence is None:
+            return False
+        self.undo_stack.append(self._apply_sequence(sequence))
+        return True
+
+    def make_packed(self, move):
+        sequence = self.find_move(POSITIONS[move & 63], POSITIONS[move >> 6 & 63], alternative=move >> 24)
+        if sequence is None:
+            return False
+        self.undo_stack.append(self._apply_sequence(sequence))
+        return True
+
+    def unmake_move(self):
+        # Возвращаем шашку (а не дамку) и все побитые фигуры; конец хода может совпасть с началом
+        start, end, piece, captured, zobrist_key, bitboards = self.undo_stack.pop()
+        self.grid[end[0]][end[1]] = None
+        self.grid[start[0]][start[1]] = piece
+        for (row, col), victim in captured:
+            self.grid[row][col] = victim
+        if bitboards is not None:
+            self.bitboards.restore(bitboards)
+        self.zobrist_key = zobrist_key
+        self.history.pop()
+
+    def _apply_sequence(self, sequence):
+        path, taken, king = sequence
+        start, end = path[0], path[-1]
+        grid = self.grid
+        piece = grid[start[0]][start[1]]
+        zobrist_key = self.zobrist_key
+        bitboards = None
+        if self.bitboards is not None:
+            bitboards = self.bitboards.state()
+            self.bitboards.apply(piece.color, INDEX[start], INDEX[end], [INDEX[square] for square in taken], king)
+        captured = []
+        for row, col in taken:
+            captured.append(((row, col), grid[row][col]))
+            self.zobrist_key ^= ZOBRIST.piece(grid[row][col], (row, col))
+            grid[row][col] = None  # Побитые фигуры снимаются после окончания хода
+        final = King(piece.color) if king else piece  # Превращение в дамку (общий экземпляр)
+        grid[start[0]][start[1]] = None
+        grid[end[0]][end[1]] = final
+        self.zobrist_key ^= ZOBRIST.piece(piece, start) ^ ZOBRIST.piece(final, end) ^ ZOBRIST.side
+        self.history.append(self.zobrist_key)
+        return start, end, piece, captured, zobrist_key, bitboards
+
+    def repetition_count(self):
+        return self.history.count(self.zobrist_key)
+
+    def get_threatened_pieces(self, color):
+        # Фигуры цвета color, которые соперник побьёт хотя бы одной цепочкой взятий;
+        # шаха в шашках нет, флаг всегда False (для единообразия с шахматными досками)
+        opponent = 'B' if color == 'W' else 'W'
+        threats = set()
+        for _, taken, _ in self.legal_moves(opponent):
+            threats.update(taken)
+        return threats, False
 
 
 class Game:
-    def __init__(self):
-        self.board = Board()
+    def __init__(self, backend='grid'):
+        self.board = Board(backend)
         self.current_turn = 'W'
         self.move_count = 0
 
+    @classmethod
+    def from_fen(cls, fen, backend='grid'):
+        game = cls.__new__(cls)
+        game.board = Board.from_fen(fen, backend)
+        game.current_turn = fen.strip()[0]
+        game.move_count = 0
+        return game
+
+    def to_fen(self):
+        return self.board.to_fen(self.current_turn)
+
     def parse_input(self, move):
         if len(move) != 4 or move[0] not in string.ascii_lowercase[:8] or move[2] not in string.ascii_lowercase[:8]:
             return None, None
         try:
             start = (8 - int(move[1]), string.ascii_lowercase.index(move[0]))
             end = (8 - int(move[3]), string.ascii_lowercase.index(move[2]))
+            if not (0 <= start[0] < 8 and 0 <= end[0] < 8):
+                return None, None
             return start, end
         except ValueError:
             return None, None
 
+    def parse_path(self, move):
+        # Запись цепочки 'c3:e5:g3' (или 'c3e5g3') -> список полей; None, если запись неверна
+        text = move.replace("-", "").replace(":", "")
+        if len(text) < 4 or len(text) % 2:
+            return None
+        squares = []
+        for index in range(0, len(text), 2):
+            if text[index] not in string.ascii_lowercase[:8] or text[index + 1] not in '12345678':
+                return None
+            squares.append((8 - int(text[index + 1]), string.ascii_lowercase.index(text[index])))
+        return squares
+
+    def apply_move(self, move):
+        # Ход без вывода на экран; фигура должна принадлежать стороне, чей сейчас ход
+        squares = self.parse_path(move)
+        if not squares:
+            return False
+        start, end = squares[0], squares[-1]
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn or not self.board.move_piece(start, end, squares[1:-1]):
+            return False
+        self.move_count += 1
+        self.current_turn = 'B' if self.current_turn == 'W' else 'W'
+        return True
+
+    def hint(self, square):
+        # Ходы фигуры стороны, чей сейчас ход: пути без начального поля; None, если запись
+        # неверна или фигура чужая
+        squares = self.parse_path(square + square)
+        if not squares:
+            return None
+        start = squares[0]
+        piece = self.board.grid[start[0]][start[1]]
+        if not piece or piece.color != self.current_turn:
+            return None
+        return [path[1:] for path, _, _ in self.board.legal_moves(self.current_turn, start)]
+
+    def play_batch(self, lines, render_every=0, out=None):
+        # Пакетный режим: по одной команде в строке - ход ('e3-d4', 'c3:e5:g3'), 'hint <поле>'
+        # или 'stats'; на каждую команду одна строка '<номер полухода> <ход> ok|error' или
+        # 'hint c3 d4 b4'. Доска выводится в stderr (не смешиваясь со строками результата)
+        # после каждых render_every ходов (0 - никогда).
+        # Возвращает (число выполненных ходов, число отклонённых команд)
+        out = out or sys.stdout
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
+        applied = rejected = 0
+        for line in lines:
+            move = line.strip()
+            if not move or move.startswith('#'):
+                continue
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]), file=out)
+            elif move.startswith("hint "):
+                square = move[5:].strip()
+                paths = self.hint(square)
+                if paths is None:
+                    rejected += 1
+                    print(f"hint {square} error", file=out)
+                else:
+                    print(' '.join(["hint", square] + [':'.join(f"{string.ascii_lowercase[col]}{8 - row}"
+                                                                for row, col in path) for path in paths]), file=out)
+            else:
+                ply = self.move_count + 1
+                if self.apply_move(move):
+                    applied += 1
+                    print(f"{ply} {move} ok", file=out)
+                    if render_every and applied % render_every == 0:
+                        with contextlib.redirect_stdout(sys.stderr):
+                            self.board.display(self.move_count)
+                else:
+                    rejected += 1
+                    print(f"{ply} {move} error", file=out)
+        return applied, rejected
+
     def play(self):
+        # Команда 'stats' показывает статистику вызовов (см. модуль instrument)
+        instrument.enable_from_environment(sys.modules[type(self).__module__])
         while True:
             self.board.display(self.move_count)
-            move = input(f"Ход {'белых' if self.current_turn == 'W' else 'чёрных'} (например, e3-d4): ")
-            move = move.replace("-", "")
-            start, end = self.parse_input(move)
-            if start and end and self.board.move_piece(start, end):
-                self.move_count += 1
-                self.current_turn = 'B' if self.current_turn == 'W' else 'W'
-            else:
+            move = input(f"Ход {'белых' if self.current_turn == 'W' else 'чёрных'} (например, e3-d4 или c3:e5:g3): ")
+            if move == "stats" or move.startswith("stats "):
+                print(instrument.command(move[5:], sys.modules[type(self).__module__]))
+                continue
+            if not self.apply_move(move):
                 print("Неверный ход, попробуйте снова.")
 
 
+def main(argv=None):
+    # Интерактивная партия или пакетный режим: python shashki.py moves.txt --render-every 10
+    # (файл '-' - стандартный ввод); код возврата 1, если какая-то команда отклонена
+    parser = argparse.ArgumentParser(description="Шашки: интерактивная партия или ходы из файла.")
+    parser.add_argument('moves', nargs='?', help="файл с ходами для пакетного режима ('-' - стандартный ввод)")
+    parser.add_argument('--fen', help="начальная позиция в FEN")
+    parser.add_argument('--backend', default='grid', choices=Board.BACKENDS, help="представление доски")
+    parser.add_argument('--render-every', type=int, default=0, metavar='N',
+                        help="в пакетном режиме выводить доску в stderr каждые N ходов (0 - не выводить)")
+    args = parser.parse_args(argv)
+    game = Game.from_fen(args.fen, args.backend) if args.fen else Game(args.backend)
+    if args.moves is None:
+        game.play()
+        return 0
+    if args.moves == '-':
+        _, rejected = game.play_batch(sys.stdin, args.render_every)
+    else:
+        with open(args.moves, encoding='utf-8') as lines:
+            _, rejected = game.play_batch(lines, args.render_every)
+    return 1 if rejected else 0
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.play()
+    sys.exit(main())
 
 
     class Board:
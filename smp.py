@@ -0,0 +1,219 @@
+"""Параллельный анализ позиции (Lazy SMP) с общей таблицей транспозиций.
+
+Несколько процессов ищут из одной и той же позиции; нечётные начинают
+итеративное углубление с глубины 2, чтобы процессы не шли в ногу. Обмена
+сообщениями во время поиска нет: процессы помогают друг другу только через
+общую таблицу транспозиций в разделяемой памяти. Как только один процесс
+досчитал заданную глубину, остальные останавливаются.
+
+Таблица работает без блокировок: в слоте хранятся два 64-битных слова -
+`key ^ data` и `data`. Запись, разорванная одновременной записью другого
+процесса, не проходит проверку ключа и считается промахом.
+
+Примеры запуска:
+    python smp.py --depth 4 --workers 4
+    python smp.py --bench --depth 4 --max-workers 8 --output smp.json
+"""
+
+import argparse
+import ctypes
+import importlib
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+from analysis import Searcher
+
+SLOT_BYTES = 16
+
+
+class SharedTable:
+    """Таблица транспозиций в разделяемой памяти (совместима с `zobrist.TranspositionTable`).
+
+    Атрибуты:
+        size (int): Число слотов.
+        hits (int): Число успешных обращений `probe` в этом процессе.
+        misses (int): Число неуспешных обращений `probe` в этом процессе.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, raw=None):
+        """Создаёт таблицу или подключается к уже созданной.
+
+        Args:
+            max_bytes (int): Ограничение памяти в байтах (для новой таблицы).
+            raw (multiprocessing.RawArray): Память таблицы, созданной в другом процессе.
+        """
+        if raw is None:
+            size = 1
+            while size * 2 * SLOT_BYTES <= max_bytes:
+                size *= 2
+            raw = multiprocessing.RawArray('Q', 2 * size)
+        self.raw = raw
+        self.size = len(raw) // 2
+        self._mask = self.size - 1
+        self._slots = memoryview(raw).cast('B').cast('Q')
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # Передаётся только разделяемая память, представление создаётся заново
+        return {'raw': self.raw}
+
+    def __setstate__(self, state):
+        self.__init__(raw=state['raw'])
+
+    def probe(self, key):
+        """Ищет запись для ключа.
+
+        Returns:
+            tuple: (value, depth) или None, если записи нет.
+        """
+        index = (key & self._mask) << 1
+        slots = self._slots
+        data = slots[index + 1]
+        if data and slots[index] ^ data == key:
+            self.hits += 1
+            return data >> 8, data & 255
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        """Сохраняет значение (до 56 бит), если слот пуст, хранит ту же позицию или меньшую глубину.
+
+        Returns:
+            bool: True, если запись сохранена.
+        """
+        index = (key & self._mask) << 1
+        slots = self._slots
+        old = slots[index + 1]
+        if old and slots[index] ^ old != key and old & 255 > depth:
+            return False
+        data = value << 8 | min(depth, 255)
+        slots[index] = key ^ data
+        slots[index + 1] = data
+        return True
+
+    def clear(self):
+        """Удаляет все записи."""
+        ctypes.memset(self.raw, 0, ctypes.sizeof(self.raw))
+
+
+def _worker(index, variant, fen, backend, color, table, max_depth, time_limit, node_limit, stop, results):
+    """Процесс поиска: своя доска из FEN, общая таблица."""
+    module = importlib.import_module(variant)
+    board = module.Board.from_fen(fen, backend)
+    searcher = Searcher(board, table)
+    searcher.stop = stop
+    result = searcher.iterate(color, max_depth, time_limit, node_limit, start_depth=1 + index % 2)
+    results.put((index, result))
+
+
+def analyse_parallel(board, color, workers=None, max_depth=64, time_limit=None, node_limit=None,
+                     table_bytes=64 * 1024 * 1024):
+    """Анализирует позицию несколькими процессами с общей таблицей транспозиций.
+
+    Args:
+        board (Board): Доска chess167 или chessbase (не изменяется).
+        color (str): Сторона, чей ход.
+        workers (int): Число процессов (по умолчанию - число ядер).
+        max_depth (int): Глубина, по достижении которой поиск останавливается.
+        time_limit (float): Бюджет времени каждого процесса в секундах.
+        node_limit (int): Бюджет узлов каждого процесса.
+        table_bytes (int): Размер общей таблицы в байтах.
+
+    Returns:
+        AnalysisResult: Результат наибольшей завершённой глубины; nodes - сумма по процессам.
+    """
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context()
+    table = SharedTable(table_bytes)
+    stop = context.Event()
+    results = context.Queue()
+    started = time.perf_counter()
+    processes = [context.Process(target=_worker, daemon=True,
+                                 args=(index, type(board).__module__, board.to_fen(color),
+                                       'bitboard' if board.bitboards is not None else 'grid', color, table,
+                                       max_depth, time_limit, node_limit, stop, results))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    finished = []
+    try:
+        while len(finished) < workers:
+            try:
+                finished.append(results.get(timeout=0.1))
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes) and results.empty():
+                    raise RuntimeError("Процессы поиска завершились без результата")
+                continue
+            # Первый досчитавший до конечной глубины останавливает остальных
+            if finished[-1][1].depth >= max_depth:
+                stop.set()
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+    best = max(finished, key=lambda item: (item[1].depth, -item[0]))[1]
+    return best._replace(nodes=sum(result.nodes for _, result in finished), seconds=time.perf_counter() - started)
+
+
+def benchmark(board, color, depth, max_workers=None, out=None):
+    """Замеряет ускорение поиска до глубины `depth` на 1..max_workers процессах.
+
+    Returns:
+        list: Для каждого числа процессов словарь: workers, seconds, speedup, nodes, nps, score, line.
+    """
+    out = out or sys.stdout
+    max_workers = max_workers or os.cpu_count() or 1
+    rows = []
+    for workers in range(1, max_workers + 1):
+        result = analyse_parallel(board, color, workers, max_depth=depth)
+        seconds = result.seconds
+        row = {
+            'workers': workers,
+            'seconds': round(seconds, 4),
+            'speedup': round(rows[0]['seconds'] / seconds, 2) if rows and seconds else 1.0,
+            'nodes': result.nodes,
+            'nps': round(result.nodes / seconds) if seconds else 0,
+            'score': result.score,
+            'line': result.line,
+        }
+        rows.append(row)
+        print(f"{workers:3} проц.: {row['seconds']:.3f} с, ускорение {row['speedup']:.2f}, "
+              f"{row['nodes']} узлов, {row['nps']} узлов/с, оценка {row['score']}", file=out)
+    return rows
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Параллельный анализ позиции (Lazy SMP).")
+    parser.add_argument('--variant', default='chess167', choices=('chessbase', 'chess167'), help="модуль игры")
+    parser.add_argument('--fen', help="позиция в FEN (по умолчанию - начальная)")
+    parser.add_argument('--backend', default='grid', choices=('grid', 'bitboard'), help="представление доски")
+    parser.add_argument('--depth', type=int, default=4, help="глубина поиска")
+    parser.add_argument('--time', type=float, help="бюджет времени в секундах")
+    parser.add_argument('--workers', type=int, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument('--bench', action='store_true', help="замерить ускорение на 1..max-workers процессах")
+    parser.add_argument('--max-workers', type=int, help="наибольшее число процессов для --bench")
+    parser.add_argument('--output', help="файл для результатов замера в формате JSON")
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(args.variant)
+    game = module.Game.from_fen(args.fen, args.backend) if args.fen else module.Game(args.backend)
+    if args.bench:
+        rows = benchmark(game.board, game.current_turn, args.depth, args.max_workers)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output:
+                json.dump(rows, output, ensure_ascii=False, indent=2)
+        return 0
+    result = analyse_parallel(game.board, game.current_turn, args.workers, args.depth, args.time)
+    print(f"Глубина {result.depth}: оценка {result.score}, линия {' '.join(result.line)}, "
+          f"{result.nodes} узлов за {result.seconds:.3f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""Эндшпильная база shashki: точная оценка позиций с небольшим числом фигур.
+
+База строится ретроградным анализом по правилам `shashki` (обязательное
+взятие, цепочки взятий, дамки). Позиции разбиты на срезы по составу
+материала (белые шашки, белые дамки, чёрные шашки, чёрные дамки). Взятие
+ведёт в срез с меньшим числом фигур, превращение - в срез с меньшим числом
+шашек, поэтому срезы решаются по возрастанию (фигур, шашек), а срезы одной
+группы независимы и решаются параллельно. Внутри среза ходы всех позиций
+генерируются в пуле процессов, а затем исходы распространяются от конечных
+позиций назад по обратным рёбрам в порядке возрастания расстояния.
+
+Каждая позиция - 16-битное число little-endian (с точки зрения стороны, чей ход):
+    0         - ничья (и недостижимые расстановки);
+    1..32767  - выигрыш за столько полуходов;
+    32768 + d - проигрыш через d полуходов (0 - ходов нет).
+Байта не хватает: в срезах с дамками выигрыш может длиться больше 127
+полуходов. Расстояние, не помещающееся в запись, - ошибка построения, а не
+молча обрезанное значение.
+
+Номер позиции в срезе: комбинаторный номер полей каждой группы фигур среди
+ещё свободных полей, умноженный на 2, плюс очередь хода (1 - чёрные).
+Файл базы - заголовок HEADER, каталог срезов (DIRECTORY на срез) и записи
+срезов подряд; он отображается в память только для чтения.
+
+Построение идёт со скоростью порядка 60 мкс на позицию на ядро: 4 фигуры -
+16,6 млн позиций, 5 фигур - около 400 млн (часы на нескольких ядрах), 6 фигур
+на порядок больше.
+
+Примеры запуска:
+    python tablebase.py build --pieces 5 --output shashki5.tb --workers 16
+    python tablebase.py probe shashki4.tb "W:WK29:B5"
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from draughts_bitboard import DraughtsPosition
+
+MAGIC = b'STBL'
+VERSION = 2
+# Сигнатура, версия, наибольшее число фигур, число срезов
+HEADER = struct.Struct('<4sHHI')
+# Состав среза (4 байта), смещение и размер данных в байтах
+DIRECTORY = struct.Struct('<4BQQ')
+
+WIN, DRAW, LOSS = 1, 0, -1
+ENTRY_BYTES = 2
+LOSS_BASE = 1 << 15
+MAX_DISTANCE = LOSS_BASE - 1
+CHUNK_POSITIONS = 4096
+
+# Поля, на которых не может стоять шашка: последний ряд её цвета
+WHITE_MEN_FORBIDDEN = 0xF
+BLACK_MEN_FORBIDDEN = 0xF << 28
+
+# Биномиальные коэффициенты C(n, k) для n <= 32
+COMB = [[0] * 33 for _ in range(33)]
+for _n in range(33):
+    COMB[_n][0] = 1
+    for _k in range(1, _n + 1):
+        COMB[_n][_k] = COMB[_n - 1][_k - 1] + COMB[_n - 1][_k]
+
+
+def encode(result, distance):
+    """Упаковывает исход (WIN, DRAW, LOSS) и расстояние в запись базы.
+
+    Raises:
+        ValueError: Если расстояние не помещается в запись (больше MAX_DISTANCE).
+    """
+    if result == DRAW:
+        return 0
+    if distance > MAX_DISTANCE:
+        raise ValueError(f"Расстояние {distance} не помещается в запись базы")
+    return distance if result == WIN else LOSS_BASE + distance
+
+
+def decode(value):
+    """Обратное к `encode`: (result, distance)."""
+    if value == 0:
+        return DRAW, 0
+    if value < LOSS_BASE:
+        return WIN, value
+    return LOSS, value - LOSS_BASE
+
+
+def material_of(white, black, kings):
+    """Состав позиции: (белые шашки, белые дамки, чёрные шашки, чёрные дамки)."""
+    return ((white & ~kings).bit_count(), (white & kings).bit_count(),
+            (black & ~kings).bit_count(), (black & kings).bit_count())
+
+
+def slice_size(material):
+    """Число расстановок среза (без очереди хода)."""
+    size, free = 1, 32
+    for count in material:
+        size *= COMB[free][count]
+        free -= count
+    return size
+
+
+def slices(max_pieces):
+    """Составы всех срезов до `max_pieces` фигур в порядке решения.
+
+    Returns:
+        list: Группы срезов; срезы одной группы не зависят друг от друга.
+    """
+    groups = {}
+    for pieces in range(2, max_pieces + 1):
+        for material in itertools.product(range(pieces + 1), repeat=4):
+            wm, wk, bm, bk = material
+            if sum(material) == pieces and wm + wk and bm + bk:
+                groups.setdefault((pieces, wm + bm), []).append(material)
+    return [groups[key] for key in sorted(groups)]
+
+
+def index_of(white, black, kings, material):
+    """Номер расстановки в срезе `material` (без очереди хода)."""
+    index, used, free = 0, 0, 32
+    for mask, count in zip((white & ~kings, white & kings, black & ~kings, black & kings), material):
+        rank, order, rest = 0, 0, mask
+        while rest:
+            low = rest & -rest
+            order += 1
+            # Номер поля среди ещё свободных
+            rank += COMB[low.bit_length() - 1 - (used & (low - 1)).bit_count()][order]
+            rest ^= low
+        index = index * COMB[free][count] + rank
+        used |= mask
+        free -= count
+    return index
+
+
+def position_of(index, material):
+    """Обратное к `index_of`: маски (white, black, kings)."""
+    sizes, free = [], 32
+    for count in material:
+        sizes.append(COMB[free][count])
+        free -= count
+    ranks = []
+    for size in reversed(sizes):
+        index, rank = divmod(index, size)
+        ranks.append(rank)
+    ranks.reverse()
+    masks, used = [], []
+    for rank, count in zip(ranks, material):
+        chosen = []
+        # Комбинация по номеру: старшее поле - наибольшее n с C(n, k) <= rank
+        for order in range(count, 0, -1):
+            n = order - 1
+            while COMB[n + 1][order] <= rank:
+                n += 1
+            rank -= COMB[n][order]
+            chosen.append(n)
+        mask, squares = 0, []
+        for sq in chosen:
+            # Номер среди свободных полей -> номер поля: пропускаем занятые поля не правее него
+            for taken in used:
+                if taken <= sq:
+                    sq += 1
+            mask |= 1 << sq
+            squares.append(sq)
+        masks.append(mask)
+        used = sorted(used + squares)
+    white_men, white_kings, black_men, black_kings = masks
+    return white_men | white_kings, black_men | black_kings, white_kings | black_kings
+
+
+def _slice_name(material):
+    return ''.join(map(str, material))
+
+
+class _Slices:
+    """Уже решённые срезы: чтение записей из файлов рабочего каталога или из файла базы."""
+
+    def __init__(self, workdir=None, tables=None):
+        self._workdir = workdir
+        self._tables = tables if tables is not None else {}
+        self._maps = []
+
+    def value(self, white, black, kings, side):
+        """Запись позиции или None, если срез не решён."""
+        material = material_of(white, black, kings)
+        table = self._tables.get(material)
+        if table is None:
+            if self._workdir is None:
+                return None
+            path = os.path.join(self._workdir, _slice_name(material))
+            if not os.path.exists(path):
+                return None
+            with open(path, 'rb') as file:
+                table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps.append(table)
+            self._tables[material] = table
+        offset = (index_of(white, black, kings, material) * 2 + (side == 'B')) * ENTRY_BYTES
+        return table[offset] | table[offset + 1] << 8
+
+    def close(self):
+        for table in self._maps:
+            table.close()
+        self._maps.clear()
+        self._tables.clear()
+
+
+_worker_slices = None
+
+
+def _expand(workdir, material, start, stop):
+    """Ходы позиций среза с номерами [start, stop) (выполняется в процессе пула).
+
+    Returns:
+        tuple: Для каждой позиции - число ходов (-1 для недостижимой) и наилучший
+            известный исход через ходы в другие срезы; рёбра внутри среза -
+            массивы (откуда, куда).
+    """
+    global _worker_slices
+    if _worker_slices is None or _worker_slices._workdir != workdir:
+        _worker_slices = _Slices(workdir)
+    solved = _worker_slices
+    counts = array('h')
+    outside = array('H')
+    sources, targets = array('I'), array('I')
+    position = DraughtsPosition()
+    for number in range(start, stop):
+        white, black, kings = position_of(number >> 1, material)
+        side = 'B' if number & 1 else 'W'
+        if white & ~kings & WHITE_MEN_FORBIDDEN or black & ~kings & BLACK_MEN_FORBIDDEN:
+            counts.append(-1)
+            outside.append(0)
+            continue
+        position.restore((white, black, kings))
+        moves = position.legal_moves(side)
+        # Лучший выигрыш и худший проигрыш через ходы в другие срезы; открытые ходы считаются ниже
+        best_win, worst_loss, open_moves = None, 0, 0
+        for path, taken, king in moves:
+            position.apply(side, path[0], path[-1], taken, king)
+            after = position.state()
+            position.restore((white, black, kings))
+            opponent = after[1] if side == 'W' else after[0]
+            if not opponent:
+                best_win = 1
+                continue
+            reply = 'W' if side == 'B' else 'B'
+            if not taken and (not king or kings >> path[0] & 1):
+                # Без взятия и превращения позиция остаётся в том же срезе
+                sources.append(number)
+                targets.append(index_of(*after, material) * 2 + (reply == 'B'))
+                open_moves += 1
+                continue
+            result, distance = decode(solved.value(*after, reply))
+            if result == LOSS:
+                best_win = distance + 1 if best_win is None else min(best_win, distance + 1)
+            elif result == WIN:
+                worst_loss = max(worst_loss, distance + 1)
+            else:
+                open_moves += 1
+        counts.append(open_moves if moves else 0)
+        outside.append(encode(WIN, best_win) if best_win is not None else encode(LOSS, worst_loss))
+    return start, counts, outside, sources, targets
+
+
+def solve_slice(material, workdir, pool=None):
+    """Решает срез и записывает его в файл рабочего каталога.
+
+    Args:
+        material (tuple): Состав среза.
+        workdir (str): Каталог с уже решёнными срезами.
+        pool (Executor): Пул процессов (None - в текущем процессе).
+
+    Returns:
+        array: Записи среза (array('H')).
+
+    Raises:
+        ValueError: Если расстояние до конца партии не помещается в запись.
+    """
+    total = slice_size(material) * 2
+    ranges = [(start, min(start + CHUNK_POSITIONS, total)) for start in range(0, total, CHUNK_POSITIONS)]
+    if pool is None:
+        parts = [_expand(workdir, material, start, stop) for start, stop in ranges]
+    else:
+        parts = pool.map(_expand, *zip(*((workdir, material, start, stop) for start, stop in ranges)))
+
+    # Сколько ходов позиции ещё не опровергнуто и худший известный проигрыш
+    remaining = array('h', [0]) * total
+    worst = array('H', [0]) * total
+    table = array('H', [0]) * total
+    buckets = {}
+    edges = []
+    for start, counts, outside, sources, targets in parts:
+        for offset, count in enumerate(counts):
+            number = start + offset
+            remaining[number] = count
+            value = outside[offset]
+            if count < 0:
+                continue
+            if value and value < LOSS_BASE:
+                buckets.setdefault(value, []).append((number, value))
+            else:
+                worst[number] = value - LOSS_BASE
+                if count == 0:
+                    # Все ходы ведут к выигрышу соперника (или ходов нет)
+                    buckets.setdefault(value - LOSS_BASE, []).append((number, value))
+        edges.append((sources, targets))
+
+    # Обратные рёбра в сжатом виде: предшественники позиции n - predecessors[first[n]:first[n + 1]]
+    first = array('I', [0]) * (total + 1)
+    for _, targets in edges:
+        for target in targets:
+            first[target + 1] += 1
+    for number in range(total):
+        first[number + 1] += first[number]
+    predecessors = array('I', [0]) * first[total]
+    filled = array('I', first)
+    for sources, targets in edges:
+        for source, target in zip(sources, targets):
+            predecessors[filled[target]] = source
+            filled[target] += 1
+    del edges, filled
+
+    # Исходы расходятся от известных позиций в порядке возрастания расстояния:
+    # первый найденный выигрыш - кратчайший, последний опровергнутый ход - самый долгий проигрыш
+    solved = bytearray(total)
+    distance = 0
+    while buckets:
+        for number, value in buckets.pop(distance, ()):
+            if solved[number]:
+                continue
+            solved[number] = 1
+            table[number] = value
+            won = value < LOSS_BASE
+            for previous in predecessors[first[number]:first[number + 1]]:
+                if solved[previous]:
+                    continue
+                if not won:
+                    buckets.setdefault(distance + 1, []).append((previous, encode(WIN, distance + 1)))
+                else:
+                    remaining[previous] -= 1
+                    worst[previous] = max(worst[previous], distance + 1)
+                    if remaining[previous] == 0:
+                        buckets.setdefault(worst[previous], []).append(
+                            (previous, encode(LOSS, worst[previous])))
+        distance += 1
+    with open(os.path.join(workdir, _slice_name(material)), 'wb') as file:
+        if sys.byteorder == 'little':
+            table.tofile(file)
+        else:
+            swapped = array('H', table)
+            swapped.byteswap()
+            swapped.tofile(file)
+    return table
+
+
+def build(path, max_pieces=5, workers=None, out=None):
+    """Строит базу для позиций до `max_pieces` фигур и записывает её в файл.
+
+    Args:
+        path (str): Путь к файлу базы.
+        max_pieces (int): Наибольшее число фигур на доске.
+        workers (int): Число процессов (1 - без пула, по умолчанию - число ядер).
+        out (file): Поток для сообщений о ходе построения (None - без сообщений).
+
+    Returns:
+        dict: Состав среза -> число позиций.
+    """
+    workers = workers or os.cpu_count() or 1
+    workdir = tempfile.mkdtemp(prefix='tablebase-')
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    order = [material for group in slices(max_pieces) for material in group]
+    try:
+        for material in order:
+            solve_slice(material, workdir, pool)
+            if out is not None:
+                print(f"срез {_slice_name(material)}: {slice_size(material) * 2} позиций", file=out)
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, max_pieces, len(order)))
+            offset = HEADER.size + DIRECTORY.size * len(order)
+            for material in order:
+                size = slice_size(material) * 2 * ENTRY_BYTES
+                file.write(DIRECTORY.pack(*material, offset, size))
+                offset += size
+            for material in order:
+                with open(os.path.join(workdir, _slice_name(material)), 'rb') as part:
+                    shutil.copyfileobj(part, file)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if _worker_slices is not None and _worker_slices._workdir == workdir:
+            _worker_slices.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {material: slice_size(material) * 2 for material in order}
+
+
+class Tablebase:
+    """База, отображённая в память только для чтения.
+
+    Атрибуты:
+        max_pieces (int): Наибольшее число фигур позиций базы.
+    """
+
+    def __init__(self, path):
+        """Открывает файл базы.
+
+        Raises:
+            ValueError: Если файл не является базой или обрезан.
+        """
+        self._file = open(path, 'rb')
+        try:
+            header = self._file.read(HEADER.size)
+            if len(header) != HEADER.size:
+                raise ValueError(f"Файл {path} не является базой shashki")
+            magic, version, self.max_pieces, count = HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Файл {path} не является базой shashki версии {VERSION}")
+            directory = self._file.read(DIRECTORY.size * count)
+            self._file.seek(0, 2)
+            length = self._file.tell()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            tables = {}
+            for entry in range(count):
+                *material, offset, size = DIRECTORY.unpack_from(directory, entry * DIRECTORY.size)
+                if offset + size > length:
+                    raise ValueError(f"Файл {path} обрезан")
+                tables[tuple(material)] = memoryview(self._map)[offset:offset + size]
+            self._slices = _Slices(tables=tables)
+        except Exception:
+            self._file.close()
+            raise
+
+    def probe_masks(self, white, black, kings, side):
+        """Оценка позиции по маскам `draughts_bitboard`.
+
+        Returns:
+            tuple: (result, distance) с точки зрения стороны `side` или None,
+                если позиции нет в базе.
+        """
+        if not white or not black:
+            return (LOSS, 0) if not (white if side == 'W' else black) else (WIN, 0)
+        value = self._slices.value(white, black, kings, side)
+        return None if value is None else decode(value)
+
+    def probe(self, board, side):
+        """Оценка позиции доски shashki.
+
+        Args:
+            board (Board): Доска (любое представление).
+            side (str): Очередь хода.
+
+        Returns:
+            tuple: (result, distance) - WIN, DRAW или LOSS для стороны `side` и
+                число полуходов до конца партии, или None, если позиции нет в базе.
+        """
+        position = board.bitboards if board.bitboards is not None else DraughtsPosition.from_grid(board.grid)
+        return self.probe_masks(position.white, position.black, position.kings, side)
+
+    def close(self):
+        """Снимает отображение и закрывает файл."""
+        for table in self._slices._tables.values():
+            table.release()
+        self._slices._tables.clear()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    """Точка входа командной строки."""
+    parser = argparse.ArgumentParser(description="Эндшпильная база shashki.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help="построить базу")
+    build_parser.add_argument('--pieces', type=int, default=5, help="наибольшее число фигур")
+    build_parser.add_argument('--output', default='shashki.tb', help="файл базы")
+    build_parser.add_argument('--workers', type=int, help="число процессов (по умолчанию - число ядер)")
+    probe_parser = commands.add_parser('probe', help="оценить позицию")
+    probe_parser.add_argument('path', help="файл базы")
+    probe_parser.add_argument('fen', help="позиция в FEN шашек")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build(args.output, args.pieces, args.workers, out=sys.stdout)
+        return 0
+    import shashki
+    board = shashki.Board.from_fen(args.fen, 'bitboard')
+    with Tablebase(args.path) as base:
+        found = base.probe(board, args.fen.strip()[0])
+    if found is None:
+        print("Позиции нет в базе")
+        return 1
+    result, distance = found
+    names = {WIN: "выигрыш", DRAW: "ничья", LOSS: "проигрыш"}
+    print(names[result] if result == DRAW else f"{names[result]} за {distance} полуходов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
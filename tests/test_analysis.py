@@ -0,0 +1,37 @@
+import chess167
+import chessbase
+from analysis import MATE, Searcher, analyse, pack_entry, unpack_entry
+
+
+def test_entry_packing_round_trip():
+    for score in (-MATE, -5, 0, 731, MATE - 3):
+        assert unpack_entry(pack_entry(score, 2, 0xABCDE)) == (score, 2, 0xABCDE)
+
+
+def test_finds_free_capture_and_restores_board():
+    board = chess167.Board.from_fen('4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1')
+    before = (board.to_fen(), board.zobrist_key, len(board.undo_stack))
+    result = analyse(board, 'W', max_depth=3)
+    assert result.line[0] == 'd1d5' and result.score >= 400 and result.depth == 3
+    assert (board.to_fen(), board.zobrist_key, len(board.undo_stack)) == before
+
+
+def test_king_capture_is_mate():
+    board = chessbase.Board.from_fen('R3k3/8/8/8/8/8/8/4K3 w - - 0 1')
+    result = analyse(board, 'W', max_depth=4)
+    assert result.score == MATE and result.line == ['a8e8']
+
+
+def test_budgets_stop_the_search():
+    board = chess167.Board()
+    result = Searcher(board).iterate('W', node_limit=3000)
+    assert 1 <= result.depth < 64 and result.line and result.nodes <= 3000
+    assert board.to_fen() == chess167.Board().to_fen() and not board.undo_stack
+    assert analyse(board, 'W', time_limit=0.05).depth >= 1
+
+
+def test_quiescence_sees_recapture():
+    # Ферзь бьёт защищённую пешку: на глубине 1 без поиска взятий это выглядело бы выгодно
+    board = chessbase.Board.from_fen('4k3/2p5/3p4/8/8/8/8/3QK3 w - - 0 1')
+    result = analyse(board, 'W', max_depth=1)
+    assert result.line[0] != 'd1d6'
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+import chess167
+import chessbase
+from bitboard import BitboardPosition
+
+np = pytest.importorskip('numpy')
+batch = pytest.importorskip('batch')
+
+
+def random_boards(module, count, plies=40, seed=3):
+    rnd = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = module.Board()
+        side = 'W'
+        for _ in range(rnd.randrange(plies)):
+            generated = board.generate_moves(side)
+            if not generated:
+                break
+            board.make_move(*rnd.choice(generated))
+            side = 'B' if side == 'W' else 'W'
+        boards.append(board)
+    return boards
+
+
+@pytest.mark.parametrize('module', [chessbase, chess167])
+def test_batch_matches_boards(module):
+    boards = random_boards(module, 20)
+    positions = batch.encode_boards(boards)
+    for color in 'WB':
+        counts = batch.move_counts(positions, color, module.VARIANT, chunk_size=7)
+        threats, check = batch.threatened_pieces(positions, color, module.VARIANT, chunk_size=7)
+        for index, board in enumerate(boards):
+            assert counts[index] == len(board.generate_moves(color))
+            if module is chess167:
+                expected, expected_check = board.get_threatened_pieces(color)
+                assert {divmod(int(sq), 8) for sq in np.flatnonzero(threats[index])} == set(expected)
+                assert bool(check[index]) == expected_check
+
+
+def test_attack_maps_match_bitboards():
+    boards = random_boards(chessbase, 10, seed=5)
+    attacked = batch.attack_maps(batch.encode_boards(boards), 'B', chessbase.VARIANT)
+    for index, board in enumerate(boards):
+        position = BitboardPosition.from_grid(board.grid, chessbase.VARIANT)
+        assert sum(1 << int(sq) for sq in np.flatnonzero(attacked[index])) == position.attacked_by('B')
+
+
+def test_attack_maps_of_empty_batch():
+    assert batch.attack_maps(np.zeros((0, 64), dtype=np.int8), 'W').shape == (0, 64)
@@ -0,0 +1,60 @@
+import pytest
+
+import chess167
+from bitboard import BitboardPosition
+from exchange import static_exchange, threat_report
+
+
+def report(fen, color, backend='bitboard', values=None):
+    board = chess167.Board.from_fen(fen, backend)
+    return {(threat.square, threat.piece): threat.gain for threat in board.get_threat_report(color, values)}
+
+
+@pytest.mark.parametrize('backend', chess167.Board.BACKENDS)
+def test_defended_piece_is_not_lost(backend):
+    # Ладья e5 под боем ладьи e1, но защищена пешкой d6: размен равный
+    assert report('4k3/8/3p4/4r3/8/8/8/K3R3 w - - 0 1', 'B', backend) == {((3, 4), 'R'): 0}
+    assert report('4k3/8/8/4r3/8/8/8/K3R3 w - - 0 1', 'B', backend) == {((3, 4), 'R'): 500}
+
+
+def test_xray_attacker_behind_slider():
+    # Ладья e1 вступает в размен только после того, как e2 ушла с линии
+    assert report('4r2k/8/8/4r3/8/8/4R3/K3R3 w - - 0 1', 'B') == {((3, 4), 'R'): 500}
+    assert report('4r2k/8/8/4r3/8/8/4R3/K7 w - - 0 1', 'B') == {((3, 4), 'R'): 0}
+
+
+def test_capture_stops_when_continuing_loses():
+    # Пешка берёт защищённого ферзя; после ответного взятия ладья d1 забирает и пешку
+    board = chess167.Board.from_fen('7k/8/4p3/3q4/2P5/8/8/K2R4 w - - 0 1', 'bitboard')
+    assert static_exchange(board.bitboards, 3 * 8 + 3) == 900
+    threat = board.get_threat_report('B')[0]
+    assert threat.attackers == [(4, 2), (7, 3)] and threat.defenders == [(2, 4)]
+    board = chess167.Board.from_fen('7k/8/4p3/3q4/2P5/8/8/K1R5 w - - 0 1', 'bitboard')
+    assert static_exchange(board.bitboards, 3 * 8 + 3) == 800
+    # Защищённую ладьёй пешку ферзём брать невыгодно
+    assert static_exchange(board.bitboards, 4 * 8 + 2) == -800
+    assert report('7k/8/4p3/3q4/2P5/8/8/K1R5 w - - 0 1', 'W') == {((4, 2), 'P'): -800}
+
+
+def test_fairy_piece_values_are_configurable():
+    fen = '7k/8/4p3/3D4/2P5/8/8/K7 w - - 0 1'.replace('D', 'd')
+    assert report(fen, 'B') == {((3, 3), 'D'): 550}
+    assert report(fen, 'B', values={'D': 700}) == {((3, 3), 'D'): 600}
+
+
+def test_grid_board_keeps_attack_map_between_reports():
+    board = chess167.Board()
+    first = board.get_threat_report('W')
+    position = board._exchange
+    moves = (((6, 4), (5, 4)), ((1, 3), (2, 3)), ((4, 3), (3, 3)))
+    for start, end in moves:
+        assert board.move_piece(start, end)
+        report = board.get_threat_report('B')
+        assert board._exchange is position
+        assert report == threat_report(BitboardPosition.from_grid(board.grid, chess167.VARIANT), 'B')
+    for _ in moves:
+        board.unmake_move()
+    assert board.get_threat_report('W') == first and board._exchange is position
+    board.grid[5][4] = chess167.Pawn('B')
+    board.invalidate_moves()
+    assert board.get_threat_report('W') == threat_report(BitboardPosition.from_grid(board.grid, chess167.VARIANT), 'W')
@@ -0,0 +1,54 @@
+import pytest
+
+import chess167
+import chessbase
+import perft
+import shashki
+from fen import START_FEN
+
+
+@pytest.mark.parametrize('backend', ['grid', 'bitboard'])
+def test_start_position_round_trip(backend):
+    board = chessbase.Board.from_fen(START_FEN, backend)
+    assert board.to_fen() == START_FEN
+    assert board.grid == chessbase.Board().grid and board.zobrist_key == chessbase.Board().zobrist_key
+
+
+def test_game_from_fen_matches_replayed_game():
+    game = chess167.Game()
+    for move in ('e2e3', 'e5d4', 'e3d4'):
+        assert game.apply_move(move)
+    restored = chess167.Game.from_fen(game.to_fen(), 'bitboard')
+    assert (restored.current_turn, restored.move_count) == ('B', 3)
+    assert restored.board.zobrist_key == game.board.zobrist_key
+    assert sorted(restored.board.generate_moves('B')) == sorted(game.board.generate_moves('B'))
+    assert game.to_fen().split('/')[3:5] == ['2ud4', '2UPS3']
+
+
+def test_perft_from_fen_matches_moves():
+    fen = perft.load_game('chessbase', moves='e2e4 e7e5 g1f3').to_fen()
+    assert perft.run('chessbase', 2, fen=fen)['per_ply'] == perft.REFERENCE[('chessbase', 'e2e4 e7e5 g1f3')][:2]
+
+
+@pytest.mark.parametrize('fen', ['8/8/8/8/8/8/8 w - - 0 1', 'rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w',
+                                 'xnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w', START_FEN.replace(' w ', ' x ')])
+def test_invalid_fen_raises(fen):
+    with pytest.raises(ValueError):
+        chessbase.Board.from_fen(fen)
+
+
+def test_chess167_letters_are_rejected_by_chessbase():
+    with pytest.raises(ValueError):
+        chessbase.Board.from_fen('4k3/8/8/3U4/8/8/8/4K3 w - - 0 1')
+
+
+def test_draughts_fen():
+    game = shashki.Game()
+    assert game.to_fen() == 'W:W21,22,23,24,25,26,27,28,29,30,31,32:B1,2,3,4,5,6,7,8,9,10,11,12'
+    board = shashki.Board.from_fen('B:Wc3,K29:B5.')
+    assert board.grid[5][2] is shashki.Checker('W') and board.grid[7][0] is shashki.Piece('W', 'D')
+    assert board.grid[1][0] is shashki.Checker('B')
+    assert board.to_fen('B') == 'B:W22,K29:B5'
+    assert shashki.Game.from_fen('B:W22,K29:B5').current_turn == 'B'
+    with pytest.raises(ValueError):
+        shashki.Board.from_fen('W:Wa2:B1')
@@ -0,0 +1,92 @@
+import json
+import pstats
+
+import pytest
+
+import chessbase
+import chess167
+import instrument
+import shashki
+
+
+@pytest.fixture
+def profiled():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def calls():
+    return {row['name']: row['calls'] for row in instrument.snapshot()}
+
+
+def test_disabled_leaves_classes_untouched():
+    originals = (chess167.Piece.__dict__['get_possible_moves'], chessbase.Pawn.__dict__['is_valid_move'],
+                 shashki.Board.__dict__['move_piece'])
+    instrument.enable()
+    assert chess167.Piece.__dict__['get_possible_moves'] is not originals[0]
+    instrument.disable()
+    assert (chess167.Piece.__dict__['get_possible_moves'], chessbase.Pawn.__dict__['is_valid_move'],
+            shashki.Board.__dict__['move_piece']) == originals
+    assert not instrument.enabled()
+
+
+def test_counts_per_piece_class(profiled):
+    game = chess167.Game()
+    game.board.generate_moves('W')
+    assert game.apply_move('g2g3')
+    counted = calls()
+    assert counted['chess167.Board.generate_moves'] == 1
+    assert counted['chess167.Board.move_piece[Pawn]'] == 1
+    assert counted['chess167.Game.parse_input'] == 1
+    assert counted['chess167.Piece.get_possible_moves[Knight]'] == 2
+    assert counted['chess167.Piece.get_possible_moves[Unicorn]'] == 1
+
+
+def test_every_game_is_instrumented(profiled):
+    assert chessbase.Game().apply_move('g1f3')
+    assert shashki.Game().apply_move('c3d4')
+    counted = calls()
+    assert counted['chessbase.Piece.is_valid_move[Knight]'] >= 1
+    assert counted['chessbase.Board.move_piece[Knight]'] == 1
+    assert counted['shashki.Board.move_piece[Checker]'] == 1
+    assert counted['shashki.Game.parse_path'] == 1
+
+
+def test_own_time_excludes_nested_calls(profiled):
+    chess167.Game().board.generate_moves('W')
+    rows = {row['name']: row for row in instrument.snapshot()}
+    outer = rows['chess167.Board.generate_moves']
+    assert outer['own'] <= outer['total']
+    nested = sum(row['total'] for name, row in rows.items() if 'get_possible_moves' in name)
+    assert outer['own'] <= outer['total'] - nested + 1e-6
+
+
+def test_json_and_pstats_export(profiled, tmp_path):
+    chessbase.Game().board.generate_moves('W')
+    instrument.to_json(tmp_path / 'stats.json')
+    data = json.loads((tmp_path / 'stats.json').read_text('utf-8'))
+    assert {row['name'] for row in data['functions']} >= {'chessbase.Board.generate_moves'}
+    stats = pstats.Stats(str(instrument.dump_stats(tmp_path / 'stats.prof')))
+    functions = {name: counts for (_, _, name), counts in stats.stats.items()}
+    assert functions['Board.generate_moves'][1] == 1
+    # Вызывающий записан для вложенных вызовов
+    assert any(('Board.generate_moves' in (caller[2] for caller in counts[4]))
+               for name, counts in functions.items() if name.startswith('Board.get_moves'))
+
+
+def test_stats_command_toggles_instrumentation():
+    instrument.reset()
+    try:
+        assert 'выключено' in instrument.command('', chessbase)
+        instrument.command('on', chessbase)
+        # Включается только модуль, из которого вызвана команда
+        assert instrument.enabled() and not hasattr(chess167.Piece.__dict__['is_valid_move'], '__wrapped_original__')
+        chessbase.Game().apply_move('e2e4')
+        assert 'chessbase.Board.move_piece[Pawn]' in instrument.command('', chessbase)
+    finally:
+        instrument.command('off')
+        instrument.reset()
+    assert not instrument.enabled()
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+import chess167
+import chessbase
+import shashki
+from draughts_bitboard import DraughtsPosition
+
+BOARDS = [(chessbase, 'grid'), (chessbase, 'bitboard'), (chess167, 'grid'), (chess167, 'bitboard'), (shashki, 'grid'), (shashki, 'bitboard')]
+
+
+def new_board(module, backend):
+    return module.Board(backend) if backend else module.Board()
+
+
+def snapshot(board):
+    """Всё состояние доски, которое должен восстановить unmake_move."""
+    grid = [[piece and (piece.color, piece.name) for piece in row] for row in board.grid]
+    bitboards = getattr(board, 'bitboards', None)
+    extra = None
+    if isinstance(bitboards, DraughtsPosition):
+        extra = bitboards.state()
+    elif bitboards is not None:
+        extra = ({color: {name: bits for name, bits in pieces.items() if bits}
+                  for color, pieces in bitboards.pieces.items()},
+                 dict(bitboards.occupied), bitboards.occupancy, bitboards.sliders, list(bitboards.squares),
+                 [bitboards.attacks_of(sq) for sq in range(64)], dict(bitboards._attacked))
+    return grid, board.zobrist_key, list(board.history), extra
+
+
+def place(board, pieces, side='W'):
+    """Ставит на пустую доску шашек фигуры {(row, col): piece} и пересчитывает ключ."""
+    board.grid = [[None] * 8 for _ in range(8)]
+    for (row, col), piece in pieces.items():
+        board.grid[row][col] = piece
+    board.zobrist_key = shashki.ZOBRIST.hash_grid(board.grid, side)
+    board.history = [board.zobrist_key]
+    board.undo_stack = []
+
+
+@pytest.mark.parametrize('module, backend', BOARDS)
+def test_random_games_round_trip(module, backend):
+    for seed in range(3):
+        rnd = random.Random(seed)
+        board = new_board(module, backend)
+        initial = snapshot(board)
+        side = 'W'
+        for _ in range(40):
+            moves = board.generate_moves(side)
+            if not moves:
+                break
+            before = snapshot(board)
+            for start, end in moves[:8]:
+                assert board.make_move(start, end)
+                board.unmake_move()
+                assert snapshot(board) == before
+            assert board.make_move(*rnd.choice(moves))
+            side = 'B' if side == 'W' else 'W'
+        while board.undo_stack:
+            board.unmake_move()
+        assert snapshot(board) == initial
+
+
+@pytest.mark.parametrize('module, backend', BOARDS)
+def test_move_piece_can_be_unmade(module, backend):
+    board = new_board(module, backend)
+    initial = snapshot(board)
+    white, black = (((5, 0), (4, 1)), ((2, 1), (3, 0))) if module is shashki else (((6, 0), (5, 0)), ((1, 0), (2, 0)))
+    assert board.make_move(*white)
+    after_white = snapshot(board)
+    assert board.move_piece(*black)
+    board.unmake_move()
+    assert snapshot(board) == after_white
+    board.unmake_move()
+    assert snapshot(board) == initial
+
+
+@pytest.mark.parametrize('module, backend', BOARDS)
+def test_invalid_move_leaves_no_record(module, backend):
+    board = new_board(module, backend)
+    before = snapshot(board)
+    assert not board.make_move((7, 0), (3, 0))
+    assert not board.move_piece((6, 4), (-1, 4))
+    assert board.undo_stack == [] and snapshot(board) == before
+
+
+def test_shashki_capture_with_promotion_is_restored():
+    board = shashki.Board()
+    place(board, {(2, 1): shashki.Checker('W'), (1, 2): shashki.Checker('B'), (6, 5): shashki.Checker('B')})
+    before = snapshot(board)
+    assert board.make_move((2, 1), (0, 3))
+    assert board.grid[1][2] is None
+    assert board.grid[0][3].name == 'D' and board.grid[0][3].color == 'W'
+    assert board.zobrist_key == shashki.ZOBRIST.hash_grid(board.grid, 'B')
+    board.unmake_move()
+    assert snapshot(board) == before
+    assert isinstance(board.grid[2][1], shashki.Checker) and board.grid[1][2].color == 'B'
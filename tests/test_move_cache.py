@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import chess167
+
+
+@pytest.mark.parametrize('backend', ['grid', 'bitboard'])
+def test_cached_moves_follow_the_position(backend):
+    rnd = random.Random(4)
+    board = chess167.Board(backend)
+    side = 'W'
+    for _ in range(60):
+        fresh = chess167.Board.from_fen(board.to_fen(side), backend)
+        for row in range(8):
+            for col in range(8):
+                assert board.get_moves((row, col)) == fresh.get_moves((row, col))
+        moves = board.generate_moves(side)
+        if not moves:
+            break
+        if rnd.random() < 0.2 and board.undo_stack:
+            board.unmake_move()
+        else:
+            assert board.move_piece(*rnd.choice(moves))
+        side = 'B' if side == 'W' else 'W'
+        threats = board.get_threatened_pieces(side)
+        assert threats == chess167.Board.from_fen(board.to_fen(side), backend).get_threatened_pieces(side)
+
+
+def test_hint_then_move_reuses_moves():
+    board = chess167.Board()
+    bishop, knight = board.get_moves((7, 5)), board.get_moves((7, 1))
+    hints = board.get_moves((6, 4))
+    assert (board.move_cache_hits, board.move_cache_misses) == (0, 3) and bishop == []
+    assert board.get_moves((6, 4)) is hints and board.move_cache_hits == 1
+    assert not board.move_piece((6, 4), (3, 4)) and board.move_cache_hits == 2
+    assert board.move_piece((6, 4), (5, 4)) and board.move_cache_hits == 3
+    # Ход затронул e2 и e3: ходы слона f1 пересчитываются, ходы коня b1 берутся из кэша
+    assert board.get_moves((7, 1)) is knight and board.move_cache_misses == 3
+    assert board.get_moves((7, 5)) == [(6, 4), (5, 3)] and board.move_cache_misses == 4
+
+
+def test_invalidate_after_direct_grid_edit():
+    board = chess167.Board()
+    assert (5, 4) in board.get_moves((6, 4))
+    board.grid[5][4] = chess167.Pawn('B')
+    board.invalidate_moves()
+    assert (5, 4) not in board.get_moves((6, 4))
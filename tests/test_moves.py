@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+import chess167
+import chessbase
+import moves
+import shashki
+from moves import CAPTURE, PROMOTION, MoveList
+
+BOARDS = [(chessbase, 'grid'), (chessbase, 'bitboard'), (chess167, 'grid'), (chess167, 'bitboard'), (shashki, 'grid'), (shashki, 'bitboard')]
+
+
+def test_encoding_round_trip():
+    move = moves.encode(52, 36, promotion='D', captured='U')
+    assert moves.start_square(move) == 52 and moves.end_square(move) == 36
+    assert moves.move_flags(move) == CAPTURE | PROMOTION
+    assert moves.promotion(move) == 'D' and moves.captured(move) == 'U'
+    assert moves.positions(move) == ((6, 4), (4, 4)) and moves.to_text(move) == 'e2e4'
+    assert moves.captured(moves.encode(0, 1)) is None
+
+
+def test_move_list_reuses_storage():
+    buffer = MoveList(capacity=2)
+    for move in range(5):
+        buffer.append(move)
+    storage = buffer.moves
+    buffer.clear()
+    buffer.append(7)
+    assert buffer.moves is storage and list(buffer) == [7] and len(buffer) == 1
+    assert 7 in buffer and 3 not in buffer and buffer[-1] == 7
+    with pytest.raises(IndexError):
+        buffer[1]
+
+
+@pytest.mark.parametrize('module, backend', BOARDS)
+def test_fill_moves_matches_generate_moves(module, backend):
+    rnd = random.Random(1)
+    board = module.Board(backend) if backend else module.Board()
+    buffer = MoveList()
+    side = 'W'
+    for _ in range(30):
+        generated = board.generate_moves(side)
+        board.fill_moves(side, buffer)
+        assert sorted(moves.positions(move) for move in buffer) == sorted(generated)
+        for move in buffer:
+            start, end = moves.positions(move)
+            target = board.grid[end[0]][end[1]]
+            if module is not shashki:
+                assert moves.captured(move) == (target.name if target else None)
+        if not generated:
+            break
+        assert board.make_packed(rnd.choice(buffer.moves[:buffer.count]))
+        side = 'B' if side == 'W' else 'W'
+
+
+def test_is_valid_move_agrees_with_generated_moves():
+    board = chess167.Board()
+    for row in range(8):
+        for col in range(8):
+            piece = board.grid[row][col]
+            if piece:
+                possible = set(piece.get_possible_moves((row, col), board.grid))
+                for end in ((r, c) for r in range(8) for c in range(8)):
+                    assert piece.is_valid_move((row, col), end, board.grid) == (end in possible)
@@ -0,0 +1,37 @@
+import copy
+import pickle
+
+import pytest
+
+import chess167
+import chessbase
+import shashki
+
+
+@pytest.mark.parametrize('piece_class', [chessbase.Queen, chess167.Pawn, chess167.Dragon, shashki.Checker])
+def test_pieces_are_shared_immutable_singletons(piece_class):
+    piece = piece_class('W')
+    assert piece is piece_class('W') and piece is not piece_class('B')
+    assert not hasattr(piece, '__dict__')
+    assert copy.copy(piece) is piece and copy.deepcopy(piece) is piece
+    assert pickle.loads(pickle.dumps(piece)) is piece
+    with pytest.raises(AttributeError):
+        piece.color = 'B'
+
+
+def test_boards_share_pieces():
+    first, second = chess167.Board(), chess167.Board()
+    assert all(a is b for row_a, row_b in zip(first.grid, second.grid) for a, b in zip(row_a, row_b))
+
+
+def test_validation_allocates_no_pieces():
+    board = chessbase.Board()
+    known = len(chessbase.Piece._instances)
+    board.generate_moves('W')
+    assert board.grid[7][3].is_valid_move((7, 3), (5, 3), board.grid) is False
+    assert len(chessbase.Piece._instances) == known
+
+
+def test_shashki_promotion_uses_shared_king():
+    assert shashki.Piece('B', 'D') is shashki.Piece('B', 'D')
+    assert shashki.Piece('B', 'D').symbol == '⛁'.lower()
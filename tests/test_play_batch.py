@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+import chess167
+import chessbase
+import shashki
+
+
+def run(game, text, render_every=0):
+    out = io.StringIO()
+    result = game.play_batch(io.StringIO(text), render_every, out)
+    return result, out.getvalue().splitlines()
+
+
+@pytest.mark.parametrize('module', (chessbase, chess167))
+def test_chess_moves_and_hints(module):
+    game = module.Game()
+    result, lines = run(game, "g2-g3\n\n# ответ чёрных\nhint g7\ng7g6\ng1f4\nhint g6\n")
+    assert result == (2, 2)
+    assert lines == ["1 g2-g3 ok", "hint g7 g6 g5", "2 g7g6 ok", "3 g1f4 error", "hint g6 error"]
+    assert game.current_turn == 'W' and game.move_count == 2
+
+
+def test_shashki_chains_and_hints():
+    game = shashki.Game.from_fen('W:WKc3:Bd4,f6', 'bitboard')
+    result, lines = run(game, "hint c3\nc3:e5:h8\n")
+    assert result == (1, 0)
+    assert lines == ["hint c3 e5:g7 e5:h8", "1 c3:e5:h8 ok"]
+    assert game.to_fen() == shashki.Game.from_fen('B:WKh8:B', 'grid').to_fen()
+
+
+@pytest.mark.parametrize('module', (chessbase, chess167, shashki))
+def test_render_every_n_moves_goes_to_stderr(module, capsys):
+    moves = "c3d4\nf6e5\nd4f6\n" if module is shashki else "g2g3\ng7g6\nh2h3\n"
+    _, lines = run(module.Game(), moves, render_every=2)
+    captured = capsys.readouterr()
+    assert captured.err.count("Ход:") == 1 and captured.out == ""
+    assert [line.split()[-1] for line in lines] == ['ok'] * 3
+    run(module.Game(), moves)
+    assert capsys.readouterr().err == ""
+
+
+def test_main_keeps_result_lines_parsable(tmp_path, capsys):
+    path = tmp_path / 'moves.txt'
+    path.write_text("g2g3\ng7g6\n", encoding='utf-8')
+    assert chess167.main([str(path), '--render-every', '1']) == 0
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == ["1 g2g3 ok", "2 g7g6 ok"]
+    assert captured.err.count("Ход:") == 2
+
+
+def test_main_reads_file_and_reports_rejections(tmp_path, capsys):
+    path = tmp_path / 'moves.txt'
+    path.write_text("c3d4\nf6e5\n", encoding='utf-8')
+    assert shashki.main([str(path)]) == 0
+    path.write_text("c3d4\nc3d4\n", encoding='utf-8')
+    assert shashki.main([str(path), '--backend', 'bitboard']) == 1
+    assert capsys.readouterr().out.splitlines()[-1] == "2 c3d4 error"
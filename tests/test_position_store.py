@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+import chess167
+import position_store
+from position_store import RECORD_SIZE, PositionStore, PositionWriter
+
+
+def played_boards(count, seed=7):
+    rnd = random.Random(seed)
+    game = chess167.Game()
+    boards = []
+    for _ in range(count):
+        moves = game.board.generate_moves(game.current_turn)
+        start, end = rnd.choice(moves)
+        game.board.move_piece(start, end)
+        game.current_turn = 'B' if game.current_turn == 'W' else 'W'
+        boards.append((chess167.Game.from_fen(game.to_fen()).board, game.current_turn))
+    return boards
+
+
+def test_record_round_trip():
+    for board, side in played_boards(20):
+        record = board.to_packed(side)
+        assert len(record) == RECORD_SIZE and position_store.side_to_move(record) == side
+        restored = chess167.Board.from_packed(record)
+        assert restored.grid == board.grid and restored.zobrist_key == board.zobrist_key
+        piece = board.grid[7][4]
+        assert position_store.piece_at(record, 60) == ((piece.color, piece.name) if piece else None)
+
+
+def test_store_gives_zero_copy_records(tmp_path):
+    path = tmp_path / 'positions.bin'
+    boards = played_boards(30, seed=2)
+    with PositionWriter(str(path), chess167.VARIANT) as writer:
+        for board, side in boards:
+            writer.write(board.to_packed(side))
+    assert path.stat().st_size == position_store.HEADER.size + len(boards) * RECORD_SIZE
+
+    store = PositionStore(str(path))
+    assert len(store) == len(boards) and store.variant == 'chess167'
+    record = store[-1]
+    assert isinstance(record, memoryview) and record.readonly
+    board, side = boards[-1]
+    assert bytes(record) == board.to_packed(side)
+    position, stored_side = position_store.unpack_bitboards(store[5], store.variant)
+    expected = chess167.Board.from_packed(store[5], 'bitboard').bitboards
+    assert position.pieces == expected.pieces and stored_side == boards[5][1]
+    del record
+    store.close()
+
+
+def test_store_rejects_foreign_files(tmp_path):
+    path = tmp_path / 'bad.bin'
+    path.write_bytes(b'not a store' * 4)
+    with pytest.raises(ValueError):
+        PositionStore(str(path))
+    with PositionWriter(str(tmp_path / 'x.bin'), 'chess167') as writer, pytest.raises(ValueError):
+        writer.write(b'\0')
@@ -0,0 +1,48 @@
+import io
+
+import chess167
+import render
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def write(self, text):
+        self.calls += 1
+        return super().write(text)
+
+
+def test_plain_frame_uses_markers_and_one_write():
+    out = CountingStream()
+    board = chess167.Board()
+    render.Renderer(out, ansi=False).render(board.grid, ['Ход: 1', 'Шах королю!'], {(4, 2): 'threat', (5, 4): 'hint'})
+    lines = out.getvalue().splitlines()
+    assert out.calls == 1 and lines[:2] == ['Ход: 1', 'Шах королю!']
+    assert lines[8] == '4| . . ! ⊱ ⊞ . . . | 4' and lines[9] == '3| . . . . * . . . | 3'
+
+
+def test_ansi_frames_repaint_only_changes():
+    out = CountingStream()
+    renderer = render.Renderer(out, ansi=True)
+    board = chess167.Board()
+    renderer.render(board.grid, ['Ход: 0'])
+    assert out.getvalue().startswith('\x1b[H\x1b[2J')
+    board.move_piece((6, 4), (5, 4))
+    start = len(out.getvalue())
+    renderer.render(board.grid, ['Ход: 1'], {(4, 2): 'threat'})
+    update = out.getvalue()[start:]
+    assert out.calls == 2
+    assert '\x1b[1;1H\x1b[2KХод: 1' in update
+    assert '\x1b[11;12H.' in update and f'\x1b[10;12H{board.grid[5][4].symbol}' in update
+    assert f"\x1b[9;8H{render.STYLES['threat']}" in update
+    assert '♖' not in update and '\x1b[2J' not in update
+
+
+def test_board_display_goes_through_shared_screen(capsys):
+    board = chess167.Board()
+    board.display(2, {(4, 2)}, True)
+    board.display_with_hints([(5, 4)])
+    out = capsys.readouterr().out
+    assert 'Шах королю!' in out and '!' in out.splitlines()[8] and '*' in out
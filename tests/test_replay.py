@@ -0,0 +1,49 @@
+import io
+
+import chessbase
+import replay
+
+GAMES = """e2e4 e7e5 g1f3
+e2e4 e2e4
+[Event "x"]
+
+1. e4 e5 2. Nf3 {comment
+over two lines} Nc6 (2... d6 3. d4) 3. Bb5 a6 $1 4. Bxc6 dxc6 1-0
+
+1.d4 d5 2.Qd3 Qd6 3.Qxd5
+"""
+
+
+def test_read_games_splits_both_formats():
+    records = list(replay.read_games(io.StringIO(GAMES)))
+    assert [record.kind for record in records] == ['moves', 'moves', 'pgn', 'pgn']
+    assert records[2].moves == ['e4', 'e5', 'Nf3', 'Nc6', 'Bb5', 'a6', 'Bxc6', 'dxc6']
+    assert records[2].line == 3 and records[3].line == 8
+
+
+def test_replay_reports_first_illegal_ply():
+    results = list(replay.replay_stream(io.StringIO(GAMES), 'chessbase'))
+    assert [result.valid for result in results] == [True, False, True, False]
+    assert (results[1].error_ply, results[1].error_move, results[1].plies) == (2, 'e2e4', 1)
+    assert (results[3].error_ply, results[3].error_move) == (5, 'Qxd5')
+
+
+def test_apply_move_checks_side_to_move():
+    game = chessbase.Game()
+    assert not game.apply_move('e7e5')
+    assert game.apply_move('e2-e4') and game.current_turn == 'B' and game.move_count == 1
+    assert not game.apply_move('e4e5')
+
+
+def test_shashki_and_summary():
+    out = io.StringIO()
+    summary = replay.report(replay.replay_stream(io.StringIO("c3-d4 f6-e5 d4:f6\n"), 'shashki'), out=out)
+    assert summary['games'] == 1 and summary['valid'] == 1 and summary['plies'] == 3
+    assert 'Партий: 1' in out.getvalue()
+
+
+def test_parallel_replay_keeps_order():
+    sequential = list(replay.replay_stream(io.StringIO(GAMES * 3), 'chessbase'))
+    parallel = list(replay.replay_parallel(io.StringIO(GAMES * 3), 'chessbase', workers=2, chunk_games=1,
+                                           max_pending=2))
+    assert parallel == sequential
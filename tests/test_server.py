@@ -0,0 +1,72 @@
+import asyncio
+
+import server
+
+
+async def talk(lines, **connect):
+    client = await server.GameClient.connect(**connect)
+    try:
+        return [await client.request(line) for line in lines]
+    finally:
+        await client.close()
+
+
+def run_with_server(scenario, **options):
+    async def main():
+        srv = await server.start_server(port=0, **options)
+        async with srv:
+            if 'unix' in options:
+                return await scenario({'unix': options['unix']})
+            return await scenario({'port': srv.sockets[0].getsockname()[1]})
+    return asyncio.run(main())
+
+
+def test_protocol_round_trip():
+    replies = run_with_server(lambda address: talk(
+        ['MOVE e2e4', 'NEW chess167 bitboard', 'HINT e2', 'MOVE e2e3', 'MOVE e2e4', 'THREATS', 'BOARD', 'FOO'],
+        **address))
+    assert replies[0].startswith('ERR')
+    assert replies[1:3] == ['OK W', 'OK e3']
+    assert replies[3] == 'OK B' and replies[4].startswith('ERR')
+    assert replies[5].startswith('OK 0')
+    assert replies[6] == 'OK rnbqkbnr/pppppppp/8/2uds3/2UDS3/4P3/PPPP1PPP/RNBQKBNR b - - 0 1'
+    assert replies[7].startswith('ERR')
+
+
+def test_many_concurrent_games(tmp_path):
+    async def scenario(address):
+        lines = ['NEW shashki', 'MOVE c3-d4', 'MOVE f6-e5', 'MOVE d4:f6', 'BOARD']
+        return await asyncio.gather(*(talk(lines, **address) for _ in range(50)))
+
+    results = run_with_server(scenario, unix=str(tmp_path / 'games.sock'))
+    assert all(replies[:4] == ['OK W', 'OK B', 'OK W', 'OK B'] for replies in results)
+    assert len({replies[4] for replies in results}) == 1
+
+
+def test_new_rejects_bad_arguments():
+    session = server.Session()
+    assert session.handle('NEW go').startswith('ERR')
+    assert session.handle('NEW chessbase abacus').startswith('ERR')
+    assert session.handle('NEW chessbase grid 8/8 w').startswith('ERR')
+    assert session.handle('NEW chessbase grid 4k3/8/8/8/8/8/8/4K3 b - - 0 9') == 'OK B'
+    assert session.handle('THREATS') == 'OK 0'
+
+
+def test_threats_in_every_variant():
+    session = server.Session()
+    session.handle('NEW chessbase grid 4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1')
+    assert session.handle('THREATS') == 'OK 0 d1'
+    session.handle('NEW shashki bitboard B:WKc3:Bd4,f6')
+    assert session.handle('THREATS') == 'OK 0 d4 f6'
+
+
+def test_unexpected_error_keeps_session(monkeypatch, caplog):
+    session = server.Session()
+    session.handle('NEW chess167')
+
+    def broken(color):
+        raise KeyError(color)
+    monkeypatch.setattr(session.game.board, 'get_threatened_pieces', broken)
+    assert session.handle('THREATS') == 'ERR внутренняя ошибка: KeyError'
+    assert 'THREATS' in caplog.text
+    assert session.handle('MOVE e2e3') == 'OK B'
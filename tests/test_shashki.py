@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+import draughts_bitboard
+import shashki
+from draughts_bitboard import DraughtsPosition, step
+
+
+def square(name):
+    return 8 - int(name[1]), ord(name[0]) - ord('a')
+
+
+def ends(board, start):
+    return sorted(f"{chr(ord('a') + col)}{8 - row}" for row, col in board.get_moves(square(start)))
+
+
+def test_flying_king_moves_along_free_diagonals():
+    board = shashki.Board.from_fen('W:WKc3:Bf6')
+    assert isinstance(board.grid[5][2], shashki.King) and board.grid[5][2] is shashki.Piece('W', 'D')
+    # Взятие обязательно: дамка бьёт f6 издалека и встаёт на g7 или h8
+    assert ends(board, 'c3') == ['g7', 'h8']
+    board = shashki.Board.from_fen('W:WKc3:Bh6')
+    assert ends(board, 'c3') == ['a1', 'a5', 'b2', 'b4', 'd2', 'd4', 'e1', 'e5', 'f6', 'g7', 'h8']
+
+
+def test_capture_is_mandatory_for_the_whole_side():
+    board = shashki.Board.from_fen('W:Wa3,e3:Bf4')
+    assert board.generate_moves('W') == [(square('e3'), square('g5'))]
+    assert board.get_moves(square('a3')) == []
+    assert not board.make_move(square('a3'), square('b4'))
+
+
+def test_men_capture_backwards_and_finish_the_chain():
+    board = shashki.Board.from_fen('W:We5:Bd4,b4')
+    assert ends(board, 'e5') == ['a5']
+    assert not board.make_move(square('e5'), square('c3'))
+    assert board.make_move(square('e5'), square('a5'))
+    assert board.grid[4][1] is None and board.grid[4][3] is None
+
+
+def test_man_promoted_during_capture_continues_as_king():
+    board = shashki.Board.from_fen('W:Wb6:Bc7,g5')
+    assert ends(board, 'b6') == ['h4']
+    assert board.make_move(square('b6'), square('h4'))
+    assert board.grid[4][7] is shashki.King('W')
+    assert board.to_fen('B') == 'B:WK20:B'
+
+
+def test_king_must_land_where_the_capture_continues():
+    board = shashki.Board.from_fen('W:WKa1:Bc3,f4')
+    assert ends(board, 'a1') == ['g3', 'h2']
+    assert [len(taken) for _, taken, _ in board.legal_moves('W')] == [2, 2]
+
+
+def test_multi_capture_is_unmade_and_chains_are_told_apart():
+    # Из c1 в c1 можно обойти кругом через a3 или через e3
+    board = shashki.Board.from_fen('W:WKc1:Bb2,b4,d4,d2')
+    before = board.to_fen('W'), board.zobrist_key
+    sequences = [path for path, _, _ in board.legal_moves('W') if path[-1] == square('c1')]
+    assert len(sequences) == 2
+    packed = [move for move in board.fill_moves('W') if move & 63 == 58 and move >> 6 & 63 == 58]
+    assert sorted(move >> 24 for move in packed) == [0, 1]
+    assert board.make_packed(packed[1])
+    assert board.to_fen('B') == 'B:WK30:B' and board.zobrist_key == shashki.ZOBRIST.hash_grid(board.grid, 'B')
+    board.unmake_move()
+    assert (board.to_fen('W'), board.zobrist_key) == before
+
+
+def test_game_accepts_chain_notation():
+    game = shashki.Game.from_fen('W:Wc3:Bd4,f6,d6')
+    # Цепочку нельзя прервать на e5; из e5 две дороги, они различаются промежуточным полем
+    assert not game.apply_move('c3:e5')
+    assert game.apply_move('c3:e5:g7')
+    assert game.to_fen() == 'B:W8:B10'
+
+
+def test_step_shifts_whole_masks():
+    # b6, c3 и h2 (поля 8, 21 и 27) на одно поле вверх-вправо: c7, d4, за краем доски
+    assert step(1 << 8 | 1 << 21 | 1 << 27, 1) == 1 << 5 | 1 << 17
+    for sq in range(32):
+        for direction in range(4):
+            ray = draughts_bitboard.RAYS[direction][sq]
+            assert step(1 << sq, direction) == (1 << ray[0] if ray else 0)
+
+
+def test_capturers_come_from_masks():
+    position = DraughtsPosition.from_grid(shashki.Board.from_fen('W:We5,a3,Kh8:Bd4,b4').grid)
+    # e5 бьёт d4 назад, a3 бьёт b4, дамке h8 мешает своя шашка e5
+    assert sorted(draughts_bitboard.iter_bits(position.capturers('W'))) == [14, 20]
+
+
+@pytest.mark.parametrize('fen', [None, 'W:WKc1,e1:Bb2,b4,d4,d2,f6', 'B:Wb6,Kh2,c3:Bc7,g5,Ka7'])
+def test_bitboard_backend_agrees_with_grid(fen):
+    for seed in range(5):
+        rnd = random.Random(seed)
+        boards = [shashki.Board.from_fen(fen, backend) if fen else shashki.Board(backend)
+                  for backend in shashki.Board.BACKENDS]
+        side = fen[0] if fen else 'W'
+        for _ in range(60):
+            grid, bitboard = boards
+            assert grid.legal_moves(side) == bitboard.legal_moves(side)
+            assert list(grid.fill_moves(side)) == list(bitboard.fill_moves(side))
+            assert bitboard.bitboards.state() == DraughtsPosition.from_grid(bitboard.grid).state()
+            moves = list(grid.fill_moves(side))
+            if not moves:
+                break
+            move = rnd.choice(moves)
+            assert all(board.make_packed(move) for board in boards)
+            assert grid.zobrist_key == bitboard.zobrist_key
+            side = 'B' if side == 'W' else 'W'
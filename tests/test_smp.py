@@ -0,0 +1,38 @@
+import multiprocessing
+
+import chess167
+from analysis import analyse
+from smp import SharedTable, analyse_parallel
+
+
+def test_shared_table_probe_and_store():
+    table = SharedTable(1024)
+    assert table.size == 64 and table.probe(5) is None
+    assert table.store(5, 123456789, 3) and table.probe(5) == (123456789, 3)
+    assert not table.store(5 + 64, 1, 2) and table.store(5 + 64, 1, 4)
+    assert table.probe(5) is None and table.probe(5 + 64) == (1, 4)
+    # Разорванная запись (слово ключа от другой записи) не проходит проверку
+    table._slots[(5 + 64 & table._mask) << 1] ^= 1
+    assert table.probe(5 + 64) is None
+    table.clear()
+    assert table.probe(5 + 64) is None
+
+
+def _store_in_child(table):
+    table.store(9, 77, 1)
+
+
+def test_shared_table_is_shared_between_processes():
+    table = SharedTable(1024)
+    process = multiprocessing.Process(target=_store_in_child, args=(table,))
+    process.start()
+    process.join()
+    assert process.exitcode == 0 and table.probe(9) == (77, 1)
+
+
+def test_parallel_search_agrees_with_single_process():
+    board = chess167.Board.from_fen('4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1')
+    single = analyse(board, 'W', max_depth=3)
+    parallel = analyse_parallel(board, 'W', workers=2, max_depth=3, table_bytes=1 << 16)
+    assert parallel.depth == 3 and parallel.score == single.score and parallel.line[0] == 'd1d5'
+    assert board.to_fen() == '4k3/8/8/3q4/8/8/8/3RK3 w - - 0 1'
@@ -0,0 +1,111 @@
+import random
+from array import array
+
+import pytest
+
+import shashki
+import tablebase
+from draughts_bitboard import DraughtsPosition
+from tablebase import DRAW, LOSS, WIN
+
+
+@pytest.fixture(scope='module')
+def base_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('tablebase') / 'shashki2.tb'
+    tablebase.build(str(path), max_pieces=2, workers=1)
+    return path
+
+
+def search(position, side, depth):
+    """Полный перебор на `depth` полуходов: (result, distance) или None, если исход дальше."""
+    own = position.white if side == 'W' else position.black
+    moves = position.legal_moves(side) if own else []
+    if not moves:
+        return LOSS, 0
+    if depth == 0:
+        return None
+    state, opponent = position.state(), 'B' if side == 'W' else 'W'
+    wins, losses, unknown = [], [], False
+    for path, taken, king in moves:
+        position.apply(side, path[0], path[-1], taken, king)
+        found = search(position, opponent, depth - 1)
+        position.restore(state)
+        if found is None or found[0] == DRAW:
+            unknown = True
+        elif found[0] == LOSS:
+            wins.append(found[1] + 1)
+        else:
+            losses.append(found[1] + 1)
+    if wins:
+        return WIN, min(wins)
+    return None if unknown else (LOSS, max(losses))
+
+
+def test_index_round_trip():
+    rnd = random.Random(0)
+    for material in ((0, 1, 1, 1), (2, 0, 1, 1), (1, 2, 0, 2)):
+        size = tablebase.slice_size(material)
+        for index in [0, size - 1] + [rnd.randrange(size) for _ in range(300)]:
+            white, black, kings = tablebase.position_of(index, material)
+            assert tablebase.material_of(white, black, kings) == material and not white & black
+            assert tablebase.index_of(white, black, kings, material) == index
+
+
+def test_probe_known_positions(base_path):
+    with tablebase.Tablebase(str(base_path)) as base:
+        assert base.max_pieces == 2
+        # Белые обязаны бить c3:e5 и снимают последнюю чёрную шашку; у чёрных тот же удар назад
+        assert base.probe(shashki.Board.from_fen('W:Wc3:Bd4'), 'W') == (WIN, 1)
+        assert base.probe(shashki.Board.from_fen('B:Wc3:Bd4', 'bitboard'), 'B') == (WIN, 1)
+        assert base.probe(shashki.Board.from_fen('W:WKc1:BKh8'), 'W') == (DRAW, 0)
+        # Дамка a1 может встать только на большую дорогу, где её бьёт дамка h8
+        assert base.probe(shashki.Board.from_fen('W:WKa1:BKh8'), 'W') == (LOSS, 2)
+        assert base.probe(shashki.Board.from_fen('W:Wc3,e3:Bd4'), 'W') is None
+
+
+def test_distances_agree_with_full_search(base_path):
+    rnd = random.Random(1)
+    with tablebase.Tablebase(str(base_path)) as base:
+        for _ in range(300):
+            material = rnd.choice([material for group in tablebase.slices(2) for material in group])
+            white, black, kings = tablebase.position_of(rnd.randrange(tablebase.slice_size(material)), material)
+            if white & ~kings & tablebase.WHITE_MEN_FORBIDDEN or black & ~kings & tablebase.BLACK_MEN_FORBIDDEN:
+                continue
+            side = rnd.choice('WB')
+            result, distance = base.probe_masks(white, black, kings, side)
+            if result != DRAW and distance <= 5:
+                assert search(DraughtsPosition(white, black, kings), side, distance) == (result, distance)
+
+
+def test_parallel_build_matches_sequential(base_path, tmp_path):
+    path = tmp_path / 'parallel.tb'
+    tablebase.build(str(path), max_pieces=2, workers=2)
+    assert path.read_bytes() == base_path.read_bytes()
+
+
+def fake_slice(workdir, material, value):
+    entries = array('H', [value]) * (tablebase.slice_size(material) * 2)
+    with open(workdir / ''.join(map(str, material)), 'wb') as file:
+        entries.tofile(file)
+
+
+def test_long_distances_are_stored_exactly(tmp_path):
+    # Превращение чёрной шашки ведёт в срез дамка против дамки; если там белые проигрывают
+    # за 200 полуходов, в срезе дамка против шашки появляются выигрыши и проигрыши длиннее байта
+    fake_slice(tmp_path, (0, 1, 0, 1), tablebase.encode(LOSS, 200))
+    table = tablebase.solve_slice((0, 1, 1, 0), str(tmp_path))
+    results = {tablebase.decode(value) for value in table}
+    assert (WIN, 201) in results and (LOSS, 202) in results
+    # Белая дамка b8, чёрная шашка a2 ходит в дамки на b1
+    white, black, kings = 1, 1 << 24, 1
+    index = tablebase.index_of(white, black, kings, (0, 1, 1, 0)) * 2 + 1
+    assert tablebase.decode(table[index]) == (WIN, 201)
+
+
+def test_distance_overflow_is_an_error(tmp_path):
+    fake_slice(tmp_path, (0, 1, 0, 1), tablebase.encode(LOSS, tablebase.MAX_DISTANCE))
+    with pytest.raises(ValueError):
+        tablebase.solve_slice((0, 1, 1, 0), str(tmp_path))
+    with pytest.raises(ValueError):
+        tablebase.encode(WIN, tablebase.MAX_DISTANCE + 1)
+    assert tablebase.decode(tablebase.encode(LOSS, tablebase.MAX_DISTANCE)) == (LOSS, tablebase.MAX_DISTANCE)
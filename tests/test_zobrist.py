@@ -0,0 +1,87 @@
+import chess167
+from zobrist import ENTRY_BYTES, TranspositionTable, ZobristKeys
+
+
+def make_table(slots):
+    """Таблица ровно из `slots` слотов."""
+    table = TranspositionTable(slots * ENTRY_BYTES)
+    assert table.size == slots
+    return table
+
+
+def test_size_respects_memory_limit():
+    for max_bytes in (ENTRY_BYTES, 1000, 16 * 1024 * 1024):
+        table = TranspositionTable(max_bytes)
+        assert table.size * ENTRY_BYTES <= max(max_bytes, ENTRY_BYTES)
+        assert table.size & (table.size - 1) == 0
+
+
+def test_probe_hit_and_miss():
+    table = make_table(4)
+    assert table.probe(5) is None
+    assert table.store(5, 42, depth=3)
+    assert table.probe(5) == (42, 3)
+    assert table.probe(9) is None  # тот же слот, другой ключ
+    assert (table.hits, table.misses) == (1, 2)
+
+
+def test_deeper_entry_is_kept_within_search():
+    table = make_table(4)
+    table.store(1, 'deep', depth=5)
+    assert not table.store(5, 'shallow', depth=2)
+    assert table.get(1) == 'deep'
+    assert table.store(5, 'deeper', depth=5)
+    assert table.get(5) == 'deeper' and table.get(1) is None
+
+
+def test_same_key_is_always_replaced():
+    table = make_table(4)
+    table.store(1, 'deep', depth=5)
+    assert table.store(1, 'update', depth=0)
+    assert table.probe(1) == ('update', 0)
+
+
+def test_entries_from_previous_search_age_out():
+    table = make_table(4)
+    table.store(1, 'old', depth=9)
+    table.new_search()
+    assert table.get(1) == 'old'  # старые записи остаются доступными
+    assert table.store(5, 'new', depth=0)
+    assert table.get(5) == 'new'
+
+
+def test_clear():
+    table = make_table(4)
+    table.store(1, 1)
+    table.probe(1)
+    table.clear()
+    assert table.get(1) is None and table.usage() == 0
+    assert table.hits == 0 and table.misses == 1
+
+
+def test_incremental_key_matches_full_hash():
+    board = chess167.Board()
+    side = 'W'
+    for start, end in (((6, 7), (4, 7)), ((1, 6), (3, 6)), ((4, 7), (3, 6)), ((1, 7), (2, 7))):
+        assert board.move_piece(start, end)
+        side = 'B' if side == 'W' else 'W'
+        assert board.zobrist_key == chess167.ZOBRIST.hash_grid(board.grid, side)
+
+
+def test_keys_are_reproducible():
+    assert ZobristKeys('CD').pieces == ZobristKeys('CD').pieces
+
+
+def test_threats_follow_edited_grid():
+    # Угрозы не берутся из общей таблицы по ключу: правка сетки сразу видна и не влияет на другие доски
+    for _ in range(2):
+        board = chess167.Board()
+        before = board.get_threatened_pieces('W')
+        board.grid[5][4] = chess167.Pawn('B')
+        board.invalidate_moves()
+        threats, check = board.get_threatened_pieces('W')
+        assert threats == before[0] | {(6, 3), (6, 5)} and not check
+    grid_board, bitboard_board = chess167.Board(), chess167.Board('bitboard')
+    for board in (grid_board, bitboard_board):
+        assert board.move_piece((4, 3), (3, 3))  # Дракон белых бьёт дракона чёрных
+    assert grid_board.get_threatened_pieces('B') == bitboard_board.get_threatened_pieces('B')
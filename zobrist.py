@@ -0,0 +1,175 @@
+"""Zobrist-хеширование позиций и таблица транспозиций.
+
+Ключ позиции - 64-битное число, равное XOR случайных ключей всех фигур на
+своих клетках (и ключа очереди хода). Доски обновляют его инкрементально в
+`move_piece`, поэтому одинаковые позиции узнаются за O(1).
+"""
+
+import random
+
+# Оценка памяти на одну запись таблицы в CPython: слот списка (8), кортеж из четырёх
+# полей (72), 64-битный ключ (36) и значение. Значения должны быть компактными -
+# одно число до 64 бит (36) или кортеж из пары таких чисел; множества и списки
+# в таблицу не кладутся, иначе ограничение памяти перестаёт выполняться
+ENTRY_BYTES = 160
+
+
+class ZobristKeys:
+    """Набор случайных ключей для одного варианта игры.
+
+    Атрибуты:
+        pieces (dict): Ключи фигур: pieces[(color, name)] -> список из 64 ключей.
+        side (int): Ключ, который добавляется при каждой смене очереди хода.
+    """
+
+    def __init__(self, names, seed=0x5EED):
+        """Генерирует ключи для фигур с названиями из `names`.
+
+        Args:
+            names (str): Названия фигур варианта (например, 'PRNBQKUDS').
+            seed (int): Зерно генератора, чтобы ключи совпадали между запусками.
+        """
+        rnd = random.Random(seed)
+        self.pieces = {(color, name): [rnd.getrandbits(64) for _ in range(64)]
+                       for color in ('W', 'B') for name in names}
+        self.side = rnd.getrandbits(64)
+
+    def piece(self, piece, pos):
+        """Возвращает ключ фигуры `piece` на позиции `pos` (row, col)."""
+        return self.pieces[(piece.color, piece.name)][pos[0] * 8 + pos[1]]
+
+    def hash_grid(self, grid, side='W'):
+        """Считает ключ позиции полным обходом сетки.
+
+        Args:
+            grid (list): Двумерный список 8x8 с фигурами или None.
+            side (str): Чья очередь хода ('W' или 'B').
+
+        Returns:
+            int: 64-битный ключ позиции.
+        """
+        key = self.side if side == 'B' else 0
+        for row in range(8):
+            for col in range(8):
+                piece = grid[row][col]
+                if piece:
+                    key ^= self.pieces[(piece.color, piece.name)][row * 8 + col]
+        return key
+
+
+def feature_salt(*name):
+    """Возвращает постоянную соль для записей одной функции анализа.
+
+    Разные функции (например, поиск) хранят результаты в общей
+    таблице под ключами `key ^ feature_salt(...)`, чтобы не пересекаться.
+    Соль зависит только от `name`, поэтому совпадает во всех процессах.
+    """
+    return random.Random(repr(name)).getrandbits(64)
+
+
+class TranspositionTable:
+    """Таблица транспозиций фиксированного размера.
+
+    Записи хранятся в списке из 2^k слотов, слот выбирается младшими битами
+    ключа. Политика замещения: слот перезаписывается, если он пуст, хранит ту же
+    позицию, запись осталась от прошлого поиска или новая глубина не меньше старой.
+
+    Атрибуты:
+        size (int): Число слотов.
+        hits (int): Число успешных обращений `probe`.
+        misses (int): Число неуспешных обращений `probe`.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        """Создаёт таблицу, занимающую не больше `max_bytes` памяти.
+
+        Args:
+            max_bytes (int): Ограничение памяти в байтах.
+        """
+        size = 1
+        while size * 2 * ENTRY_BYTES <= max_bytes:
+            size *= 2
+        self.size = size
+        self._mask = size - 1
+        self._slots = [None] * size
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """Начинает новое поколение: старые записи становятся кандидатами на замещение."""
+        self._generation += 1
+
+    def clear(self):
+        """Удаляет все записи и сбрасывает счётчики."""
+        self._slots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        """Ищет запись для ключа.
+
+        Args:
+            key (int): Ключ позиции.
+
+        Returns:
+            tuple: (value, depth) или None, если записи нет.
+        """
+        entry = self._slots[key & self._mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[3], entry[1]
+        self.misses += 1
+        return None
+
+    def get(self, key, default=None):
+        """Возвращает сохранённое значение для ключа или `default`."""
+        found = self.probe(key)
+        return default if found is None else found[0]
+
+    def store(self, key, value, depth=0):
+        """Сохраняет значение для ключа с учётом политики замещения.
+
+        Args:
+            key (int): Ключ позиции.
+            value (int): Сохраняемый результат в компактном виде (см. ENTRY_BYTES).
+            depth (int): Глубина (ценность) результата.
+
+        Returns:
+            bool: True, если запись сохранена.
+        """
+        index = key & self._mask
+        entry = self._slots[index]
+        if entry is None or entry[0] == key or entry[2] != self._generation or depth >= entry[1]:
+            self._slots[index] = (key, depth, self._generation, value)
+            return True
+        return False
+
+    def usage(self):
+        """Доля занятых слотов (0..1)."""
+        return sum(entry is not None for entry in self._slots) / self.size
+
+
+_shared_table = None
+
+
+def shared_table():
+    """Возвращает общую для всех функций анализа таблицу транспозиций процесса."""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = TranspositionTable()
+    return _shared_table
+
+
+def set_table_size(max_bytes):
+    """Пересоздаёт общую таблицу с новым ограничением памяти.
+
+    Args:
+        max_bytes (int): Ограничение памяти в байтах.
+
+    Returns:
+        TranspositionTable: Новая общая таблица.
+    """
+    global _shared_table
+    _shared_table = TranspositionTable(max_bytes)
+    return _shared_table